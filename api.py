@@ -0,0 +1,221 @@
+import gzip, hashlib, json
+from datetime import datetime, time
+from functools import wraps
+from flask import Blueprint, Response, abort, jsonify, request, url_for
+from flask_login import current_user
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from werkzeug.exceptions import HTTPException
+from models import Roles, Category, Item, Claim, Notification
+from extensions import ext
+from pagination import paginate
+import images
+import search
+
+try:
+    import brotli
+except ImportError:   # optional; without it responses are gzip-only
+    brotli = None
+
+# ----- JSON API (/api/v1) -----
+# Read-only views of items, categories, claims and notifications for
+# script.js and mobile clients. Lists use the same keyset cursors as the HTML
+# pages ({"data": [...], "next_cursor": ..., "prev_cursor": ...}). ?fields=
+# picks the keys returned. Every 200 carries a weak ETag of its body, so a
+# client refreshing with If-None-Match gets an empty 304 when nothing changed.
+# Bodies over COMPRESS_MIN bytes are brotli- or gzip-encoded.
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+MAX_LIMIT = 100
+COMPRESS_MIN = 512
+
+def init_app(app):
+    app.register_blueprint(bp)
+
+def _iso(v):
+    return v.isoformat() if v else None
+
+# field name -> getter; the first FIELDS entry of each is always included
+ITEM_FIELDS = {
+    "id": lambda i: i.id,
+    "name": lambda i: i.name,
+    "description": lambda i: i.description,
+    "status": lambda i: i.status,
+    "location_found": lambda i: i.location_found,
+    "date_found": lambda i: _iso(i.date_found),
+    "created_at": lambda i: _iso(i.created_at),
+    "updated_at": lambda i: _iso(i.updated_at),
+    "category_id": lambda i: i.category_id,
+    "category": lambda i: i.category.name if i.category else None,
+    "photo_url": lambda i: images.photo_url(i, 640) if i.photo_path else None,
+    "url": lambda i: url_for("main.item_detail", item_id=i.id),
+}
+CATEGORY_FIELDS = {
+    "id": lambda c: c.id,
+    "name": lambda c: c.name,
+    "slug": lambda c: c.slug,
+}
+CLAIM_FIELDS = {
+    "id": lambda c: c.id,
+    "item_id": lambda c: c.item_id,
+    "item_name": lambda c: c.item.name,
+    "claimer_id": lambda c: c.claimer_id,
+    "message": lambda c: c.message,
+    "status": lambda c: c.status,
+    "created_at": lambda c: _iso(c.created_at),
+}
+NOTIFICATION_FIELDS = {
+    "id": lambda n: n.id,
+    "title": lambda n: n.title,
+    "body": lambda n: n.body,
+    "is_read": lambda n: n.is_read,
+    "created_at": lambda n: _iso(n.created_at),
+}
+
+def error(status, message):
+    resp = jsonify(error=message)
+    resp.status_code = status
+    return resp
+
+@bp.errorhandler(HTTPException)
+def _http_error(e):
+    return error(e.code, e.description)
+
+def login_required(fn):
+    @wraps(fn)
+    def wrapper(*a, **kw):
+        if not current_user.is_authenticated:
+            return error(401, "Sign in first.")
+        return fn(*a, **kw)
+    return wrapper
+
+def _fields(table):
+    wanted = request.args.get("fields")
+    if not wanted:
+        return table
+    names = [f.strip() for f in wanted.split(",") if f.strip()]
+    unknown = [f for f in names if f not in table]
+    if unknown:
+        abort(400, f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(table)}.")
+    first = next(iter(table))
+    return {f: table[f] for f in [first] + [n for n in names if n != first]}
+
+def _serialize(rows, table):
+    return [{name: get(row) for name, get in table.items()} for row in rows]
+
+def _date(name, end=False):
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        return datetime.combine(datetime.strptime(raw, "%Y-%m-%d").date(), time.max if end else time.min)
+    except ValueError:
+        abort(400, f"{name} must be a date (YYYY-MM-DD).")
+
+def _int(name, default=None):
+    raw = request.args.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        abort(400, f"{name} must be an integer.")
+
+def _page(s, stmt, order, table):
+    limit = max(1, min(_int("limit", 24), MAX_LIMIT))
+    page = paginate(s, stmt, order, request.args.get("cursor"), limit)
+    return dict(data=_serialize(page, table), next_cursor=page.next_cursor, prev_cursor=page.prev_cursor)
+
+def _json(payload):
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    resp = Response(body, mimetype="application/json")
+    resp.set_etag(hashlib.sha1(body).hexdigest()[:20], weak=True)
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True    # always revalidate; the ETag makes that a 304
+    return resp.make_conditional(request)
+
+@bp.after_request
+def _compress(resp):
+    resp.vary.add("Accept-Encoding")
+    if (resp.status_code != 200 or resp.direct_passthrough or "Content-Encoding" in resp.headers
+            or resp.content_length is None or resp.content_length < COMPRESS_MIN):
+        return resp
+    accept = request.accept_encodings
+    if brotli is not None and accept["br"]:
+        resp.set_data(brotli.compress(resp.get_data(), quality=5))
+        resp.headers["Content-Encoding"] = "br"
+    elif accept["gzip"]:
+        resp.set_data(gzip.compress(resp.get_data(), compresslevel=6))
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+# ----- Endpoints -----
+
+@bp.route("/items")
+@login_required
+def items():
+    sort = request.args.get("sort", "relevance" if request.args.get("q") else "date_desc")
+    if sort not in search.SORTS:
+        abort(400, f"sort must be one of {', '.join(search.SORTS)}.")
+    stmt, order = search.listing(request.args.get("q"), _int("category"), sort, ext.fts)
+    if request.args.get("status"):
+        stmt = stmt.where(Item.status == request.args["status"])
+    since, until = _date("from"), _date("to", end=True)
+    if since:
+        stmt = stmt.where(Item.date_found >= since)
+    if until:
+        stmt = stmt.where(Item.date_found <= until)
+    table = _fields(ITEM_FIELDS)
+    with ext.Session() as s:
+        return _json(_page(s, stmt, order, table))
+
+@bp.route("/items/<int:item_id>")
+def item(item_id):
+    table = _fields(ITEM_FIELDS)
+    with ext.Session() as s:
+        it = s.execute(select(Item).options(joinedload(Item.category)).where(Item.id == item_id)).scalar_one_or_none()
+        if it is None:
+            abort(404, "No such item.")
+        return _json(_serialize([it], table)[0])
+
+@bp.route("/categories")
+def categories():
+    table = _fields(CATEGORY_FIELDS)
+    with ext.Session() as s:
+        rows = s.execute(select(Category).order_by(Category.name)).scalars().all()
+        return _json(dict(data=_serialize(rows, table)))
+
+@bp.route("/claims")
+@login_required
+def claims():
+    """The caller's own claims; admins see everyone's (filter with ?claimer=)."""
+    stmt = select(Claim).options(joinedload(Claim.item))
+    if current_user.role != Roles.ADMIN:
+        stmt = stmt.where(Claim.claimer_id == current_user.id)
+    elif request.args.get("claimer"):
+        stmt = stmt.where(Claim.claimer_id == _int("claimer"))
+    if request.args.get("status"):
+        stmt = stmt.where(Claim.status == request.args["status"])
+    if request.args.get("item"):
+        stmt = stmt.where(Claim.item_id == _int("item"))
+    since, until = _date("from"), _date("to", end=True)
+    if since:
+        stmt = stmt.where(Claim.created_at >= since)
+    if until:
+        stmt = stmt.where(Claim.created_at <= until)
+    table = _fields(CLAIM_FIELDS)
+    with ext.Session() as s:
+        return _json(_page(s, stmt, [(Claim.created_at, True), (Claim.id, True)], table))
+
+@bp.route("/notifications")
+@login_required
+def notifications():
+    """The caller's notifications, newest first; ?unread=1 for unread only.
+    Reading them here does not mark them read."""
+    stmt = select(Notification).where(Notification.user_id == current_user.id)
+    if request.args.get("unread") in ("1", "true"):
+        stmt = stmt.where(Notification.is_read == False)
+    table = _fields(NOTIFICATION_FIELDS)
+    with ext.Session() as s:
+        return _json(_page(s, stmt, [(Notification.created_at, True), (Notification.id, True)], table))
@@ -0,0 +1,2 @@
+# Benchmarks for the lost & found app. Run from the repo root, e.g.
+#   python -m bench.search --sizes 10000 100000
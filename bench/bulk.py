@@ -0,0 +1,71 @@
+import argparse, os, tempfile, time, tracemalloc
+
+# ----- Bulk export / import throughput -----
+# Run as `python -m bench.bulk --sizes 10000 100000`. For each size a
+# database is seeded with that many items, exported (bulk.export, CSV and
+# JSONL) to a file, and the CSV imported into a second, empty database
+# (bulk.import_rows with ItemImporter: form validation, batched INSERT ...
+# RETURNING, match-index keys). Reported: rows/s, and the peak Python memory
+# of a second pass run under tracemalloc (which slows it down, so it is
+# timed separately). Flat memory across sizes is the point of yield_per on
+# the way out and batches on the way in.
+
+def make_app(tmp, name):
+    from app import create_app
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, name)}",
+                          UPLOAD_FOLDER=os.path.join(tmp, "uploads"), OUTBOX_WORKER="none"))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    return app, web
+
+def measured(fn):
+    """(seconds, result) of fn(), then the peak MiB of running it again traced."""
+    t0 = time.perf_counter()
+    result = fn()
+    took = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return took, peak, result
+
+def run(size, args):
+    import bulk
+    from bench import seed
+    tmp = tempfile.mkdtemp(prefix="bench-bulk-")
+    src_app, src = make_app(tmp, "source.db")
+    seed.seed(src.db.engine, users=200, items=size, claims=0, notifications=0)
+
+    rows = []
+    for fmt in ("csv", "jsonl"):
+        path = os.path.join(tmp, f"items.{fmt}")
+        def export():
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                for chunk in bulk.export(src.db.sessionmaker, "items", fmt):
+                    f.write(chunk)
+        took, peak, _ = measured(export)
+        rows.append((size, f"export {fmt}", size / took, peak, os.path.getsize(path) / 1024 / 1024))
+
+    dst_app, dst = make_app(tmp, "target.db")
+    seed.seed(dst.db.engine, users=2, items=0, claims=0, notifications=0)
+    path = os.path.join(tmp, "items.csv")
+    def load():
+        with dst_app.app_context(), dst.Session() as s, open(path, "rb") as f:
+            return bulk.import_rows(bulk.importer("items", s, 1), bulk.read_rows(f, "csv"))
+    took, peak, done = measured(load)
+    assert done["imported"] == size and not done["error_count"], done
+    rows.append((size, "import csv", size / took, peak, None))
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser(description="bulk export / import rows per second and peak memory")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = ap.parse_args()
+
+    print(f"{'items':>8} {'direction':<13} {'rows/s':>9} {'peak MiB':>9} {'file MiB':>9}")
+    for size in args.sizes:
+        for n, what, rate, peak, mib in run(size, args):
+            print(f"{n:>8} {what:<13} {rate:>9.0f} {peak:>9.1f} {'' if mib is None else f'{mib:.1f}':>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse, os, statistics, tempfile, time
+
+# ----- Item card render time, with and without the fragment cache -----
+# Run as `python -m bench.cards`. Renders a page of --cards item cards (the
+# _item_card.html include used by /, /browse and /admin) inside a request
+# context and reports the median page render time with the fragment cache
+# off, cold (every card misses) and warm (every card hits), then after one
+# item changes status (that card alone is re-rendered).
+
+PAGE = '{% for item in items %}<div class="col">{% include "_item_card.html" %}</div>{% endfor %}'
+
+def main():
+    ap = argparse.ArgumentParser(description="item card render time, fragment cache off / cold / warm")
+    ap.add_argument("--cards", type=int, default=500)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(tmp, "uploads")
+    os.environ.setdefault("OUTBOX_WORKER", "none")
+    from flask import render_template_string
+    from sqlalchemy import select, update
+    from sqlalchemy.orm import joinedload
+    from bench import seed
+    from app import create_app
+    from models import Item, ItemStatus
+
+    app = create_app()
+    web = app.extensions["lostfound"]
+    web.init_db()
+    seed.seed(web.db.engine, users=20, items=args.cards, claims=0, notifications=0)
+    with web.Session() as s:
+        # a third of the cards get photo variants, so the srcset path is measured too
+        s.execute(update(Item).where(Item.id % 3 == 0).values(
+            photo_path="0123456789abcdef0123456789abcdef_640.jpg",
+            photo_hash="0123456789abcdef0123456789abcdef", photo_variants="[320, 640, 1280]"))
+        s.commit()
+
+    def load():
+        with web.Session() as s:
+            return s.execute(select(Item).options(joinedload(Item.category)).order_by(Item.id)).scalars().all()
+
+    env, store = app.jinja_env, web.fragment_cache
+    def render(items):
+        with app.test_request_context("/browse"):
+            t0 = time.perf_counter()
+            render_template_string(PAGE, items=items)
+            return (time.perf_counter() - t0) * 1000
+
+    items = load()
+    results = {}
+    env.fragment_cache = None
+    render(items)   # compile the templates first
+    results["off"] = [render(items) for _ in range(args.repeat)]
+    env.fragment_cache = store
+    cold = []
+    for _ in range(args.repeat):
+        store.clear()
+        cold.append(render(items))
+    results["cold"] = cold
+    results["warm"] = [render(items) for _ in range(args.repeat)]
+
+    with web.Session() as s:
+        it = s.get(Item, items[0].id)
+        it.status = ItemStatus.RETURNED if it.status != ItemStatus.RETURNED else ItemStatus.FOUND
+        s.commit()
+    items = load()
+    results["1 changed"] = [render(items)]   # the first render after the change; later ones are warm
+
+    base = statistics.median(results["off"])
+    print(f"{args.cards} cards, median of {args.repeat} renders")
+    print(f"{'cache':<10} {'page ms':>9} {'us/card':>9} {'vs off':>8}")
+    for name, runs in results.items():
+        ms = statistics.median(runs)
+        print(f"{name:<10} {ms:>9.2f} {ms * 1000 / args.cards:>9.1f} {base / ms:>7.1f}x")
+    print(f"fragment cache: {store.stats()}")
+
+if __name__ == "__main__":
+    main()
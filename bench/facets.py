@@ -0,0 +1,86 @@
+import argparse, os, statistics, tempfile, time
+from datetime import datetime, timedelta
+
+# ----- /browse facet counts: one grouped query vs one COUNT per facet -----
+# Run as `python -m bench.facets --sizes 10000 100000`. For each size a fresh
+# database is seeded and the facet counts for a few searches (no words, one
+# word, one word in one category) are computed two ways:
+#   grouped  search.facets(): one GROUP BY category, status, date bucket
+#   counts   one COUNT per category, per status and per date bucket, each
+#            with the same search filter (what a page would run without it)
+# Both must agree. "cached" is ext.cached_facets() once warm. With search
+# words SQLite tends to run each COUNT as an index scan with the FTS MATCH
+# inside the loop, which is what makes the separate counts so slow; they are
+# timed once, the rest --repeat times (median).
+
+SEARCHES = (("", -1), ("backpack", -1), ("black", 1))
+
+def separate_counts(s, q, category_id, cat_ids, use_fts, today):
+    import search
+    from sqlalchemy import select, func
+    from models import Item, ItemStatus
+
+    def count(*where, by_category=True):
+        query, _ = search.apply(select(func.count()).select_from(Item), q, use_fts)
+        if by_category and category_id != -1:
+            query = query.where(Item.category_id == category_id)
+        return s.scalar(query.where(*where))
+
+    cats = {c: count(Item.category_id == c, by_category=False) for c in cat_ids}
+    statuses = {st: count(Item.status == st) for st in (ItemStatus.FOUND, ItemStatus.CLAIMED, ItemStatus.RETURNED)}
+    dates = [(label, count(Item.date_found >= today - timedelta(days=days))) for label, days in search.DATE_BUCKETS]
+    oldest = today - timedelta(days=search.DATE_BUCKETS[-1][1])
+    dates.append(("Older", count(Item.date_found < oldest)))
+    return dict(categories={c: n for c, n in cats.items() if n}, statuses={k: n for k, n in statuses.items() if n},
+                dates=dates, total=sum(statuses.values()))
+
+def run(size, args):
+    tmp = tempfile.mkdtemp(prefix="bench-facets-")
+    from bench import seed
+    from app import create_app
+    import search
+
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                          UPLOAD_FOLDER=os.path.join(tmp, "uploads"), OUTBOX_WORKER="none"))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    seed.seed(web.db.engine, users=200, items=size, claims=0, notifications=0)
+    cat_ids = [c.id for c in web.cached_categories()]
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def timed(fn, repeat=args.repeat):
+        out = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            out.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(out), result
+
+    rows = []
+    for q, cat in SEARCHES:
+        with web.Session() as s:
+            grouped, a = timed(lambda: search.facets(s, q, cat, web.fts, today))
+            counts, b = timed(lambda: separate_counts(s, q, cat, cat_ids, web.fts, today), 1)
+        assert a == b, (q, cat, a, b)
+        with app.app_context():
+            web.cached_facets(q, cat)
+            cached, _ = timed(lambda: web.cached_facets(q, cat))
+        queries = len(cat_ids) + 3 + len(search.DATE_BUCKETS) + 1
+        rows.append((size, f"{q or '-'}/{cat}", a["total"], grouped, counts, queries, cached))
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser(description="browse facet counts: one grouped query vs N COUNTs")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'items':>8} {'search':<14} {'hits':>7} {'grouped ms':>11} {'counts ms':>10} {'(queries)':>9} "
+          f"{'speedup':>8} {'cached ms':>10}")
+    for size in args.sizes:
+        for size, name, hits, grouped, counts, queries, cached in run(size, args):
+            print(f"{size:>8} {name:<14} {hits:>7} {grouped:>11.2f} {counts:>10.2f} {queries:>9} "
+                  f"{counts / grouped:>7.1f}x {cached:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse, os, random, statistics, tempfile, time
+from datetime import timedelta
+
+# ----- Match suggestions: LSH index vs brute-force scoring -----
+# Run as `python -m bench.matching --sizes 10000 100000`. For each size a
+# fresh database is seeded, the LSH index built (matching.rebuild), and
+# --queries new reports (near-copies of existing items: one word dropped,
+# one added, date shifted a few days) are matched two ways:
+#   lsh    matching.matches(): one indexed key lookup + re-rank <= 200 rows
+#   brute  load every open item and score each pair (what matching would
+#          cost without the index)
+# "top-k" is the share of the brute-force top-k scores the LSH results
+# equal; "strong" the share of brute-force matches at NOTIFY_SCORE or better
+# that were among the LSH candidates at all.
+
+def perturb(rng, row, words):
+    from models import Item
+    desc = row.description.split()
+    desc.pop(rng.randrange(len(desc)))
+    desc.insert(rng.randrange(len(desc) + 1), rng.choice(words))
+    return Item(id=-1, name=row.name, description=" ".join(desc), location_found=row.location_found,
+                category_id=row.category_id, date_found=row.date_found + timedelta(days=rng.randint(-5, 5)),
+                reported_by=-1)
+
+def brute_force(s, item, k):
+    import matching
+    from sqlalchemy import select
+    from models import Item, ItemStatus
+    cols = (Item.id, Item.name, Item.description, Item.location_found, Item.category_id, Item.date_found)
+    mine, win = matching.features(item), matching.window(item.date_found)
+    scored = []
+    for r in s.execute(select(*cols).where(Item.status == ItemStatus.FOUND)):
+        if r.category_id == item.category_id and abs(matching.window(r.date_found) - win) <= 1:
+            scored.append((matching.jaccard(mine, matching.features(r)), r.id))
+    scored.sort(reverse=True)
+    return scored[:k], scored
+
+def run(size, args):
+    tmp = tempfile.mkdtemp(prefix="bench-matching-")
+    from sqlalchemy import create_engine, select, func
+    from sqlalchemy.orm import sessionmaker
+    from bench import seed
+    from models import Item, ItemMatchKey
+    import matching, migrations
+
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", future=True)
+    migrations.upgrade(engine)
+    seed.seed(engine, users=500, items=size, claims=0, notifications=0, rng_seed=args.seed)
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        matching.rebuild(conn)
+    build = time.perf_counter() - t0
+    Session = sessionmaker(bind=engine)
+
+    rng = random.Random(args.seed)
+    with Session() as s:
+        keys = s.scalar(select(func.count()).select_from(ItemMatchKey))
+        picks = s.execute(select(Item).where(Item.id.in_(rng.sample(range(1, size + 1), args.queries)))).scalars().all()
+        queries = [perturb(rng, r, seed.ADJECTIVES + seed.NOUNS) for r in picks]
+        lsh_ms, brute_ms, found, missed, top_hit, top_all = [], [], 0, 0, 0, 0
+        for q in queries:
+            t0 = time.perf_counter()
+            got = matching.matches(s, q, args.k)
+            lsh_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            best, scored = brute_force(s, q, args.k)
+            brute_ms.append((time.perf_counter() - t0) * 1000)
+            # top-k by score: ties make the ids arbitrary, so compare the scores
+            want = [score for score, _ in best if score >= matching.MIN_SCORE]
+            have = [score for score, _ in got]
+            top_all += len(want)
+            top_hit += sum(h >= w - 1e-9 for h, w in zip(have, want))
+            cand = set(matching.candidates(s, q))
+            strong = [i for score, i in scored if score >= matching.NOTIFY_SCORE]
+            found += sum(i in cand for i in strong)
+            missed += sum(i not in cand for i in strong)
+    recall = found / (found + missed) if found + missed else 1.0
+    return dict(size=size, build_s=build, keys=keys, lsh=statistics.median(lsh_ms),
+                lsh_p95=sorted(lsh_ms)[int(len(lsh_ms) * 0.95) - 1], brute=statistics.median(brute_ms),
+                top_recall=top_hit / top_all if top_all else 1.0, recall=recall)
+
+def main():
+    ap = argparse.ArgumentParser(description="match suggestions: LSH lookup vs brute force")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("-k", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    print(f"{'items':>8} {'build s':>8} {'keys':>9} {'lsh ms':>8} {'lsh p95':>8} {'brute ms':>9} "
+          f"{'speedup':>8} {'top-k':>7} {'strong':>7}")
+    for size in args.sizes:
+        r = run(size, args)
+        print(f"{r['size']:>8} {r['build_s']:>8.1f} {r['keys']:>9} {r['lsh']:>8.2f} {r['lsh_p95']:>8.2f} "
+              f"{r['brute']:>9.1f} {r['brute'] / r['lsh']:>7.0f}x {r['top_recall']:>7.1%} {r['recall']:>7.1%}")
+
+if __name__ == "__main__":
+    main()
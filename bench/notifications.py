@@ -0,0 +1,136 @@
+import argparse, os, statistics, tempfile, threading, time
+
+# ----- Notifications: a user with 100k of them -----
+# Run as `python -m bench.notifications --notifications 100000`. One user
+# gets --notifications unread notifications, then:
+#   badge      COUNT(*) of their unread rows vs reading users.unread_count
+#   old        what /notifications used to do to mark them read: load every
+#              row, set is_read one object at a time, commit the dirty set
+#   page       GET /notifications (first page; marks those 24 read)
+#   read all   POST /notifications/read: one UPDATE plus the counter
+#   up to      outbox.mark_read(up_to=<middle id>)
+#   racing     --threads writers enqueue() for the user while another thread
+#              keeps marking read
+# After each step the counter is checked against COUNT(*).
+
+def main():
+    ap = argparse.ArgumentParser(description="unread counter and mark-as-read with many notifications")
+    ap.add_argument("--notifications", type=int, default=100000)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-notifications-")
+    from sqlalchemy import select, insert, update, func, event
+    from bench import seed
+    from app import create_app
+    from models import User, Notification
+    import outbox
+
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                          UPLOAD_FOLDER=os.path.join(tmp, "uploads"), OUTBOX_WORKER="none", WTF_CSRF_ENABLED=False))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    seed.seed(web.db.engine, users=20, items=10, claims=0, notifications=0)
+    uid, n = 2, args.notifications
+
+    def fill():
+        with web.db.engine.begin() as conn:
+            conn.execute(update(Notification).values(is_read=False))
+            outbox.recount_unread(conn)
+
+    with web.db.engine.begin() as conn:
+        for i in range(0, n, 5000):
+            conn.execute(insert(Notification), [dict(user_id=uid, title="Claim Approved", body=f"Bench {j}")
+                                                for j in range(i, min(i + 5000, n))])
+        conn.execute(update(Notification).values(is_read=False))
+        outbox.recount_unread(conn)
+        conn.exec_driver_sql("ANALYZE")
+
+    def check(step):
+        with web.Session() as s:
+            counter = s.scalar(select(User.unread_count).where(User.id == uid))
+            actual = s.scalar(select(func.count()).select_from(Notification)
+                              .where(Notification.user_id == uid, Notification.is_read == False))
+        assert counter == actual, (step, counter, actual)
+        return actual
+
+    def timed(fn, repeat=1):
+        runs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            runs.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(runs)
+
+    rows = []
+    with web.Session() as s:
+        count = timed(lambda: s.scalar(select(func.count()).select_from(Notification)
+                                       .where(Notification.user_id == uid, Notification.is_read == False)), 20)
+        counter = timed(lambda: s.scalar(select(User.unread_count).where(User.id == uid)), 20)
+    rows.append(("badge COUNT(*)", count, check("badge")))
+    rows.append(("badge counter", counter, check("badge")))
+
+    def old():
+        with web.Session() as s:
+            for note in s.scalars(select(Notification).where(Notification.user_id == uid)):
+                note.is_read = True
+            s.commit()
+    rows.append(("old mark-read", timed(old), n))
+    fill()
+
+    statements = []
+    @event.listens_for(web.db.engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    client.post("/login", data=dict(email=seed.USER_EMAIL, password=seed.PASSWORD))
+    client.get("/notifications?cursor=x")      # warm the user cache and templates
+    fill()
+    del statements[:]
+    rows.append(("GET /notifications", timed(lambda: client.get("/notifications")), f"{check('page')} left, "
+                 f"{len(statements)} statements"))
+    del statements[:]
+    took = timed(lambda: client.post("/notifications/read"))
+    rows.append(("POST read all", took, f"{check('read all')} left, {len(statements)} statements"))
+    event.remove(web.db.engine, "before_cursor_execute", capture)
+
+    fill()
+    with web.Session() as s:
+        middle = s.scalar(select(func.min(Notification.id)).where(Notification.user_id == uid)) + n // 2
+        def up_to():
+            outbox.mark_read(s, uid, up_to=middle)
+            s.commit()
+        rows.append(("mark_read(up_to)", timed(up_to), f"{check('up to')} left"))
+
+    stop = threading.Event()
+    def writer():
+        for _ in range(250):
+            with web.db.sessionmaker() as s:
+                outbox.enqueue(s, [uid, 3], "Bench", "race")
+                s.commit()
+    def reader():
+        while not stop.is_set():
+            with web.db.sessionmaker() as s:
+                outbox.mark_read(s, uid)
+                s.commit()
+    threads = [threading.Thread(target=writer) for _ in range(args.threads)]
+    marker = threading.Thread(target=reader)
+    t0 = time.perf_counter()
+    marker.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    marker.join()
+    rows.append(("racing", (time.perf_counter() - t0) * 1000,
+                 f"{args.threads * 250} enqueued, {check('racing')} left, counter matches"))
+
+    print(f"{n} notifications for one user")
+    print(f"{'step':<20} {'ms':>10}  result")
+    for step, ms, result in rows:
+        print(f"{step:<20} {ms:>10.2f}  {result}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse, os, sys, tempfile
+from collections import Counter
+
+# ----- SQL round-trips per page (fails if a page goes over its budget) -----
+# Run as `python -m bench.queries`. Each page is requested twice; the budget
+# applies to the second (warm) request, when the user row and the unread
+# badge should come from cache and only the route's own queries remain.
+
+BUDGETS = {
+    "/": 0,                       # stats, recent items and categories all cached
+    "/browse": 1,                 # one page of items (categories cached)
+    "/browse?q=backpack": 1,
+    "/item/1": 1,
+    "/dashboard": 2,
+    "/notifications": 1,          # one page; already read on the first visit, so no UPDATE and the badge stays cached
+    "/admin": 1,                  # outbox depth (totals and latest items cached)
+    "/admin/items": 1,
+    "/admin/claims": 1,
+    "/admin/users": 1,
+    "/admin/categories": 1,
+    "/admin/trends": 4,           # rollup tables only: items and claims per day, categories, locations
+}
+
+WRITES = [
+    ("/admin/items/1/status", {"status": "returned"}),   # rollup upserts (rollups.py)
+    ("/admin/items/1/status", {"status": "found"}),
+]
+
+def main():
+    ap = argparse.ArgumentParser(description="per-page SQL query budgets")
+    ap.add_argument("--items", type=int, default=60)
+    ap.add_argument("--split-reads", action="store_true", help="run with DB_SPLIT_READS=1 (read-only reader engine)")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    if args.split_reads:
+        os.environ["DB_SPLIT_READS"] = "1"
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from werkzeug.security import generate_password_hash
+    from datetime import datetime
+    from app import create_app
+    from models import User, Roles, Item, ItemStatus
+
+    app = create_app(dict(WTF_CSRF_ENABLED=False))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    with web.Session() as s:
+        s.add(User(name="Admin", email="admin@minnstate.edu", role=Roles.ADMIN,
+                   password_hash=generate_password_hash("bench-pass")))
+        for i in range(args.items):
+            s.add(Item(name=f"Blue backpack {i}", description="bench", category_id=1 + i % 5,
+                       location_found="Library", date_found=datetime(2025, 1, 1), photo_path="",
+                       reported_by=1, status=ItemStatus.FOUND))
+        s.commit()
+
+    counter = Counter()
+    @event.listens_for(Engine, "before_cursor_execute")   # writer and, with --split-reads, the reader
+    def count(*_):
+        counter["q"] += 1
+
+    client = app.test_client()
+    client.post("/login", data=dict(email="admin@minnstate.edu", password="bench-pass"))
+    failed = False
+    print(f"{'page':<22} {'cold':>5} {'warm':>5} {'budget':>7}")
+    for url, budget in BUDGETS.items():
+        seen = []
+        for _ in range(2):
+            counter.clear()
+            r = client.get(url)
+            assert r.status_code == 200, (url, r.status_code)
+            seen.append(counter["q"])
+        ok = seen[1] <= budget
+        failed |= not ok
+        print(f"{url:<22} {seen[0]:>5} {seen[1]:>5} {budget:>7}{'' if ok else '  OVER BUDGET'}")
+    # the write paths must land on the writer engine (with --split-reads the
+    # reader is read-only, so a misrouted statement fails the request)
+    for url, form in WRITES:
+        r = client.post(url, data=form)
+        ok = r.status_code < 400
+        failed |= not ok
+        print(f"POST {url:<30} {r.status_code}{'' if ok else '  FAILED'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse, os, re, sys, tempfile
+from datetime import datetime, timedelta
+
+# ----- EXPLAIN QUERY PLAN guard for every statement the pages issue -----
+# Drives the main pages through the test client, captures each distinct SQL
+# statement with its parameters, and asks SQLite how it would run it. A bare
+# "SCAN <hot table>" (a full table scan, not an index walk) fails the run, so
+# a dropped index or a new unindexed query shows up here. Temp B-trees for
+# ORDER BY are reported as warnings.
+
+HOT_TABLES = ("items", "claims", "notifications", "users", "outbox")
+FULL_SCAN = re.compile(r"^SCAN (%s)(?: AS \w+)?$" % "|".join(HOT_TABLES))
+
+PAGES = [
+    "/", "/browse", "/browse?sort=date_asc", "/browse?sort=category", "/browse?category=2",
+    "/browse?q=backpack", "/item/5", "/item/5/matches", "/dashboard", "/notifications",
+    "/admin", "/admin/items", "/admin/claims", "/admin/users", "/admin/trends",
+]
+
+def main():
+    ap = argparse.ArgumentParser(description="fail on full scans of hot tables")
+    ap.add_argument("--items", type=int, default=2000)
+    ap.add_argument("--analyze", action="store_true", help="run ANALYZE after seeding")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["CACHE_BACKEND"] = "none"
+    from sqlalchemy import event, insert, text
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from models import User, Roles, Item, Claim, Notification
+    import matching
+
+    app = create_app(dict(WTF_CSRF_ENABLED=False))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    start = datetime(2024, 1, 1)
+    with web.db.engine.begin() as conn:
+        conn.execute(insert(User), [dict(name=f"U{i}", email=f"u{i}@go.minnstate.edu",
+                                          password_hash=generate_password_hash("bench-pass"),
+                                          role=Roles.ADMIN if i == 0 else Roles.USER)
+                                     for i in range(50)])
+        conn.execute(insert(Item), [dict(name=f"Blue backpack {i}", description="bench", category_id=1 + i % 5,
+                                          location_found="Library", date_found=start + timedelta(hours=i),
+                                          photo_path="", reported_by=1 + i % 50, status="found",
+                                          created_at=start + timedelta(hours=i))
+                                     for i in range(args.items)])
+        conn.execute(insert(Claim), [dict(item_id=1 + i, claimer_id=1 + i % 50, message="mine")
+                                      for i in range(args.items // 4)])
+        conn.execute(insert(Notification), [dict(user_id=1 + i % 50, title="t", body="b")
+                                             for i in range(args.items)])
+        matching.rebuild(conn)
+        if args.analyze:
+            conn.execute(text("ANALYZE"))
+
+    seen = {}
+    @event.listens_for(web.db.engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            seen.setdefault(statement, parameters)
+
+    client = app.test_client()
+    client.post("/login", data=dict(email="u0@go.minnstate.edu", password="bench-pass"))
+    for url in PAGES:
+        assert client.get(url).status_code == 200, url
+
+    failures = warnings = 0
+    raw = web.db.engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for statement, params in seen.items():
+            plan = [row[3] for row in cur.execute("EXPLAIN QUERY PLAN " + statement, params)]
+            bad = [p for p in plan if FULL_SCAN.match(p.strip())]
+            temp = [p for p in plan if "TEMP B-TREE" in p]
+            failures += bool(bad)
+            warnings += bool(temp)
+            if bad or temp:
+                print(("FULL SCAN" if bad else "warning") + ": " + " ".join(statement.split())[:160])
+                for p in plan:
+                    print("    " + p)
+    finally:
+        raw.close()
+    print(f"{len(seen)} statements checked, {failures} full scans, {warnings} temp b-trees")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse, os, statistics, tempfile, time
+from datetime import datetime
+
+# ----- Retention: archive run throughput and the hot tables before/after -----
+# Run as `python -m bench.retention --items 100000 --notifications 200000`.
+# Seeds a database (items dated over the year before 2025-06-01, ~30% of
+# them claimed or returned; 70% of notifications read), times a few hot
+# queries, runs retention.run() with --statuses archived after --days and
+# read notifications after 30 days (as of 2025-06-01), then maintain()
+# (ANALYZE, FTS merge, VACUUM), and times the same queries again.
+
+def hot_queries(web):
+    import search
+    from sqlalchemy import select, func
+    from models import Item, ItemStatus, Notification
+    from pagination import paginate
+
+    def stats(s):
+        for st in (ItemStatus.RETURNED, ItemStatus.CLAIMED):
+            s.scalar(select(func.count()).where(Item.status == st))
+        s.scalar(select(func.count(Item.id)))
+
+    def browse(s):
+        q, order = search.listing("", -1, "date_desc", web.fts)
+        paginate(s, q, order, None, 24)
+
+    def search_page(s):
+        q, order = search.listing("backpack", -1, "relevance", web.fts)
+        paginate(s, q, order, None, 24)
+
+    def notifications(s):
+        paginate(s, select(Notification).where(Notification.user_id == 2),
+                 [(Notification.created_at, True), (Notification.id, True)], None, 24)
+
+    return dict(stats=stats, browse=browse, search=search_page, notifications=notifications)
+
+def time_queries(web, repeat=20):
+    out = {}
+    for name, fn in hot_queries(web).items():
+        runs = []
+        for _ in range(repeat):
+            with web.Session() as s:
+                t0 = time.perf_counter()
+                fn(s)
+                runs.append((time.perf_counter() - t0) * 1000)
+        out[name] = statistics.median(runs)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="retention run throughput and hot-query times before/after")
+    ap.add_argument("--items", type=int, default=100000)
+    ap.add_argument("--notifications", type=int, default=200000)
+    ap.add_argument("--statuses", nargs="+", default=["returned", "claimed"])
+    ap.add_argument("--days", type=int, default=90)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-retention-")
+    path = os.path.join(tmp, "bench.db")
+    from sqlalchemy import update, select, func
+    from bench import seed
+    from app import create_app
+    from models import Item, Notification, ArchivedItem, ArchivedNotification
+    import retention
+
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}", UPLOAD_FOLDER=os.path.join(tmp, "uploads"),
+                          OUTBOX_WORKER="none"))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    seed.seed(web.db.engine, users=500, items=args.items, claims=args.items // 5,
+              notifications=args.notifications)
+    with web.db.engine.begin() as conn:
+        conn.execute(update(Item).values(updated_at=Item.created_at))   # seeded rows "last changed" when filed
+    retention.maintain(web.db.engine, vacuum=False)
+    now = datetime(2025, 6, 1)
+    policy = dict(items={st: args.days for st in args.statuses}, notification_days=30)
+
+    before, size_before = time_queries(web), os.path.getsize(path)
+    print("to archive:", retention.pending(web.db.engine, now=now, **policy))
+    t0 = time.perf_counter()
+    done = retention.run(web.db.engine, batch=500, pause=0, now=now, **policy)
+    took = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    steps = retention.maintain(web.db.engine)
+    maint = time.perf_counter() - t0
+    after, size_after = time_queries(web), os.path.getsize(path)
+
+    rows = done["items"] + done["claims"] + done["notifications"]
+    print(f"archived {done['items']} items, {done['claims']} claims, {done['notifications']} notifications "
+          f"in {done['batches']} batches: {took:.1f} s ({rows / took:.0f} rows/s)")
+    print(f"maintenance {maint:.1f} s: {', '.join(steps)}")
+    print(f"database file {size_before / 1048576:.1f} -> {size_after / 1048576:.1f} MiB")
+    with web.Session() as s:
+        print("hot / archive rows: items", s.scalar(select(func.count()).select_from(Item)), "/",
+              s.scalar(select(func.count()).select_from(ArchivedItem)), "- notifications",
+              s.scalar(select(func.count()).select_from(Notification)), "/",
+              s.scalar(select(func.count()).select_from(ArchivedNotification)))
+    print(f"{'query':<14} {'before ms':>10} {'after ms':>10}")
+    for name in before:
+        print(f"{name:<14} {before[name]:>10.2f} {after[name]:>10.2f}")
+
+if __name__ == "__main__":
+    main()
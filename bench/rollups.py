@@ -0,0 +1,134 @@
+import argparse, os, statistics, tempfile, time
+from datetime import date, datetime, timedelta
+
+# ----- /admin/trends: daily rollups vs aggregating the hot tables -----
+# Run as `python -m bench.rollups --sizes 10000 100000`. For each size a
+# database is seeded (claims = a fifth of the items; returned items get an
+# updated_at 0-39 days after they were reported), the rollups are rebuilt,
+# and the trends for --weeks weeks up to 2025-06-01 are computed two ways:
+#   rollups  rollups.trends(), what /admin/trends runs
+#   live     the same numbers from GROUP BYs over items and claims
+# The two are checked to agree. Also reported: the rebuild time, and what
+# the rollup upsert adds to a report()-style insert + commit.
+
+WEEKS_START = date(2025, 6, 1)
+
+def live(s, weeks, today):
+    """rollups.trends() computed from items and claims directly."""
+    from sqlalchemy import select, func, case
+    from models import Category, Item, ItemStatus, Claim, ClaimStatus
+    import rollups
+    start = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+    since = datetime.combine(start, datetime.min.time())
+    by_week = {start + timedelta(weeks=i): dict(reported=0, returned=0, submitted=0, approved=0, rejected=0)
+               for i in range(weeks)}
+
+    def add(day, **counts):
+        row = by_week.get(day - timedelta(days=day.weekday()))
+        if row is not None:
+            for k, n in counts.items():
+                row[k] += n
+
+    day = func.date(Item.date_found)
+    for d, n in s.execute(select(day, func.count()).where(Item.date_found >= since).group_by(day)):
+        add(date.fromisoformat(d), reported=n)
+    day = func.date(Item.updated_at)
+    returned = (Item.status == ItemStatus.RETURNED, Item.updated_at >= since)
+    for d, n in s.execute(select(day, func.count()).where(*returned).group_by(day)):
+        add(date.fromisoformat(d), returned=n)
+    day = func.date(Claim.created_at)
+    for d, n, a, r in s.execute(
+        select(day, func.count(), func.sum(case((Claim.status == ClaimStatus.APPROVED, 1), else_=0)),
+               func.sum(case((Claim.status == ClaimStatus.REJECTED, 1), else_=0)))
+        .where(Claim.created_at >= since).group_by(day)
+    ):
+        add(date.fromisoformat(d), submitted=n, approved=a, rejected=r)
+    found = dict(s.execute(select(Item.category_id, func.count()).where(Item.date_found >= since)
+                           .group_by(Item.category_id)).all())
+    waits = {cid: (n, secs) for cid, n, secs in s.execute(
+        select(Item.category_id, func.count(),
+               func.sum((func.julianday(Item.updated_at) - func.julianday(Item.created_at)) * 86400))
+        .where(*returned).group_by(Item.category_id))}
+    names = dict(s.execute(select(Category.id, Category.name)).all())
+    categories = sorted(
+        (dict(name=names.get(cid, "(none)"), reported=found.get(cid, 0), returned=waits.get(cid, (0, 0))[0])
+         for cid in set(found) | set(waits)), key=lambda c: c["name"])
+    counts = {}
+    for loc, n in s.execute(select(Item.location_found, func.count()).where(Item.date_found >= since)
+                            .group_by(Item.location_found)):
+        key = rollups.location_key(loc)
+        counts[key] = counts.get(key, 0) + n
+    locations = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:rollups.TOP_LOCATIONS]
+    return dict(by_week=[dict(row, week=w) for w, row in by_week.items()], categories=categories,
+                locations=locations)
+
+def timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        runs.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(runs), result
+
+def run(size, weeks, repeat):
+    from sqlalchemy import text
+    from bench import seed
+    from app import create_app
+    from models import Item, ItemStatus
+    import rollups
+
+    tmp = tempfile.mkdtemp(prefix="bench-rollups-")
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                          UPLOAD_FOLDER=os.path.join(tmp, "uploads"), OUTBOX_WORKER="none"))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    seed.seed(web.db.engine, users=500, items=size, claims=size // 5, notifications=0)
+    with web.db.engine.begin() as conn:
+        conn.execute(text("UPDATE items SET updated_at = datetime(created_at, '+' || (id % 40) || ' days') "
+                          "WHERE status = 'returned'"))
+        t0 = time.perf_counter()
+        written = rollups.rebuild(conn)
+        rebuild = time.perf_counter() - t0
+        conn.execute(text("ANALYZE"))
+
+    with web.Session() as s:
+        fast, got = timed(lambda: rollups.trends(s, weeks, WEEKS_START), repeat)
+        slow, want = timed(lambda: live(s, weeks, WEEKS_START), repeat)
+    for a, b in zip(got["by_week"], want["by_week"]):
+        assert all(a[k] == b[k] for k in b), (a, b)
+    assert [(c["name"], c["reported"], c["returned"]) for c in got["categories"]] == \
+        [(c["name"], c["reported"], c["returned"]) for c in want["categories"]]
+    assert [tuple(r) for r in got["locations"]] == want["locations"]
+
+    # report()-style write: one item per transaction, with and without the rollup upsert
+    def report(with_rollups):
+        def write():
+            with web.Session() as s:
+                item = Item(name="Bench umbrella", description="bench", category_id=1, location_found="Library",
+                            date_found=datetime(2025, 5, 30), photo_path="", reported_by=2, status=ItemStatus.FOUND)
+                s.add(item)
+                s.flush()
+                if with_rollups:
+                    rollups.reported(s, [item])
+                s.commit()
+        return write
+    plain, _ = timed(report(False), 200)
+    counted, _ = timed(report(True), 200)
+    return dict(rows=sum(written.values()), rebuild=rebuild, fast=fast, slow=slow, plain=plain, counted=counted)
+
+def main():
+    ap = argparse.ArgumentParser(description="admin trends from rollups vs on-the-fly GROUP BYs")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--weeks", type=int, default=52)
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    print(f"{'items':>8} {'rollup rows':>12} {'rebuild s':>10} {'rollups ms':>11} {'live ms':>9} "
+          f"{'insert ms':>10} {'+rollup ms':>11}")
+    for size in args.sizes:
+        r = run(size, args.weeks, args.repeat)
+        print(f"{size:>8} {r['rows']:>12} {r['rebuild']:>10.1f} {r['fast']:>11.2f} {r['slow']:>9.1f} "
+              f"{r['plain']:>10.2f} {r['counted']:>11.2f}")
+
+if __name__ == "__main__":
+    main()
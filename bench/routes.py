@@ -0,0 +1,409 @@
+import argparse, io, json, os, platform, re, resource, subprocess, sys, tempfile, time
+import http.cookiejar, urllib.error, urllib.parse, urllib.request
+from collections import Counter
+from bench import seed
+
+# ----- Latency, throughput, SQL and memory for every route -----
+# Seeds a throwaway database (bench/seed.py), then requests each route in
+# ROUTES --requests times through the Flask test client and prints
+# p50/p95/p99 latency, requests/s, SQL statements per request and the peak
+# RSS of the process after the route has run. --out writes the numbers as
+# JSON; --compare prints the change against an earlier --out file.
+#
+#   python -m bench.routes --items 20000 --requests 200 --out before.json
+#   python -m bench.routes --items 20000 --requests 200 --compare before.json
+#
+# With --url the same routes are sent over HTTP to a running server by
+# --procs processes. Seed the server's database first (python -m bench.seed)
+# and export its DATABASE_URL here too, so ids can be looked up. SQL counts
+# aren't visible from outside; --server-pid reports the server's peak RSS.
+
+# (name, role, method, path, form). Paths and forms are filled from the
+# context built by context() and the iteration number `i`, so writes hit a
+# different row each time ({word:.3} is a word's first three letters).
+# Redirects are not followed.
+ROUTES = [
+    ("home", "anon", "GET", "/", None),
+    ("login form", "anon", "GET", "/login", None),
+    ("register form", "anon", "GET", "/register", None),
+    ("item", "anon", "GET", "/item/{item}", None),
+    ("upload", "anon", "GET", "/uploads/{upload}", None),
+    ("browse", "user", "GET", "/browse", None),
+    ("browse page 2", "user", "GET", "/browse?cursor={cursor}", None),
+    ("browse oldest", "user", "GET", "/browse?sort=date_asc", None),
+    ("browse by category", "user", "GET", "/browse?sort=category", None),
+    ("browse one category", "user", "GET", "/browse?category={category}", None),
+    ("browse search", "user", "GET", "/browse?q={word}&sort=relevance", None),
+    ("browse search+category", "user", "GET", "/browse?q={word}&category={category}&sort=date_desc", None),
+    ("browse suggest", "user", "GET", "/browse/suggest?q={word:.3}", None),
+    ("dashboard", "user", "GET", "/dashboard", None),
+    ("notifications", "user", "GET", "/notifications", None),
+    ("notifications read", "user", "POST", "/notifications/read", None),
+    ("report form", "user", "GET", "/report", None),
+    ("report", "user", "POST", "/report", "report"),
+    ("claim", "user", "POST", "/claim/{found}", {"message": "That's mine"}),
+    ("api items", "user", "GET", "/api/v1/items", None),
+    ("api items search", "user", "GET", "/api/v1/items?q={word}&fields=id,name,status", None),
+    ("api item", "anon", "GET", "/api/v1/items/{item}", None),
+    ("api categories", "anon", "GET", "/api/v1/categories", None),
+    ("api claims", "user", "GET", "/api/v1/claims", None),
+    ("api notifications", "user", "GET", "/api/v1/notifications", None),
+    ("admin", "admin", "GET", "/admin", None),
+    ("admin items", "admin", "GET", "/admin/items", None),
+    ("admin claims", "admin", "GET", "/admin/claims", None),
+    ("admin users", "admin", "GET", "/admin/users", None),
+    ("admin categories", "admin", "GET", "/admin/categories", None),
+    ("admin perf", "admin", "GET", "/admin/perf", None),
+    ("admin trends", "admin", "GET", "/admin/trends", None),
+    ("admin item returned", "admin", "POST", "/admin/items/{item}/status", {"status": "returned"}),
+    ("admin item status", "admin", "POST", "/admin/items/{item}/status", {"status": "found"}),
+    ("admin reject claim", "admin", "POST", "/admin/claims/{pending}/reject", None),
+    ("admin batch reject", "admin", "POST", "/admin/claims/batch", "batch"),
+    ("admin user flags", "admin", "POST", "/admin/users/{user}/activate", None),
+    ("admin add category", "admin", "POST", "/admin/categories", {"name": "Bench {run}-{n}"}),
+    ("admin export items", "admin", "GET", "/admin/export/items.csv", None),
+    ("admin import items", "admin", "POST", "/admin/import", "import"),
+    ("login", "login", "POST", "/login", "login"),
+    ("logout", "login", "GET", "/logout", None),
+]
+WORDS = ["backpack", "wallet", "phone", "blue", "charger", "jacket", "keys", "silver"]
+BATCH = 10    # claims per "admin batch reject", taken from the far end of the pending queue
+IMPORT_ROWS = 50   # items per "admin import items" upload
+
+def claim_batch(ctx, i):
+    ids = ctx["pending"][::-1][i * BATCH:(i + 1) * BATCH] or ctx["pending"][:BATCH]
+    return dict(claim_ids=[str(c) for c in ids], action="reject")
+
+def sample_photo():
+    try:
+        from PIL import Image
+    except ImportError:   # any bytes will do; without Pillow uploads are stored as-is
+        return b"\xff\xd8\xff\xe0" + bytes(4096) + b"\xff\xd9"
+    buf = io.BytesIO()
+    Image.new("RGB", (1600, 1200), (75, 46, 131)).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+def context(session_factory, upload_dir):
+    """Ids the routes cycle through, looked up in the seeded database."""
+    from sqlalchemy import select
+    from models import User, Roles, Category, Item, ItemStatus, Claim, ClaimStatus
+    import images
+    with session_factory() as s:
+        ctx = dict(
+            item=s.scalars(select(Item.id).order_by(Item.id).limit(500)).all(),
+            found=s.scalars(select(Item.id).where(Item.status == ItemStatus.FOUND)
+                            .order_by(Item.id.desc()).limit(5000)).all(),
+            pending=s.scalars(select(Claim.id).where(Claim.status == ClaimStatus.PENDING)
+                              .order_by(Claim.id).limit(5000)).all(),
+            user=s.scalars(select(User.id).where(User.role == Roles.USER).order_by(User.id).limit(500)).all(),
+            category=s.scalars(select(Category.id).order_by(Category.id)).all(),
+        )
+    photo = sample_photo()
+    name = images.content_hash(photo) + ".jpg"
+    with open(os.path.join(upload_dir, name), "wb") as f:
+        f.write(photo)
+    rows = ["name,description,category,location_found,date_found,status"]
+    cats = ctx["category"]
+    rows += [f"Bench {WORDS[n % len(WORDS)]} {n},Imported by bench.routes,{cats[n % len(cats)]},Library,2025-05-01,found"
+             for n in range(IMPORT_ROWS)]
+    ctx.update(upload=[name], word=WORDS, photo=photo, cursor=[""], run=os.urandom(3).hex(),
+               csv=("\n".join(rows) + "\n").encode())
+    return ctx
+
+def fill(route, ctx, i):
+    name, role, method, path, form = route
+    pick = lambda k: ctx[k][i % len(ctx[k])] if ctx[k] else 0
+    keys = dict(item=pick("item"), found=pick("found"), pending=pick("pending"), user=pick("user"),
+                category=pick("category"), upload=pick("upload"), word=pick("word"), cursor=pick("cursor"), run=ctx["run"], n=i)
+    path = path.format(**keys)
+    if isinstance(form, dict):
+        form = {k: v.format(**keys) for k, v in form.items()}
+    return method, path, form
+
+def percentile(sorted_ms, p):
+    if not sorted_ms:
+        return None
+    k = max(0, min(len(sorted_ms) - 1, round(p / 100 * len(sorted_ms) + 0.5) - 1))
+    return round(sorted_ms[k], 2)
+
+def peak_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss   # bytes on macOS, KiB on Linux
+
+def summarize(latencies, errors, sql=None, rss=None, rps=None):
+    """rps defaults to one client's rate: requests / time spent in them."""
+    ms = sorted(latencies)
+    return {
+        "requests": len(ms), "errors": errors,
+        "p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95), "p99_ms": percentile(ms, 99),
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else None,
+        "rps": rps if rps is not None else round(len(ms) * 1000 / sum(ms), 1) if ms else None,
+        "sql_per_request": round(sum(sql) / len(sql), 2) if sql else None,
+        "sql_max": max(sql) if sql else None,
+        "peak_rss_kb": rss,
+    }
+
+# ----- In-process driver (Flask test client) -----
+
+def run_local(args):
+    tmp = tempfile.mkdtemp(prefix="bench-routes-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(tmp, "uploads")
+    os.environ.setdefault("CACHE_BACKEND", "memory")
+    os.environ.setdefault("OUTBOX_WORKER", "none")
+    if args.split_reads:
+        os.environ["DB_SPLIT_READS"] = "1"
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import create_app
+
+    app = create_app(dict(WTF_CSRF_ENABLED=False))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    web.photos.originals_dir = os.path.join(tmp, "originals")
+    counts = seed.seed(web.db.engine, args.users, args.items, args.claims, args.notifications, rng_seed=args.seed)
+    web.cache.clear()
+    ctx = context(web.Session.session_factory, app.config["UPLOAD_FOLDER"])
+
+    sql = Counter()
+    @event.listens_for(Engine, "before_cursor_execute")   # every engine, incl. the read replica
+    def count(*_):
+        sql["n"] += 1
+
+    clients = {"anon": app.test_client(), "login": app.test_client()}
+    for role, email in (("user", seed.USER_EMAIL), ("admin", seed.ADMIN_EMAIL)):
+        clients[role] = app.test_client()
+        clients[role].post("/login", data=dict(email=email, password=seed.PASSWORD))
+    login_form = dict(email=seed.USER_EMAIL, password=seed.PASSWORD)
+    m = re.search(r'[?&]cursor=([^"&]+)', clients["user"].get("/browse").get_data(as_text=True))
+    ctx["cursor"] = [m.group(1) if m else ""]
+
+    results = {}
+    for route in selected(args.only):
+        name, role, _, _, form = route
+        client = clients[role]
+        latencies, queries, errors = [], [], 0
+        for i in range(args.warmup + args.requests):
+            method, path, data = fill(route, ctx, i)
+            if form == "report":
+                data = dict(name="Bench umbrella", description="Left on a bench", category=str(ctx["category"][0]),
+                            location_found="Library", date_found="2025-05-01",
+                            photo=(io.BytesIO(ctx["photo"]), "photo.jpg"))
+            elif form == "login":
+                data = login_form
+            elif form == "batch":
+                data = claim_batch(ctx, i)
+            elif form == "import":
+                data = dict(kind="items", file=(io.BytesIO(ctx["csv"]), "items.csv"))
+            if role == "login" and method == "GET":   # /logout needs a session to end
+                client.post("/login", data=login_form)
+            sql.clear()
+            t0 = time.perf_counter()
+            r = client.open(path, method=method, data=data, buffered=True)   # streamed exports read in full
+            elapsed = (time.perf_counter() - t0) * 1000
+            r.close()
+            if i < args.warmup:
+                continue
+            latencies.append(elapsed)
+            queries.append(sql["n"])
+            errors += r.status_code >= 400
+        results[name] = dict(method=route[2], path=route[3],
+                             **summarize(latencies, errors, queries, peak_rss_kb()))
+    return dict(driver="test-client", dataset=counts), results
+
+def selected(only):
+    return [r for r in ROUTES if not only or any(o in r[0] for o in only)]
+
+# ----- HTTP driver (N processes against a running server) -----
+
+def _multipart(fields, files):
+    boundary = "bench" + os.urandom(8).hex()
+    out = io.BytesIO()
+    for k, v in fields.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode())
+    for k, (filename, data) in files.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"; filename="{filename}"\r\n'
+                  f'Content-Type: image/jpeg\r\n\r\n'.encode() + data + b"\r\n")
+    out.write(f"--{boundary}--\r\n".encode())
+    return out.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *a, **kw):
+        return None
+
+class HttpClient:
+    def __init__(self, base):
+        self.base = base.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+        self.csrf = None
+
+    def request(self, method, path, form=None, files=None):
+        headers, body = {}, None
+        if method == "POST":
+            if self.csrf is None:
+                html = self.request("GET", "/login")[1]
+                m = re.search(r'name="csrf_token"[^>]*value="([^"]+)"', html)
+                self.csrf = m.group(1) if m else ""
+            fields = dict(form or {}, csrf_token=self.csrf)
+            if files:
+                body, headers["Content-Type"] = _multipart(fields, files)
+            else:
+                body = urllib.parse.urlencode(fields, doseq=True).encode()
+        req = urllib.request.Request(self.base + path, data=body, method=method, headers=headers)
+        try:
+            with self.opener.open(req, timeout=30) as r:
+                return r.status, r.read().decode("utf-8", "replace")
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, ""
+
+    def login(self, email):
+        return self.request("POST", "/login", dict(email=email, password=seed.PASSWORD))[0] < 400
+
+_http = {}
+
+def _http_init(base, ctx):
+    _http["ctx"] = ctx
+    _http["clients"] = {"anon": HttpClient(base), "login": HttpClient(base)}
+    for role, email in (("user", seed.USER_EMAIL), ("admin", seed.ADMIN_EMAIL)):
+        _http["clients"][role] = HttpClient(base)
+        _http["clients"][role].login(email)
+
+def _http_batch(job):
+    index, start, count = job
+    route, ctx = ROUTES[index], _http["ctx"]
+    client = _http["clients"][route[1]]
+    latencies, errors = [], 0
+    for i in range(start, start + count):
+        method, path, form = fill(route, ctx, i)
+        files = None
+        if route[4] == "report":
+            form = dict(name="Bench umbrella", description="Left on a bench", category=ctx["category"][0],
+                        location_found="Library", date_found="2025-05-01")
+            files = {"photo": ("photo.jpg", ctx["photo"])}
+        elif route[4] == "login":
+            form = dict(email=seed.USER_EMAIL, password=seed.PASSWORD)
+        elif route[4] == "batch":
+            form = claim_batch(ctx, i)
+        elif route[4] == "import":
+            form, files = dict(kind="items"), {"file": ("items.csv", ctx["csv"])}
+        if route[1] == "login" and method == "GET":
+            client.login(seed.USER_EMAIL)
+        t0 = time.perf_counter()
+        status, _ = client.request(method, path, form, files)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        errors += status >= 400
+    return latencies, errors
+
+def server_rss_kb(pids):
+    peak = None
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                hwm = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        except (OSError, StopIteration):
+            continue
+        peak = max(peak or 0, hwm)
+    return peak
+
+def run_http(args):
+    import multiprocessing as mp
+    import db
+    from config import Config
+    cfg = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    factory, _, _ = db.make_sessionmaker(cfg)
+    upload_dir = tempfile.mkdtemp(prefix="bench-upload-")
+    ctx = context(factory, upload_dir)
+    ctx["upload"] = []    # the server's upload folder isn't ours; skip unless given
+    if args.upload:
+        ctx["upload"] = [args.upload]
+    probe = HttpClient(args.url)
+    probe.login(seed.USER_EMAIL)
+    m = re.search(r'[?&]cursor=([^"&]+)', probe.request("GET", "/browse")[1])
+    ctx["cursor"] = [m.group(1) if m else ""]
+
+    results = {}
+    with mp.Pool(args.procs, initializer=_http_init, initargs=(args.url, ctx)) as pool:
+        for route in selected(args.only):
+            if route[0] == "upload" and not ctx["upload"]:
+                continue
+            index = ROUTES.index(route)
+            # each process gets its own range of i, so no two write the same row
+            if args.warmup:
+                pool.map(_http_batch, [(index, p * args.warmup, args.warmup) for p in range(args.procs)])
+            per = max(1, args.requests // args.procs)
+            base = args.procs * args.warmup
+            out = pool.map(_http_batch, [(index, base + p * per, per) for p in range(args.procs)])
+            latencies = [ms for lat, _ in out for ms in lat]
+            # processes run side by side: throughput is the sum of their rates
+            rps = round(sum(len(lat) * 1000 / sum(lat) for lat, _ in out if lat), 1)
+            results[route[0]] = dict(method=route[2], path=route[3],
+                                     **summarize(latencies, sum(e for _, e in out),
+                                                 rss=server_rss_kb(args.server_pid), rps=rps))
+    return dict(driver="http", url=args.url, procs=args.procs), results
+
+# ----- Report -----
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_table(results):
+    print(f"{'route':<24} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'sql':>6} {'rss MiB':>8} {'err':>4}")
+    fmt = lambda v, spec: format(v, spec) if v is not None else format("-", ">" + spec.split(".")[0])
+    for name, r in results.items():
+        print(f"{name:<24} {fmt(r['p50_ms'], '8.2f')} {fmt(r['p95_ms'], '8.2f')} {fmt(r['p99_ms'], '8.2f')} "
+              f"{fmt(r['rps'], '8.1f')} {fmt(r['sql_per_request'], '6.1f')} "
+              f"{fmt(r['peak_rss_kb'] and r['peak_rss_kb'] / 1024, '8.1f')} {r['errors']:>4}")
+
+def print_compare(results, path):
+    with open(path) as f:
+        before = json.load(f)["routes"]
+    print(f"\nchange vs {path}")
+    print(f"{'route':<24} {'p50':>8} {'p95':>8} {'req/s':>8} {'sql':>7}")
+    pct = lambda new, old: f"{(new - old) / old * 100:+7.1f}%" if new is not None and old else "       -"
+    for name, r in results.items():
+        b = before.get(name)
+        if not b:
+            continue
+        dsql = (r["sql_per_request"] - b["sql_per_request"]
+                if r["sql_per_request"] is not None and b["sql_per_request"] is not None else None)
+        print(f"{name:<24} {pct(r['p50_ms'], b['p50_ms'])} {pct(r['p95_ms'], b['p95_ms'])} "
+              f"{pct(r['rps'], b['rps'])} {'-' if dsql is None else format(dsql, '+7.1f')}")
+
+def main():
+    ap = argparse.ArgumentParser(description="per-route latency, throughput, SQL count and peak RSS")
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--items", type=int, default=5000)
+    ap.add_argument("--claims", type=int, default=1000)
+    ap.add_argument("--notifications", type=int, default=5000)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--requests", type=int, default=100, help="timed requests per route")
+    ap.add_argument("--warmup", type=int, default=5, help="untimed requests per route first")
+    ap.add_argument("--only", nargs="*", help="run routes whose name contains any of these")
+    ap.add_argument("--out", help="write results as JSON")
+    ap.add_argument("--compare", help="JSON from an earlier --out to diff against")
+    ap.add_argument("--split-reads", action="store_true", help="DB_SPLIT_READS=1: reads on a read-only engine")
+    ap.add_argument("--url", help="drive a running server over HTTP instead of the test client")
+    ap.add_argument("--procs", type=int, default=4, help="client processes for --url")
+    ap.add_argument("--server-pid", type=int, nargs="*", default=[], help="server pids for peak RSS (--url)")
+    ap.add_argument("--upload", help="an existing file name under the server's UPLOAD_FOLDER (--url)")
+    args = ap.parse_args()
+
+    meta, results = run_http(args) if args.url else run_local(args)
+    meta.update(git=git_rev(), python=platform.python_version(), when=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                requests=args.requests, warmup=args.warmup)
+    print_table(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"meta": meta, "routes": results}, f, indent=2)
+    if args.compare:
+        print_compare(results, args.compare)
+    sys.exit(1 if any(r["errors"] for r in results.values()) else 0)
+
+if __name__ == "__main__":
+    main()
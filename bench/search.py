@@ -0,0 +1,78 @@
+import argparse, os, random, statistics, tempfile, time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select, insert
+from sqlalchemy.orm import Session
+from models import Base, Category, Item, User
+import search
+
+# ----- Indexed (FTS5) search vs the old three-column ILIKE scan -----
+
+NOUNS = ["backpack", "wallet", "phone", "charger", "laptop", "jacket", "hoodie", "umbrella",
+         "calculator", "keys", "headphones", "water bottle", "notebook", "textbook", "id card",
+         "glasses", "scarf", "mittens", "earbuds", "watch", "ring", "usb drive", "tablet"]
+COLORS = ["black", "blue", "red", "green", "purple", "gold", "grey", "white", "pink", "brown"]
+PLACES = ["Library", "Student Center", "Founders Hall", "Science Building", "Fine Arts",
+          "Bellows Hall", "R/A Facility", "Parking Lot C", "Cafeteria", "Social Science"]
+FILLER = ("left near the table found after class has a sticker on the back small scratch "
+          "on one corner brand name printed inside turned in at the front desk").split()
+QUERIES = ["backpack", "black wallet", "library", "head", "purple hoodie founders", "calc"]
+
+def seed(engine, n, rng):
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        s.add(User(name="Bench", email="bench@go.minnstate.edu", password_hash="x"))
+        for name in ["Electronics", "Clothing", "Books", "Accessories", "Other"]:
+            s.add(Category(name=name, slug=name.lower()))
+        s.commit()
+    start = datetime(2024, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(n):
+            noun = rng.choice(NOUNS)
+            batch.append(dict(
+                name=f"{rng.choice(COLORS)} {noun}",
+                description=" ".join(rng.choices(FILLER, k=rng.randint(8, 30))) + f" {noun}",
+                location_found=rng.choice(PLACES),
+                date_found=start + timedelta(minutes=i),
+                status="found", photo_path="", category_id=rng.randint(1, 5), reported_by=1,
+                created_at=start + timedelta(minutes=i),
+            ))
+            if len(batch) == 5000:
+                conn.execute(insert(Item), batch); batch = []
+        if batch:
+            conn.execute(insert(Item), batch)
+
+def timed(engine, query, use_fts, repeat):
+    samples = []
+    with Session(engine) as s:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            q, rank = search.apply(s.query(Item), query, use_fts)
+            q = q.order_by(rank.asc()) if rank is not None else q.order_by(Item.date_found.desc())
+            rows = q.limit(24).all()
+            samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), len(rows)
+
+def main():
+    ap = argparse.ArgumentParser(description="FTS5 vs ILIKE search latency")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    rng = random.Random(42)
+    print(f"{'items':>9} {'query':<24} {'ilike ms':>9} {'fts ms':>8} {'speedup':>8}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", future=True)
+            seed(engine, n, rng)
+            t0 = time.perf_counter()
+            assert search.install(engine), "SQLite build has no FTS5"
+            build = time.perf_counter() - t0
+            print(f"{n:>9} (index build {build:.2f}s)")
+            for query in QUERIES:
+                slow, _ = timed(engine, query, False, args.repeat)
+                fast, _ = timed(engine, query, True, args.repeat)
+                print(f"{n:>9} {query:<24} {slow:>9.2f} {fast:>8.2f} {slow / fast:>7.1f}x")
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse, random
+from datetime import datetime, timedelta
+
+# ----- Synthetic dataset -----
+# Fills a database through the models with users, items spread over the
+# categories, claims and notifications. The same --seed always produces the
+# same rows, so runs against two branches see identical data. Run as
+#   DATABASE_URL=sqlite:////tmp/bench.db python -m bench.seed --items 50000
+# or import seed() from another benchmark.
+
+PASSWORD = "bench-pass"
+ADMIN_EMAIL = "admin@minnstate.edu"      # users.id 1
+USER_EMAIL = "user2@go.minnstate.edu"    # users.id 2; gets a share of the notifications
+
+CATEGORIES = [("Electronics", "electronics"), ("Clothing", "clothing"),
+              ("Books", "books"), ("Accessories", "accessories"), ("Other", "other")]
+ADJECTIVES = ["blue", "black", "red", "silver", "small", "large", "leather", "wireless",
+              "broken", "new", "old", "striped", "green", "white", "purple"]
+NOUNS = ["backpack", "wallet", "phone", "charger", "laptop", "jacket", "hoodie", "umbrella",
+         "calculator", "textbook", "notebook", "keys", "headphones", "water bottle", "id card",
+         "glasses", "scarf", "watch", "earbuds", "lanyard"]
+PLACES = ["Library", "Student Center", "Science Hall", "Gym", "Cafeteria", "Parking Lot B",
+          "Founders Hall", "Bus Stop", "Lecture Hall 101", "Residence Hall"]
+CHUNK = 5000
+
+def _chunks(rows):
+    for i in range(0, len(rows), CHUNK):
+        yield rows[i:i + CHUNK]
+
+def seed(engine, users=200, items=5000, claims=1000, notifications=5000, admins=3, rng_seed=1):
+    """Insert a synthetic dataset; returns the counts actually written."""
+    from sqlalchemy import select, insert, func
+    from werkzeug.security import generate_password_hash
+    from models import User, Roles, Category, Item, ItemStatus, Claim, ClaimStatus, Notification
+    import outbox
+
+    rng = random.Random(rng_seed)
+    now = datetime(2025, 6, 1)
+    pw = generate_password_hash(PASSWORD)   # hashed once; every user shares it
+    users = max(users, admins + 1, 2)
+
+    with engine.begin() as conn:
+        if not conn.execute(select(Category.id)).first():
+            conn.execute(insert(Category), [dict(name=n, slug=s) for n, s in CATEGORIES])
+        cat_ids = conn.scalars(select(Category.id)).all()
+        first_user = (conn.scalar(select(func.max(User.id))) or 0) + 1
+
+        admin_at = {0} | set(range(2, admins + 1))   # users.id 2 (USER_EMAIL) stays a plain user
+        rows = []
+        for i in range(users):
+            uid = first_user + i
+            email = ADMIN_EMAIL if uid == 1 else USER_EMAIL if uid == 2 else f"user{uid}@go.minnstate.edu"
+            rows.append(dict(name=f"Bench User {uid}", email=email, password_hash=pw,
+                             role=Roles.ADMIN if i in admin_at else Roles.USER, is_active=True,
+                             created_at=now - timedelta(days=365) + timedelta(minutes=i)))
+        for chunk in _chunks(rows):
+            conn.execute(insert(User), chunk)
+        user_ids = list(range(first_user, first_user + users))
+        admin_ids = [first_user + i for i in sorted(admin_at)]
+        plain_ids = [u for u in user_ids if u not in admin_ids]
+
+        first_item = (conn.scalar(select(func.max(Item.id))) or 0) + 1
+        rows = []
+        for i in range(items):
+            adj, noun, adj2 = rng.choice(ADJECTIVES), rng.choice(NOUNS), rng.choice(ADJECTIVES)
+            place = rng.choice(PLACES)
+            found = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+            rows.append(dict(
+                name=f"{adj.title()} {noun}",
+                description=f"{adj2.title()} {noun} left near the {place.lower()}. "
+                            f"Has a {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} attached.",
+                status=rng.choices([ItemStatus.FOUND, ItemStatus.CLAIMED, ItemStatus.RETURNED], [70, 20, 10])[0],
+                location_found=place, date_found=found, photo_path="",
+                created_at=found + timedelta(minutes=rng.randrange(1, 600)),
+                category_id=rng.choice(cat_ids), reported_by=rng.choice(user_ids),
+            ))
+        for chunk in _chunks(rows):
+            conn.execute(insert(Item), chunk)
+
+        rows, seen = [], set()
+        for _ in range(claims if items else 0):
+            key = (first_item + rng.randrange(items), rng.choice(plain_ids))
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append(dict(item_id=key[0], claimer_id=key[1], message="I think this is mine.",
+                             status=rng.choices([ClaimStatus.PENDING, ClaimStatus.APPROVED,
+                                                 ClaimStatus.REJECTED], [60, 25, 15])[0],
+                             created_at=now - timedelta(minutes=rng.randrange(60 * 24 * 90))))
+        for chunk in _chunks(rows):
+            conn.execute(insert(Claim), chunk)
+        n_claims = len(rows)
+
+        # a tenth go to user 2 and one to each admin, so those pages have depth
+        hot = [2] * 10 + admin_ids + [None] * 89
+        rows = []
+        for _ in range(notifications):
+            uid = rng.choice(hot) or rng.choice(user_ids)
+            rows.append(dict(user_id=uid, title="Claim Approved", body="Your claim was approved.",
+                             is_read=rng.random() < 0.7,
+                             created_at=now - timedelta(minutes=rng.randrange(60 * 24 * 90))))
+        for chunk in _chunks(rows):
+            conn.execute(insert(Notification), chunk)
+        outbox.recount_unread(conn)     # inserted directly, so the badge counters are set here
+
+    return dict(users=users, items=items, claims=n_claims, notifications=notifications)
+
+def main():
+    from sqlalchemy import create_engine
+    from config import Config
+    import migrations, search
+    ap = argparse.ArgumentParser(description="fill a database with synthetic users, items, claims and notifications")
+    ap.add_argument("--db", default=Config.SQLALCHEMY_DATABASE_URI, help="database URL (default: DATABASE_URL)")
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--items", type=int, default=5000)
+    ap.add_argument("--claims", type=int, default=1000)
+    ap.add_argument("--notifications", type=int, default=5000)
+    ap.add_argument("--admins", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    engine = create_engine(args.db, future=True)
+    migrations.upgrade(engine)
+    search.install(engine)
+    counts = seed(engine, args.users, args.items, args.claims, args.notifications, args.admins, args.seed)
+    print(", ".join(f"{n} {k}" for k, n in counts.items()),
+          f"-> {args.db} (sign in as {ADMIN_EMAIL} or {USER_EMAIL} / {PASSWORD})")
+
+if __name__ == "__main__":
+    main()
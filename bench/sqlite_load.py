@@ -0,0 +1,94 @@
+import argparse, multiprocessing as mp, os, random, tempfile, time
+from datetime import datetime, timedelta
+
+# ----- Multi-process read/write load against each engine profile -----
+# Every process plays a gunicorn worker: it opens its own engines through
+# db.make_sessionmaker() and loops over a browse-like read and a claim-like
+# write (claim + one notification per admin, one transaction) for a fixed
+# time. Reported per profile: total ops/s and "database is locked" errors.
+
+PROFILES = {
+    "default": dict(DB_PROFILE="default"),
+    "production": dict(DB_PROFILE="production"),
+    "production+split": dict(DB_PROFILE="production", DB_SPLIT_READS=True),
+}
+
+def _config(uri, overrides):
+    from config import Config
+    cfg = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    cfg.update(SQLALCHEMY_DATABASE_URI=uri, DB_SPLIT_READS=False)
+    cfg.update(overrides)
+    return cfg
+
+def seed(uri, items):
+    from sqlalchemy import create_engine, insert
+    import migrations
+    from models import User, Item, Category, Roles
+    engine = create_engine(uri, future=True)
+    migrations.upgrade(engine)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Category), [dict(name=f"C{i}", slug=f"c{i}") for i in range(5)])
+        conn.execute(insert(User), [dict(name=f"U{i}", email=f"u{i}@x", password_hash="x",
+                                          role=Roles.ADMIN if i < 3 else Roles.USER) for i in range(200)])
+        conn.execute(insert(Item), [dict(name=f"item {i}", description="d", location_found="L",
+                                          date_found=start + timedelta(minutes=i), photo_path="",
+                                          category_id=1 + i % 5, reported_by=1 + i % 200)
+                                     for i in range(items)])
+    engine.dispose()
+
+def worker(uri, overrides, seconds, write_ratio, seed_, out):
+    import db
+    counts = [0, 0, 0]   # ok, locked, other errors
+    try:
+        factory, _, _ = db.make_sessionmaker(_config(uri, overrides))
+        _run(factory, seconds, write_ratio, random.Random(seed_), counts)
+    finally:
+        out.put(tuple(counts))
+
+def _run(factory, seconds, write_ratio, rng, counts):
+    from sqlalchemy import select, func
+    from sqlalchemy.exc import OperationalError
+    import outbox
+    from models import Item, Claim, Notification, User, Roles
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            with factory() as s:
+                if rng.random() < write_ratio:
+                    s.add(Claim(item_id=rng.randint(1, 1000), claimer_id=rng.randint(4, 200), message="mine"))
+                    admins = s.scalars(select(User.id).where(User.role == Roles.ADMIN)).all()
+                    outbox.enqueue(s, admins, "New Claim Request", "bench")
+                    s.commit()
+                else:
+                    s.execute(select(Item).order_by(Item.date_found.desc(), Item.id.desc()).limit(24)).all()
+                    s.scalar(select(func.count(Notification.id))
+                             .where(Notification.user_id == rng.randint(1, 200), Notification.is_read == False))
+            counts[0] += 1
+        except OperationalError as e:
+            counts[1 if "locked" in str(e) or "busy" in str(e) else 2] += 1
+
+def main():
+    ap = argparse.ArgumentParser(description="SQLite engine profiles under multi-process load")
+    ap.add_argument("--procs", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--write-ratio", type=float, default=0.2)
+    ap.add_argument("--items", type=int, default=20_000)
+    args = ap.parse_args()
+
+    print(f"{'profile':<18} {'ops/s':>9} {'locked':>7} {'other errors':>13}")
+    for name, overrides in PROFILES.items():
+        tmp = tempfile.mkdtemp()
+        uri = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+        seed(uri, args.items)
+        out = mp.Queue()
+        procs = [mp.Process(target=worker, args=(uri, overrides, args.seconds, args.write_ratio, i, out))
+                 for i in range(args.procs)]
+        for p in procs: p.start()
+        results = [out.get() for _ in procs]
+        for p in procs: p.join()
+        ok = sum(r[0] for r in results)
+        print(f"{name:<18} {ok / args.seconds:>9.0f} {sum(r[1] for r in results):>7} {sum(r[2] for r in results):>13}")
+
+if __name__ == "__main__":
+    main()
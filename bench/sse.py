@@ -0,0 +1,150 @@
+import argparse, logging, os, re, resource, selectors, socket, tempfile, threading, time, urllib.parse, http.client
+
+# ----- /notifications/stream: cost of idle SSE connections -----
+# Run as `python -m bench.sse --connections 2000`. Starts the app on a
+# threaded werkzeug server, signs in --users users and opens --connections
+# streams spread over them, then reports what holding them costs the server
+# process: resident memory and threads per connection, and CPU while they
+# sit idle for --idle seconds (heartbeats every --heartbeat s included).
+# Then one notification per user is written two ways and the time until
+# every stream of that user has it is measured:
+#   local  through ext.notify() + commit (after_commit wakes the poller)
+#   other  a plain INSERT from another connection, as another worker or
+#          `python -m outbox` would (picked up by the SSE_POLL_SECONDS poll)
+# and a reconnect with Last-Event-ID is checked to replay what it missed.
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        return int(re.search(r"VmRSS:\s+(\d+)", f.read()).group(1))
+
+def login(port, email, password):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("POST", "/login", urllib.parse.urlencode(dict(email=email, password=password)),
+                 {"Content-Type": "application/x-www-form-urlencoded"})
+    resp = conn.getresponse()
+    resp.read()
+    cookie = resp.getheader("Set-Cookie").split(";", 1)[0]
+    conn.close()
+    return cookie
+
+def open_stream(port, cookie):
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(f"GET /notifications/stream HTTP/1.1\r\nHost: bench\r\nCookie: {cookie}\r\n"
+                 "Accept: text/event-stream\r\n\r\n".encode())
+    sock.setblocking(False)
+    return sock
+
+def wait_for(socks, marker, timeout=60):
+    """Read every socket until it has sent `marker`; returns seconds taken."""
+    sel = selectors.DefaultSelector()
+    for sock in socks:
+        sel.register(sock, selectors.EVENT_READ, bytearray())
+    t0 = time.perf_counter()
+    left = len(socks)
+    while left and time.perf_counter() - t0 < timeout:
+        for key, _ in sel.select(timeout=1):
+            key.data.extend(key.fileobj.recv(65536))
+            if marker in key.data:
+                sel.unregister(key.fileobj)
+                left -= 1
+    sel.close()
+    if left:
+        raise SystemExit(f"{left} streams never sent {marker!r}")
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="memory and CPU per idle SSE connection")
+    ap.add_argument("--connections", type=int, default=2000)
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--idle", type=float, default=10)
+    ap.add_argument("--heartbeat", type=float, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-sse-")
+    from sqlalchemy import create_engine, insert
+    from werkzeug.serving import make_server
+    from bench import seed
+    from app import create_app
+    from models import Notification
+
+    url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=url, UPLOAD_FOLDER=os.path.join(tmp, "uploads"),
+                          OUTBOX_WORKER="none", WTF_CSRF_ENABLED=False, SSE_HEARTBEAT=args.heartbeat,
+                          SSE_MAX_AGE=3600))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    seed.seed(web.db.engine, users=args.users + 1, items=10, claims=0, notifications=0)
+    user_ids = list(range(2, args.users + 2))
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    server.socket.listen(1024)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    resource.setrlimit(resource.RLIMIT_NOFILE, (resource.getrlimit(resource.RLIMIT_NOFILE)[1],) * 2)
+
+    cookies = {uid: login(port, seed.USER_EMAIL if uid == 2 else f"user{uid}@go.minnstate.edu", seed.PASSWORD)
+               for uid in user_ids}
+    base_rss, base_threads = rss_kib(), threading.active_count()
+
+    streams = {uid: [] for uid in user_ids}
+    t0 = time.perf_counter()
+    for i in range(0, args.connections, 200):       # in batches, to stay inside the listen backlog
+        batch = [(uid, open_stream(port, cookies[uid]))
+                 for uid in (user_ids[n % len(user_ids)] for n in range(i, min(i + 200, args.connections)))]
+        wait_for([sock for _, sock in batch], b"retry:")
+        for uid, sock in batch:
+            streams[uid].append(sock)
+    opened = time.perf_counter() - t0
+    held_rss, held_threads = rss_kib(), threading.active_count()
+    print(f"{args.connections} streams for {args.users} users opened in {opened:.1f} s; "
+          f"broker: {web.events.stats()}")
+    print(f"server memory  {base_rss / 1024:.0f} -> {held_rss / 1024:.0f} MiB, "
+          f"{(held_rss - base_rss) / args.connections:.0f} KiB per connection")
+    print(f"threads        {base_threads} -> {held_threads}")
+
+    # heartbeats (a few bytes each) just queue up in the client sockets meanwhile
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    time.sleep(args.idle)
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+    print(f"idle CPU       {cpu / wall * 100:.1f}% of a core over {wall:.0f} s "
+          f"({cpu / wall / args.connections * 1e6:.1f} us/s per connection)")
+
+    other = create_engine(url)
+    for how in ("local", "other"):
+        lat = []
+        for uid in user_ids[:10]:
+            marker = f"Bench {how} {uid}".encode()
+            t0 = time.perf_counter()
+            if how == "local":
+                with web.Session() as s:
+                    web.notify(s, [uid], f"Bench {how} {uid}", "ping")
+                    s.commit()
+            else:
+                with other.begin() as conn:
+                    conn.execute(insert(Notification).values(user_id=uid, title=f"Bench {how} {uid}", body="ping"))
+            wait_for(streams[uid], marker)
+            lat.append((time.perf_counter() - t0) * 1000)
+        lat.sort()
+        print(f"fan-out {how:<6} median {lat[len(lat) // 2]:.1f} ms, max {lat[-1]:.1f} ms "
+              f"({len(streams[user_ids[0]])} streams per user)")
+
+    # a reconnect that sends the last id it saw gets the missed ones replayed first
+    uid = user_ids[0]
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(f"GET /notifications/stream HTTP/1.1\r\nHost: bench\r\nCookie: {cookies[uid]}\r\n"
+                 "Last-Event-ID: 0\r\n\r\n".encode())
+    sock.setblocking(False)
+    t0 = time.perf_counter()
+    wait_for([sock], f"Bench other {uid}".encode())
+    print(f"resume         Last-Event-ID: 0 replayed both missed events in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    sock.close()
+
+    for socks in streams.values():
+        for sock in socks:
+            sock.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+
+# ----- Cold start: import -> create_app() -> first response -----
+# Run as `python -m bench.startup`. Each run is a fresh interpreter that
+# imports app, builds it and serves one request (--path) through the test
+# client, against a small seeded database. Modes:
+#   no bytecode   JINJA_BYTECODE_CACHE off, templates parsed on first use
+#   cold          empty bytecode cache (the first worker after a deploy)
+#   warm          bytecode cache filled by an earlier run / compile-templates
+#   preload       warm, plus TEMPLATE_PRELOAD=1 (compiled inside create_app)
+# --budget-ms fails the run when the warm median (import to first response)
+# goes over it; CI runs it that way.
+
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+r = app.test_client().get(sys.argv[1])
+t3 = time.perf_counter()
+assert r.status_code == 200, r.status_code
+print(json.dumps([t1 - t0, t2 - t1, t3 - t2]))
+"""
+
+def run(env, path):
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD, path], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    wall = time.perf_counter() - t0
+    return [x * 1000 for x in json.loads(out.splitlines()[-1]) + [wall]]
+
+def main():
+    ap = argparse.ArgumentParser(description="cold start time, import to first response")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--path", default="/")
+    ap.add_argument("--budget-ms", type=float, help="fail if the warm median exceeds this")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-startup-")
+    base = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                UPLOAD_FOLDER=os.path.join(tmp, "uploads"), OUTBOX_WORKER="none", CACHE_BACKEND="memory",
+                PYTHONDONTWRITEBYTECODE="")
+    setup = ("from app import create_app; from bench import seed; app = create_app(); "
+             "web = app.extensions['lostfound']; web.init_db(); "
+             "seed.seed(web.db.engine, users=50, items=500, claims=50, notifications=100)")
+    subprocess.run([sys.executable, "-c", setup], env=base, check=True)
+    warm_dir = os.path.join(tmp, "jinja-warm")
+    run(dict(base, JINJA_BYTECODE_CACHE=warm_dir), args.path)   # fills the warm cache
+
+    modes = {
+        "no bytecode": lambda i: dict(base, JINJA_BYTECODE_CACHE=""),
+        "cold": lambda i: dict(base, JINJA_BYTECODE_CACHE=os.path.join(tmp, f"jinja-cold-{i}")),
+        "warm": lambda i: dict(base, JINJA_BYTECODE_CACHE=warm_dir),
+        "preload": lambda i: dict(base, JINJA_BYTECODE_CACHE=warm_dir, TEMPLATE_PRELOAD="1"),
+    }
+    print(f"GET {args.path}, median of {args.runs} fresh processes (ms)")
+    print(f"{'mode':<12} {'import':>8} {'create':>8} {'first':>8} {'total':>8} {'process':>8}")
+    medians = {}
+    for name, env in modes.items():
+        runs = [run(env(i), args.path) for i in range(args.runs)]
+        imp, create, first, wall = (statistics.median(col) for col in zip(*runs))
+        total = medians[name] = statistics.median(a + b + c for a, b, c, _ in runs)
+        print(f"{name:<12} {imp:>8.1f} {create:>8.1f} {first:>8.1f} {total:>8.1f} {wall:>8.1f}")
+
+    if args.budget_ms is not None and medians["warm"] > args.budget_ms:
+        print(f"FAIL: warm start {medians['warm']:.1f} ms > budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
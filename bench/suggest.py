@@ -0,0 +1,84 @@
+import argparse, os, random, statistics, tempfile, time, tracemalloc
+
+# ----- /browse/suggest: prefix index vs SQL -----
+# Run as `python -m bench.suggest --items 100000`. Seeds items whose names
+# get a model number (--distinct different ones, so the index holds many
+# labels), builds the suggestion index and times lookups for prefixes of
+# 1-6 characters taken from real labels, plus misspelled ones (typo path).
+# "sql" is the same lookup done as a LIKE prefix query on every keystroke.
+# Then GET /browse/suggest end to end through the test client.
+
+def main():
+    ap = argparse.ArgumentParser(description="search suggestions: in-memory prefix index vs SQL")
+    ap.add_argument("--items", type=int, default=100000)
+    ap.add_argument("--distinct", type=int, default=5000)
+    ap.add_argument("--lookups", type=int, default=2000)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-suggest-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(tmp, "uploads")
+    os.environ.setdefault("OUTBOX_WORKER", "none")
+    from sqlalchemy import select, text
+    from bench import seed
+    from app import create_app
+    from models import Item, ItemStatus
+    import suggest
+
+    app = create_app(dict(WTF_CSRF_ENABLED=False))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    seed.seed(web.db.engine, users=50, items=args.items, claims=0, notifications=0)
+    with web.db.engine.begin() as conn:
+        conn.execute(text("UPDATE items SET name = name || ' ' || (id % :n)"), {"n": args.distinct})
+
+    index = web.suggest
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    index.rebuild()
+    build = time.perf_counter() - t0
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rng = random.Random(1)
+    with web.Session() as s:
+        labels = s.scalars(select(Item.name).limit(5000)).all() + seed.PLACES
+    prefixes = []
+    for _ in range(args.lookups):
+        label = suggest.normalize(rng.choice(labels))
+        word = rng.choice(label.split())
+        q = word[:rng.randint(1, min(6, len(word)))]
+        if rng.random() < 0.1 and len(word) >= 5:    # a typo: swap two letters
+            i = rng.randrange(len(word) - 1)
+            q = word[:i] + word[i + 1] + word[i] + word[i + 2:6]
+        prefixes.append(q)
+
+    def timed(fn):
+        out = []
+        for q in prefixes:
+            t0 = time.perf_counter()
+            fn(q)
+            out.append((time.perf_counter() - t0) * 1000)
+        out.sort()
+        return statistics.median(out), out[int(len(out) * 0.99) - 1]
+
+    def sql(q):
+        with web.Session() as s:
+            s.execute(select(Item.name).where(Item.status == ItemStatus.FOUND, Item.name.ilike(f"{q}%") |
+                                              Item.name.ilike(f"% {q}%")).distinct().limit(8)).all()
+
+    client = app.test_client()
+    client.post("/login", data=dict(email=seed.USER_EMAIL, password=seed.PASSWORD))
+    def http(q):
+        assert client.get("/browse/suggest", query_string={"q": q}).status_code == 200
+
+    print(f"{args.items} items, {index.stats()['terms']} labels, built in {build * 1000:.0f} ms, "
+          f"~{mem / 1024 / 1024:.1f} MiB")
+    print(f"{'lookup':<8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, fn in (("index", lambda q: index.suggest(q)), ("http", http), ("sql", sql)):
+        p50, p99 = timed(fn)
+        print(f"{name:<8} {p50:>8.3f} {p99:>8.3f}")
+    print("e.g.", {q: [x["text"] for x in index.suggest(q, 3)] for q in ("back", "libr", "bakcp", "ele")})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse, os, re, statistics, tempfile, time
+
+# ----- Photo bytes and latency for a 100-card browse, cold vs warm -----
+# cold:        empty browser cache, every card image is downloaded
+# revalidate:  cache present but the browser re-checks (If-None-Match -> 304)
+# immutable:   versioned URLs with Cache-Control: immutable, so the browser
+#              does not ask at all; only the HTML page is fetched
+
+def main():
+    ap = argparse.ArgumentParser(description="upload serving: cold vs warm browse")
+    ap.add_argument("--cards", type=int, default=100)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(tmp, "uploads")
+    from datetime import datetime
+    from PIL import Image
+    from werkzeug.security import generate_password_hash
+    import json
+    from app import create_app
+    import images
+    from models import User, Item
+
+    app = create_app(dict(WTF_CSRF_ENABLED=False, PER_PAGE=args.cards))
+    web = app.extensions["lostfound"]
+    web.init_db()
+    folder = app.config["UPLOAD_FOLDER"]
+    with web.Session() as s:
+        s.add(User(name="Bench", email="bench@go.minnstate.edu",
+                   password_hash=generate_password_hash("bench-pass")))
+        s.commit()
+        for i in range(args.cards):
+            raw = os.path.join(tmp, f"raw{i}.jpg")
+            Image.effect_noise((1600, 1200), 40 + i % 20).convert("RGB").save(raw, quality=90)
+            digest = images.content_hash(open(raw, "rb").read())
+            widths = images.render_variants(raw, folder, digest, app.config["IMAGE_WIDTHS"])
+            s.add(Item(name=f"Item {i}", description="bench", category_id=1, location_found="Library",
+                       date_found=datetime(2025, 1, 1), reported_by=1,
+                       photo_hash=digest, photo_variants=json.dumps(widths),
+                       photo_path=images.variant_name(digest, widths[-1], "jpg")))
+        s.commit()
+
+    client = app.test_client()
+    client.post("/login", data=dict(email="bench@go.minnstate.edu", password="bench-pass"))
+
+    def browse(mode, etags):
+        t0 = time.perf_counter()
+        page = client.get("/browse")
+        total = len(page.data)
+        # the card's <img src> (what a browser without srcset support loads)
+        urls = re.findall(r'<img src="(/uploads/[^"]+)"', page.get_data(as_text=True))
+        assert len(urls) == args.cards, len(urls)
+        requests = 1
+        if mode != "immutable":
+            for url in urls:
+                headers = {"If-None-Match": etags[url]} if mode == "revalidate" else {}
+                r = client.get(url, headers=headers)
+                requests += 1
+                total += len(r.data)
+                etags[url] = r.headers.get("ETag", etags.get(url))
+        return (time.perf_counter() - t0) * 1000, total, requests
+
+    etags = {}
+    print(f"{'mode':<11} {'requests':>8} {'bytes':>11} {'p50 ms':>8}")
+    for mode in ("cold", "revalidate", "immutable"):
+        runs = [browse(mode, etags) for _ in range(args.rounds)]
+        print(f"{mode:<11} {runs[0][2]:>8} {runs[0][1]:>11,} {statistics.median(r[0] for r in runs):>8.1f}")
+
+if __name__ == "__main__":
+    main()
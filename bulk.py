@@ -0,0 +1,335 @@
+import csv, io, json, os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, insert
+from werkzeug.datastructures import MultiDict, FileStorage
+from werkzeug.security import generate_password_hash
+from werkzeug.utils import secure_filename
+from models import User, Roles, Category, Item, ItemStatus, ItemMatchKey, Claim, ClaimStatus
+from forms import ReportItemForm, RegisterForm
+import matching
+import rollups
+
+# ----- Bulk export / import (CSV or JSONL) -----
+# `flask export-data` / GET /admin/export/<kind>.<fmt> stream every row of
+# items, claims or users. The query runs with yield_per, so rows come off a
+# server-side cursor BATCH at a time and each batch is written out as one
+# chunk of text: memory stays the same for 1k or 1M rows.
+#
+# `flask import-data` / POST /admin/import (with `kind` as a form field)
+# read rows the same way and insert them BATCH at a time (one executemany,
+# one commit per batch).
+# Items go through ReportItemForm's rules and users through
+# RegisterForm's; a bad row is skipped and reported by line, the rest go
+# in. Imported items are added to the match index and the daily rollups
+# but nobody is notified.
+#
+# Exported items and claims import back as they are; users need a password
+# column added (exports never carry one). Columns read on import (others,
+# like id and created_at, are ignored):
+#   items   name, description, category (name or id), location_found,
+#           date_found, status, photo (a file in the photo directory, by
+#           default the upload folder the exported names come from)
+#   claims  item_id, claimer_id, status, message
+#   users   name, email, password, role
+BATCH = 1000
+MAX_ERRORS = 100          # reported back; the count covers all of them
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+EXPORTS = {
+    "items": (Item.id, Item.name, Item.description, Item.status, Item.location_found, Item.date_found,
+              Category.name.label("category"), Item.photo_path.label("photo"), Item.reported_by, Item.created_at),
+    "claims": (Claim.id, Claim.item_id, Claim.claimer_id, Claim.status, Claim.message, Claim.created_at),
+    "users": (User.id, User.name, User.email, User.role, User.is_active, User.created_at),
+}
+
+def _plain(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+def export(session_factory, kind, fmt, batch=BATCH, counts=None):
+    """Yield the rows of `kind` as CSV (with a header) or JSONL, a batch per
+    chunk; counts["rows"] (when given) tracks how many were written."""
+    cols = EXPORTS[kind]
+    query = select(*cols).order_by(cols[0])
+    if kind == "items":
+        query = query.outerjoin(Category, Category.id == Item.category_id)
+    buf = io.StringIO()
+    out = csv.writer(buf)
+    with session_factory() as s:
+        result = s.execute(query.execution_options(yield_per=batch))
+        names = list(result.keys())
+        if fmt == "csv":
+            out.writerow(names)
+        for rows in result.partitions():
+            for row in rows:
+                if fmt == "csv":
+                    out.writerow([_plain(v) for v in row])
+                else:
+                    buf.write(json.dumps(dict(zip(names, map(_plain, row))), ensure_ascii=False) + "\n")
+            if counts is not None:
+                counts["rows"] = counts.get("rows", 0) + len(rows)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+def _decode(f, bad):
+    # line by line, so one bad line is one rejected row (a decoding text
+    # stream fails a whole buffer, and everything after it)
+    for n, raw in enumerate(f, 1):
+        try:
+            yield raw.decode("utf-8-sig" if n == 1 else "utf-8")
+        except UnicodeDecodeError:
+            bad.add(n)
+            yield raw.decode("utf-8", "replace")
+
+def read_rows(f, fmt):
+    """(line, dict) pairs from a binary stream; a row that won't decode or
+    parse is a str. CSV that won't split ends the file there."""
+    bad = set()
+    lines = _decode(f, bad)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        try:
+            reader.fieldnames
+            last = reader.line_num
+            if bad.intersection(range(1, last + 1)):
+                yield last, "header: not UTF-8 text; the file was not read"
+                return
+            for row in reader:
+                if bad.intersection(range(last + 1, reader.line_num + 1)):
+                    yield reader.line_num, "not UTF-8 text"
+                else:
+                    yield reader.line_num, row
+                last = reader.line_num
+        except csv.Error as e:
+            yield reader.line_num, f"bad CSV: {e}; the rest of the file was not read"
+        return
+    for n, line in enumerate(lines, 1):
+        if n in bad:
+            yield n, "not UTF-8 text"
+        elif line.strip():
+            try:
+                row = json.loads(line)
+                yield n, row if isinstance(row, dict) else "not a JSON object"
+            except ValueError as e:
+                yield n, f"bad JSON: {e}"
+
+def _field(row, name):
+    v = row.get(name)
+    return "" if v is None else str(v).strip()
+
+def _form_errors(form):
+    return "; ".join(f"{name}: {' '.join(errs)}" for name, errs in form.errors.items())
+
+class Importer(ABC):
+    """Validate, batch and insert rows of one kind; see import_rows()."""
+    model = None
+
+    def __init__(self, s):
+        self.s = s
+
+    @abstractmethod
+    def prepare(self, row):
+        """Insert values for a row, or raise ValueError."""
+
+    def check(self, values):
+        """Errors for rows that depend on the database: [(index, message)]."""
+        return []
+
+    def insert(self, values):
+        self.s.execute(insert(self.model.__table__), values)
+
+    def committed(self):
+        """Called after each batch commits."""
+
+class ItemImporter(Importer):
+    model = Item
+
+    def __init__(self, s, reporter_id, photos=None, pipeline=None):
+        super().__init__(s)
+        self.reporter_id = reporter_id
+        self.photos, self.pipeline = photos, pipeline
+        self.categories = {}
+        for c in s.scalars(select(Category)):
+            self.categories[c.name.lower()] = self.categories[str(c.id)] = c.id
+        # one form, re-filled per row: building a WTForms form costs more than validating it
+        self.form = ReportItemForm(formdata=None, meta={"csrf": False})
+        self.form.category.choices = [(c, str(c)) for c in set(self.categories.values())]
+        self.allowed = current_app.config["ALLOWED_EXTENSIONS"]
+        self.originals = {}         # digest -> stored original, for uploads not rendered yet
+        self.pending_photos = []    # (item_id, digest) to render once committed
+
+    def prepare(self, row):
+        category = self.categories.get(_field(row, "category").lower(), -1)
+        form = self.form
+        form.process(MultiDict(dict(
+            name=_field(row, "name"), description=_field(row, "description"), category=str(category),
+            location_found=_field(row, "location_found"), date_found=_field(row, "date_found")[:10],
+        )))
+        if not form.validate():
+            raise ValueError(_form_errors(form))
+        status = _field(row, "status") or ItemStatus.FOUND
+        if status not in (ItemStatus.FOUND, ItemStatus.CLAIMED, ItemStatus.RETURNED):
+            raise ValueError(f"status: unknown {status!r}")
+        now = datetime.utcnow()   # one stamp for both: no known return time (see rollups.py)
+        values = dict(name=form.name.data.strip(), description=form.description.data.strip(),
+                      category_id=category, location_found=form.location_found.data.strip(),
+                      date_found=datetime.combine(form.date_found.data, datetime.min.time()),
+                      reported_by=self.reporter_id, status=status, photo_path="", photo_hash=None,
+                      photo_variants=None, created_at=now, updated_at=now)
+        photo = _field(row, "photo") or _field(row, "photo_path")   # older exports
+        if photo:
+            values.update(self._photo(photo))
+        return values
+
+    def _photo(self, name):
+        if not self.photos:
+            raise ValueError("photo: no photo directory given")
+        path = os.path.join(self.photos, secure_filename(name))
+        suffix = path.rsplit(".", 1)[-1].lower()
+        if suffix not in self.allowed or not os.path.isfile(path):
+            raise ValueError(f"photo: {name} not found or not an image")
+        with open(path, "rb") as f:
+            try:
+                digest, photo_path, variants, raw = self.pipeline.store(FileStorage(f, name), suffix)
+            except ValueError as e:
+                raise ValueError(f"photo: {name}: {e}") from None
+        if raw:
+            self.originals[digest] = raw
+        return dict(photo_hash=digest, photo_path=photo_path or "",
+                    photo_variants=json.dumps(variants) if variants else None)
+
+    def insert(self, values):
+        # RETURNING the indexed columns rather than asking for the ids in
+        # parameter order, which SQLite can only do one row per INSERT
+        c = Item.__table__.c
+        rows = self.s.execute(insert(Item.__table__).returning(
+            c.id, c.name, c.description, c.location_found, c.category_id, c.date_found, c.photo_hash,
+            c.photo_path, c.status, c.created_at, c.updated_at), values).all()
+        rollups.reported(self.s, rows)
+        keys = []
+        for r in rows:
+            keys += [dict(key=k, item_id=r.id) for k in set(matching.item_keys(r))]
+            if r.photo_hash and not r.photo_path:
+                self.pending_photos.append((r.id, r.photo_hash))
+        if keys:
+            self.s.execute(insert(ItemMatchKey.__table__), keys)
+
+    def committed(self):
+        for item_id, digest in self.pending_photos:
+            self.pipeline.process(item_id, digest, self.originals[digest])
+        self.pending_photos = []
+
+class ClaimImporter(Importer):
+    model = Claim
+
+    def prepare(self, row):
+        try:
+            values = dict(item_id=int(_field(row, "item_id")), claimer_id=int(_field(row, "claimer_id")))
+        except ValueError:
+            raise ValueError("item_id and claimer_id must be numbers")
+        status = _field(row, "status") or ClaimStatus.PENDING
+        if status not in (ClaimStatus.PENDING, ClaimStatus.APPROVED, ClaimStatus.REJECTED):
+            raise ValueError(f"status: unknown {status!r}")
+        return dict(values, status=status, message=_field(row, "message")[:2000] or None)
+
+    def insert(self, values):
+        c = Claim.__table__.c
+        rollups.claims_made(self.s, self.s.execute(insert(Claim.__table__).returning(c.created_at, c.status),
+                                                   values).all())
+
+    def check(self, values):
+        items = set(self.s.scalars(select(Item.id).where(Item.id.in_({v["item_id"] for v in values}))))
+        users = set(self.s.scalars(select(User.id).where(User.id.in_({v["claimer_id"] for v in values}))))
+        claimed = set(self.s.execute(select(Claim.item_id, Claim.claimer_id).where(
+            Claim.item_id.in_(items), Claim.claimer_id.in_(users))).tuples())
+        errors = []
+        for i, v in enumerate(values):
+            pair = (v["item_id"], v["claimer_id"])
+            if v["item_id"] not in items:
+                errors.append((i, "item_id: no such item"))
+            elif v["claimer_id"] not in users:
+                errors.append((i, "claimer_id: no such user"))
+            elif pair in claimed:
+                errors.append((i, "already claimed by this user"))
+            claimed.add(pair)
+        return errors
+
+class UserImporter(Importer):
+    model = User
+
+    def __init__(self, s):
+        super().__init__(s)
+        self.seen = set()
+
+    def prepare(self, row):
+        # no password reset flow exists, so each row brings one (hashed here;
+        # this is what bounds the users import rate)
+        password = _field(row, "password")
+        form = RegisterForm(formdata=MultiDict(dict(
+            name=_field(row, "name"), email=_field(row, "email"), password=password, confirm=password,
+        )), meta={"csrf": False})
+        if not form.validate():
+            raise ValueError(_form_errors(form))
+        email = form.email.data.lower().strip()
+        if email in self.seen:
+            raise ValueError("email: repeated in this file")
+        self.seen.add(email)
+        role = _field(row, "role") or Roles.USER
+        if role not in (Roles.USER, Roles.ADMIN):
+            raise ValueError(f"role: unknown {role!r}")
+        return dict(name=form.name.data.strip(), email=email, role=role,
+                    password_hash=generate_password_hash(password), is_active=True)
+
+    def check(self, values):
+        taken = set(self.s.scalars(select(User.email).where(User.email.in_({v["email"] for v in values}))))
+        return [(i, "email: already registered") for i, v in enumerate(values) if v["email"] in taken]
+
+IMPORTERS = {"items": ItemImporter, "claims": ClaimImporter, "users": UserImporter}
+
+def importer(kind, s, reporter_id=None, photos=None, pipeline=None):
+    if kind == "items":
+        return ItemImporter(s, reporter_id, photos, pipeline)
+    return IMPORTERS[kind](s)
+
+def format_for(filename):
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+def import_rows(importer, rows, batch=BATCH):
+    """Feed (line, row) pairs through an Importer, committing every `batch`
+    good rows. Returns dict(rows, imported, errors=[(line, message)], error_count)."""
+    done = dict(rows=0, imported=0, errors=[], error_count=0)
+
+    def fail(line, message):
+        done["error_count"] += 1
+        if len(done["errors"]) < MAX_ERRORS:
+            done["errors"].append((line, message))
+
+    def flush(pending):
+        bad = dict(importer.check([v for _, v in pending]))
+        good = [v for i, (_, v) in enumerate(pending) if i not in bad]
+        for i, message in bad.items():
+            fail(pending[i][0], message)
+        if good:
+            importer.insert(good)
+            importer.s.commit()
+            importer.committed()
+            done["imported"] += len(good)
+
+    pending = []
+    for line, row in rows:
+        done["rows"] += 1
+        try:
+            if isinstance(row, str):
+                raise ValueError(row)
+            pending.append((line, importer.prepare(row)))
+        except ValueError as e:
+            fail(line, str(e))
+        if len(pending) >= batch:
+            flush(pending)
+            pending = []
+    if pending:
+        flush(pending)
+    done["errors"].sort()
+    return done
@@ -0,0 +1,188 @@
+import os, pickle, sqlite3, threading, time
+from collections import OrderedDict
+
+# ----- Cache backends -----
+# All backends share one small interface: get / set / delete / clear /
+# get_or_set, plus hit/miss counters for the admin dashboard. TTLCache lives
+# in one process; SQLiteCache is a file every gunicorn worker on the host
+# opens, so an invalidation in one worker is seen by all of them.
+
+_MISSING = object()
+
+class Cache:
+    name = "none"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        return _MISSING
+
+    def get(self, key, default=None):
+        value = self._get(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def get_or_set(self, key, fn, ttl=None):
+        """Cached value for `key`, computing and storing fn() on a miss."""
+        value = self._get(key)
+        if value is _MISSING:
+            self.misses += 1
+            value = fn()
+            self.set(key, value, ttl)
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": self.name, "hits": self.hits, "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None, "entries": len(self),
+        }
+
+class NullCache(Cache):
+    """Caching switched off: every lookup is a miss."""
+
+class TTLCache(Cache):
+    """Thread-safe LRU with a per-entry time-to-live.
+
+    `maxsize` bounds memory (least recently used entries are evicted first);
+    entries older than their ttl are treated as missing. ttl=0 or maxsize=0
+    disables the cache entirely."""
+    name = "memory"
+
+    def __init__(self, maxsize=1024, ttl=60):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _get(self, key):
+        if not self.enabled:
+            return _MISSING
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteCache(Cache):
+    """Cache shared by all processes on one host, stored in a SQLite file.
+
+    Values are pickled. Each thread gets its own connection, opened lazily so
+    nothing is inherited across a gunicorn fork."""
+    name = "sqlite"
+    PRUNE_EVERY = 200   # sets between sweeps of expired / excess rows
+
+    def __init__(self, path, ttl=300, maxsize=10_000):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._sets = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache ("
+                         "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+        conn.close()
+
+    def _conn(self):
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    def _get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else _MISSING
+
+    def set(self, key, value, ttl=None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time() + (ttl or self.ttl)),
+        )
+        self._sets += 1
+        if self._sets % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT "
+            "max((SELECT count(*) FROM cache) - ?, 0))", (self.maxsize,)
+        )
+
+    def delete(self, *keys):
+        self._conn().executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in keys])
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._conn().execute("SELECT count(*) FROM cache").fetchone()[0]
+
+def make_cache(config):
+    backend = config.get("CACHE_BACKEND", "memory")
+    ttl = config.get("CACHE_DEFAULT_TTL", 300)
+    size = config.get("CACHE_MAX_ENTRIES", 2048)
+    if backend == "sqlite":
+        return SQLiteCache(config["CACHE_PATH"], ttl=ttl, maxsize=size)
+    if backend == "memory":
+        return TTLCache(maxsize=size, ttl=ttl)
+    return NullCache()
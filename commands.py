@@ -0,0 +1,172 @@
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+from extensions import ext
+from models import User, Roles
+import bulk
+import matching
+import migrations
+import retention
+import rollups
+
+# ----- Flask CLI -----
+#   flask --app app init-db            upgrade schema, install FTS, seed categories
+#   flask --app app db-status          list migrations
+#   flask --app app create-admin --email you@minnstate.edu
+#   flask --app app compile-templates  fill the Jinja bytecode cache (run at deploy)
+#   flask --app app rebuild-matches    re-index every item for match suggestions
+#   flask --app app export-data items --format jsonl -o items.jsonl
+#   flask --app app import-data items items.csv --photos ./photos --reporter you@minnstate.edu
+#   flask --app app archive            move old returned items / read notifications to the archive
+#   flask --app app rebuild-rollups    recompute the /admin/trends counters from items and claims
+
+def init_app(app):
+    for command in (init_db, db_status, create_admin, compile_templates, rebuild_matches, export_data,
+                    import_data, archive, rebuild_rollups):
+        app.cli.add_command(command)
+
+def load_templates(app):
+    """Compile every template into the environment's cache (and the bytecode
+    cache, when one is configured). Returns the template names."""
+    env = app.jinja_env
+    names = env.list_templates(extensions=("html",))
+    for name in names:
+        env.get_template(name)
+    return names
+
+@click.command("init-db")
+@with_appcontext
+def init_db():
+    """Migrate the schema, install search, seed categories."""
+    done = ext.init_db()
+    click.echo(f"migrations applied: {done['migrations'] or 'none'}")
+    click.echo(f"full-text search: {'on' if done['fts'] else 'off (ILIKE fallback)'}")
+    if done["categories"]:
+        click.echo(f"seeded {done['categories']} categories")
+
+@click.command("db-status")
+@with_appcontext
+def db_status():
+    """List the schema migrations and whether each is applied."""
+    for version, description, applied in migrations.status(ext.db.engine):
+        click.echo(f"{version:>4} {'x' if applied else ' '} {description}")
+
+@click.command("create-admin")
+@click.option("--email", required=True)
+@click.option("--name", default="Administrator", show_default=True)
+@click.password_option(help="Prompted for when not given.")
+@with_appcontext
+def create_admin(email, name, password):
+    """Create an admin account (or promote an existing user)."""
+    email = email.lower().strip()
+    with ext.Session() as s:
+        user = s.execute(select(User).where(User.email == email)).scalar_one_or_none()
+        if user:
+            user.role = Roles.ADMIN
+            click.echo(f"{email} already exists; role set to admin.")
+        else:
+            user = User(name=name.strip(), email=email, password_hash=generate_password_hash(password),
+                        role=Roles.ADMIN)
+            s.add(user)
+            click.echo(f"Admin created: {email}")
+        s.commit()
+        ext.invalidate_user(user.id)
+    ext.invalidate("users")
+
+@click.command("compile-templates")
+@with_appcontext
+def compile_templates():
+    """Compile all templates ahead of the first request."""
+    names = load_templates(current_app)
+    where = current_app.config["JINJA_BYTECODE_CACHE"]
+    click.echo(f"compiled {len(names)} templates" + (f" into {where}" if where else " (JINJA_BYTECODE_CACHE is off)"))
+
+@click.command("rebuild-matches")
+@with_appcontext
+def rebuild_matches():
+    """Rebuild the match-suggestion index from the items table."""
+    with ext.db.engine.begin() as conn:
+        click.echo(f"indexed {matching.rebuild(conn)} items")
+
+@click.command("export-data")
+@click.argument("kind", type=click.Choice(sorted(bulk.EXPORTS)))
+@click.option("--format", "fmt", type=click.Choice(sorted(bulk.FORMATS)), default="csv", show_default=True)
+@click.option("-o", "--output", type=click.Path(dir_okay=False, writable=True), help="Default: stdout.")
+@with_appcontext
+def export_data(kind, fmt, output):
+    """Write every row of KIND as CSV or JSONL."""
+    counts, t0 = {}, time.perf_counter()
+    out = open(output, "w", encoding="utf-8", newline="") if output else click.get_text_stream("stdout")
+    try:
+        for chunk in bulk.export(ext.db.sessionmaker, kind, fmt, counts=counts):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+    took = time.perf_counter() - t0
+    n = counts.get("rows", 0)
+    click.echo(f"exported {n} {kind} in {took:.1f} s ({n / max(took, 1e-6):.0f} rows/s)", err=True)
+
+@click.command("import-data")
+@click.argument("kind", type=click.Choice(sorted(bulk.IMPORTERS)))
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(sorted(bulk.FORMATS)), help="Default: from the file name.")
+@click.option("--photos", type=click.Path(exists=True, file_okay=False),
+              help="Directory holding the files named in the items' photo column. Default: the upload folder.")
+@click.option("--reporter", help="Email the items are reported by. Default: the first admin.")
+@with_appcontext
+def import_data(kind, source, fmt, photos, reporter):
+    """Insert rows of KIND from a CSV or JSONL file, in batches."""
+    photos = photos or current_app.config["UPLOAD_FOLDER"]
+    with ext.Session() as s:
+        query = select(User.id).where(User.email == reporter.lower().strip()) if reporter else \
+            select(User.id).where(User.role == Roles.ADMIN).order_by(User.id).limit(1)
+        reporter_id = s.scalar(query)
+        if kind == "items" and reporter_id is None:
+            raise click.UsageError(f"no user {reporter}" if reporter else "no admin yet; pass --reporter")
+        t0 = time.perf_counter()
+        with open(source, "rb") as f:
+            done = bulk.import_rows(bulk.importer(kind, s, reporter_id, photos, ext.photos),
+                                    bulk.read_rows(f, fmt or bulk.format_for(source)))
+    took = time.perf_counter() - t0
+    ext.imported(kind)
+    for line, message in done["errors"]:
+        click.echo(f"line {line}: {message}", err=True)
+    click.echo(f"imported {done['imported']} of {done['rows']} {kind} in {took:.1f} s "
+               f"({done['rows'] / max(took, 1e-6):.0f} rows/s), {done['error_count']} rejected")
+
+@click.command("archive")
+@click.option("--dry-run", is_flag=True, help="Only count what would be archived.")
+@click.option("--vacuum/--no-vacuum", default=True, show_default=True,
+              help="VACUUM afterwards when enough of the file is free.")
+@with_appcontext
+def archive(dry_run, vacuum):
+    """Move cold rows to the archive tables (RETENTION_* settings)."""
+    cfg = current_app.config
+    policy = dict(items=cfg["RETENTION_ITEMS"], notification_days=cfg["RETENTION_READ_NOTIFICATIONS_DAYS"])
+    if dry_run:
+        for name, n in retention.pending(ext.db.engine, **policy).items():
+            click.echo(f"{name}: {n} to archive")
+        return
+    t0 = time.perf_counter()
+    done = retention.run(ext.db.engine, batch=cfg["RETENTION_BATCH"], pause=cfg["RETENTION_PAUSE"], **policy)
+    click.echo(f"archived {done['items']} items ({done['claims']} claims) and {done['notifications']} "
+               f"notifications in {done['batches']} batches, {time.perf_counter() - t0:.1f} s")
+    if done["items"]:
+        ext.imported("items")
+        ext.invalidate("claims")
+    for step in retention.maintain(ext.db.engine, cfg["RETENTION_VACUUM_FREE"], vacuum):
+        click.echo(f"maintenance: {step}")
+
+@click.command("rebuild-rollups")
+@with_appcontext
+def rebuild_rollups():
+    """Recompute the daily rollups behind /admin/trends."""
+    t0 = time.perf_counter()
+    with ext.db.engine.begin() as conn:
+        written = rollups.rebuild(conn)
+    click.echo(", ".join(f"{n} {table} rows" for table, n in written.items())
+               + f" in {time.perf_counter() - t0:.1f} s")
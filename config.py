@@ -6,13 +6,99 @@ class Config:
     WTF_CSRF_ENABLED = True
 
     # DATABASE
-    SQLALCHEMY_DATABASE_URI = "sqlite:///instance/app.db"
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///instance/app.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_PROFILE = os.environ.get("DB_PROFILE", "production")   # "default" = driver defaults
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",        # readers don't block on the writer (and vice versa)
+        "synchronous": "NORMAL",      # safe with WAL; fsync at checkpoints only
+        "busy_timeout": 5000,         # ms a writer waits for the lock before erroring
+        "cache_size": -20000,         # KiB of page cache per connection
+        "mmap_size": 268435456,       # 256 MiB memory-mapped reads
+        "temp_store": "MEMORY",
+    }
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_TIMEOUT = 30
+    DB_SPLIT_READS = os.environ.get("DB_SPLIT_READS") == "1"   # read-only engine + one writer connection
+    DB_WRITE_TIMEOUT = 30         # seconds to wait for the writer connection
+
+    # CACHES (per process; size 0 or ttl 0 turns a cache off)
+    USER_CACHE_SIZE = 1024      # logged-in user rows kept between requests
+    USER_CACHE_TTL = 60         # seconds; bounds staleness across workers
+    UNREAD_CACHE_TTL = 15       # navbar unread-notification badge
+
+    # NOTIFICATIONS: in-app rows are written with the triggering change; any
+    # external channels listed here go through the outbox (see outbox.py)
+    NOTIFY_CHANNELS = tuple(c for c in os.environ.get("NOTIFY_CHANNELS", "").split(",") if c)  # "email", "webhook"
+    OUTBOX_WORKER = os.environ.get("OUTBOX_WORKER", "thread")   # "thread" or "none" (run `python -m outbox`)
+    OUTBOX_POLL_SECONDS = 2
+    OUTBOX_BATCH_SIZE = 50
+    OUTBOX_MAX_ATTEMPTS = 6
+    MAIL_SERVER = os.environ.get("MAIL_SERVER", "localhost")   # e.g. `python -m aiosmtpd -n -l localhost:1025`
+    MAIL_PORT = int(os.environ.get("MAIL_PORT", 1025))
+    MAIL_FROM = "lostandfound@smsu.edu"
+    NOTIFY_WEBHOOK_URL = os.environ.get("NOTIFY_WEBHOOK_URL")
+
+    # SHARED CACHE for homepage/admin stats, recent items and categories:
+    # "memory" (per process), "sqlite" (one file shared by all workers) or "none"
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+    CACHE_PATH = os.path.join(os.path.dirname(__file__), "instance", "cache.db")
+    CACHE_DEFAULT_TTL = 300
+    CACHE_MAX_ENTRIES = 2048
+
+    # INSTRUMENTATION (per-request SQL/template timings, see perf.py)
+    PERF_ENABLED = os.environ.get("PERF_ENABLED", "1") == "1"
+    PERF_N_PLUS_ONE = 5           # same statement this many times in one request -> flagged
+    PERF_PROFILE_RATE = float(os.environ.get("PERF_PROFILE_RATE", 0))   # fraction of requests run under cProfile
+    PERF_SERVER_TIMING = os.environ.get("PERF_SERVER_TIMING") == "1"    # Server-Timing header for devtools
+    PERF_METRICS_TOKEN = os.environ.get("PERF_METRICS_TOKEN")   # bearer token for scraping /admin/perf/metrics
+
+    # RENDERED FRAGMENTS ({% cache %} blocks, e.g. item cards; see fragments.py)
+    FRAGMENT_CACHE_SIZE = 4096    # entries per process; 0 turns it off
+    FRAGMENT_CACHE_TTL = 3600
+
+    # TEMPLATES: compiled templates are kept on disk so new workers skip
+    # Jinja's parser ("" turns it off); TEMPLATE_PRELOAD compiles them all in
+    # create_app() instead of on first use (pair with `gunicorn --preload`)
+    JINJA_BYTECODE_CACHE = os.environ.get("JINJA_BYTECODE_CACHE", os.path.join(os.path.dirname(__file__), "instance", "jinja"))
+    TEMPLATE_PRELOAD = os.environ.get("TEMPLATE_PRELOAD") == "1"
+
+    # LIVE NOTIFICATIONS (/notifications/stream, Server-Sent Events; see events.py). Each open
+    # stream holds a worker thread: serve with gunicorn -k gthread --threads N (or gevent)
+    SSE_POLL_SECONDS = 1          # how soon notifications written by other workers arrive
+    SSE_HEARTBEAT = 15            # seconds between keep-alive comments
+    SSE_MAX_AGE = 300             # a stream ends after this; the browser reconnects with Last-Event-ID
+    SSE_BACKLOG = 50              # missed notifications replayed on reconnect
+
+    # SEARCH SUGGESTIONS (/browse/suggest; per-process prefix index, see suggest.py)
+    SUGGEST_MAX_TERMS = 20000     # item names, locations and categories kept in memory
+    SUGGEST_REFRESH = 300         # seconds before a background reload picks up other workers' writes
+    SUGGEST_LIMIT = 8
+
+    # RETENTION (`flask archive`, e.g. nightly from cron; see retention.py)
+    RETENTION_ITEMS = {"returned": 90}        # status -> days unchanged before an item is archived; {} = keep all
+    RETENTION_READ_NOTIFICATIONS_DAYS = 30    # read notifications older than this are archived; 0 = keep
+    RETENTION_BATCH = 500                     # rows moved per transaction
+    RETENTION_PAUSE = 0.05                    # seconds between batches, so requests get the write lock
+    RETENTION_VACUUM_FREE = 0.25              # VACUUM once this share of the database file is free pages
+
+    # TRENDS (/admin/trends, read from the daily rollups; see rollups.py)
+    TRENDS_WEEKS = 12             # default window of /admin/trends
+
+    # PAGINATION (rows per page; lists use keyset cursors, see pagination.py)
+    PER_PAGE = 24
+    ADMIN_PER_PAGE = 50
 
     # FILE UPLOADS
-    UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "uploads")
+    UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", os.path.join(os.path.dirname(__file__), "uploads"))
     MAX_CONTENT_LENGTH = 8 * 1024 * 1024  # 8 MB
     ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+    USE_X_SENDFILE = os.environ.get("USE_X_SENDFILE") == "1"   # Apache/lighttpd serve upload bytes
+    UPLOADS_ACCEL_REDIRECT = os.environ.get("UPLOADS_ACCEL_REDIRECT")  # nginx internal location, e.g. "/_uploads/"
+    UPLOAD_ORIGINALS_FOLDER = os.path.join(os.path.dirname(__file__), "instance", "originals")  # raw uploads, never served
+    IMAGE_WIDTHS = (320, 640, 1280)   # thumbnail widths, each written as WebP and JPEG
+    IMAGE_WORKERS = 2                 # process pool size; 0 = resize inline in the request
 
     # BRANDING
     SCHOOL_NAME = "Southwest Minnesota State University"
@@ -0,0 +1,169 @@
+import threading
+from sqlalchemy import create_engine, event, Insert, Update, Delete, TextClause
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+# ----- Engine profiles -----
+# DB_PROFILE = "production" applies SQLITE_PRAGMAS on every new connection
+# (WAL so readers never wait for the writer, a busy timeout so writers queue
+# instead of failing with "database is locked") and sizes the pool from
+# Config. "default" keeps the driver defaults (rollback journal, no timeout).
+#
+# With DB_SPLIT_READS on, SELECTs go to a read-only engine and all writes go
+# through a single-connection writer engine that starts its transactions with
+# BEGIN IMMEDIATE. Writers in one process then queue on the pool instead of
+# contending for the SQLite lock, and a transaction can't fail halfway when it
+# tries to upgrade a read lock.
+#
+# Database builds the engines lazily, so creating the app (and importing
+# anything) never touches the database file.
+
+def _on_connect(engine, pragmas, immediate=False):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_conn, record):
+        if immediate:
+            dbapi_conn.isolation_level = None   # we emit BEGIN ourselves, below
+        cur = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        cur.close()
+
+    if immediate:
+        @event.listens_for(engine, "begin")
+        def begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def make_engine(config, role="default"):
+    """role: "default" (reads and writes), "writer" or "reader"."""
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    url = make_url(uri)
+    sqlite = url.get_backend_name() == "sqlite"
+    if config.get("DB_PROFILE", "production") != "production":
+        return create_engine(uri, future=True)
+
+    kw = dict(pool_pre_ping=not sqlite, pool_recycle=config.get("DB_POOL_RECYCLE", 1800))
+    if role == "writer":
+        kw.update(pool_size=1, max_overflow=0, pool_timeout=config.get("DB_WRITE_TIMEOUT", 30))
+    else:
+        kw.update(pool_size=config.get("DB_POOL_SIZE", 5), max_overflow=config.get("DB_MAX_OVERFLOW", 10),
+                  pool_timeout=config.get("DB_POOL_TIMEOUT", 30))
+    if sqlite and url.database and url.database != ":memory:":
+        if role == "reader":
+            uri = f"sqlite:///file:{url.database}?mode=ro&uri=true"
+        engine = create_engine(uri, future=True, **kw)
+        pragmas = dict(config.get("SQLITE_PRAGMAS", {}))
+        if role == "reader":
+            pragmas.pop("journal_mode", None)   # stored in the file; set by the writer
+            pragmas["query_only"] = 1
+        _on_connect(engine, pragmas, immediate=(role == "writer"))
+        return engine
+    if sqlite:
+        return create_engine(uri, future=True)   # :memory: uses a single-connection pool
+    return create_engine(uri, future=True, **kw)
+
+class LazySession(Session):
+    """Binds to the Database's engine, which is created by the first query."""
+
+    def __init__(self, database=None, **kw):
+        super().__init__(**kw)
+        self.database = database
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        return self.database.engine
+
+def _writes(clause):
+    # text() statements too: rollups.py keeps its upserts as plain SQL
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE")
+    return isinstance(clause, (Insert, Update, Delete))
+
+class RoutingSession(LazySession):
+    """Sends flushes and INSERT/UPDATE/DELETE to the writer, the rest to the reader.
+
+    Once a transaction has written, it stays on the writer until commit or
+    rollback, so it reads its own uncommitted changes."""
+
+    def __init__(self, database=None, **kw):
+        super().__init__(database, **kw)
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        writer, reader = self.database.engines()
+        if self._wrote or self._flushing or _writes(clause):
+            self._wrote = True
+            return writer
+        return reader
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._wrote = False
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._wrote = False
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._wrote = False
+
+class Database:
+    """The engines for one app, created on first use instead of at startup.
+
+    `sessionmaker` can be handed out right away; nothing connects (or even
+    builds an Engine) until a session runs its first statement."""
+
+    def __init__(self, config):
+        self.config = config
+        self.split = bool(config.get("DB_SPLIT_READS")) and config.get("DB_PROFILE", "production") == "production"
+        self.sessionmaker = sessionmaker(class_=RoutingSession if self.split else LazySession, database=self,
+                                         autoflush=False, expire_on_commit=False)
+        self._engines = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def on_create(self, fn):
+        """Call fn(writer, reader or None) once the engines exist."""
+        self._callbacks.append(fn)
+        if self._engines is not None:
+            fn(*self._engines)
+
+    def engines(self):
+        if self._engines is None:
+            with self._lock:
+                if self._engines is None:
+                    engines = self._create()
+                    for fn in self._callbacks:
+                        fn(*engines)
+                    self._engines = engines
+        return self._engines
+
+    def _create(self):
+        if not self.split:
+            return make_engine(self.config), None
+        writer = make_engine(self.config, "writer")
+        with writer.begin():   # creates the file, so the read-only engine can open it
+            pass
+        return writer, make_engine(self.config, "reader")
+
+    @property
+    def engine(self):
+        return self.engines()[0]
+
+    @property
+    def read_engine(self):
+        return self.engines()[1]
+
+    @property
+    def created(self):
+        return self._engines is not None
+
+def make_sessionmaker(config):
+    """Returns (sessionmaker, writer engine, reader engine or None)."""
+    database = Database(config)
+    return (database.sessionmaker, *database.engines())
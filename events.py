@@ -0,0 +1,133 @@
+import json, logging, queue, threading, time
+from sqlalchemy import select, func
+from models import Notification
+
+log = logging.getLogger(__name__)
+
+# ----- Live notifications (Server-Sent Events) -----
+# GET /notifications/stream holds one connection per open tab and writes
+# each new notification for that user as an SSE event, with a comment line
+# every SSE_HEARTBEAT seconds in between so proxies keep it open.
+#
+# One Broker per process. A stream subscribes a queue to its user's
+# channel; a single poller thread reads the notifications table past a
+# high-water mark (the last notifications.id it has seen) and puts each new
+# row on the queues of that user's streams. It polls every SSE_POLL_SECONDS,
+# which is how notifications written by other workers (or `python -m
+# outbox`) get here, and right away when this process commits one (the
+# session's after_commit hook calls wake()). It runs no queries while
+# nobody is connected.
+#
+# Events carry the notification id, so a reconnecting EventSource sends it
+# back as Last-Event-ID and the stream first replays what it missed.
+# Streams end after SSE_MAX_AGE seconds; the browser reconnects on its own.
+
+RETRY_MS = 5000     # browser reconnect delay
+BATCH = 500         # rows per poll
+
+def event(row):
+    data = dict(id=row.id, title=row.title, body=row.body, created_at=row.created_at.isoformat())
+    return row.id, f"id: {row.id}\nevent: notification\ndata: {json.dumps(data)}\n\n"
+
+class Broker:
+    def __init__(self, session_factory, poll=1.0):
+        self.session_factory = session_factory
+        self.poll = poll
+        self._channels = {}        # user_id -> {queue}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._hwm = None           # highest notifications.id published; None while idle
+        self._thread = None
+
+    def subscribe(self, user_id):
+        q = queue.SimpleQueue()
+        with self._lock:
+            if self._hwm is None:
+                with self.session_factory() as s:
+                    self._hwm = s.scalar(select(func.max(Notification.id))) or 0
+            self._channels.setdefault(user_id, set()).add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sse-broker", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subs = self._channels.get(user_id)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._channels[user_id]
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll)
+            self._wake.clear()
+            try:
+                if self.poll_once() == BATCH:
+                    self._wake.set()
+            except Exception:
+                log.exception("notification poll failed")
+
+    def poll_once(self):
+        """Publish notifications past the high-water mark; returns how many."""
+        with self._lock:
+            if not self._channels:
+                self._hwm = None    # idle: the next subscriber starts from "now"
+                return 0
+            hwm = self._hwm
+        with self.session_factory() as s:
+            rows = s.execute(
+                select(Notification.id, Notification.user_id, Notification.title, Notification.body,
+                       Notification.created_at)
+                .where(Notification.id > hwm).order_by(Notification.id).limit(BATCH)
+            ).all()
+        with self._lock:
+            for row in rows:
+                for q in self._channels.get(row.user_id, ()):
+                    q.put(event(row))
+            if rows and self._hwm is not None:
+                self._hwm = max(self._hwm, rows[-1].id)
+        return len(rows)
+
+    def missed(self, user_id, last_id, limit=50):
+        """The user's notifications after last_id (Last-Event-ID resume)."""
+        with self.session_factory() as s:
+            rows = s.execute(
+                select(Notification.id, Notification.title, Notification.body, Notification.created_at)
+                .where(Notification.user_id == user_id, Notification.id > last_id)
+                .order_by(Notification.id.desc()).limit(limit)
+            ).all()
+        return [event(r) for r in reversed(rows)]
+
+    def stats(self):
+        with self._lock:
+            return dict(users=len(self._channels), streams=sum(map(len, self._channels.values())),
+                        high_water_mark=self._hwm)
+
+    def stream(self, user_id, last_id=None, heartbeat=15, max_age=300, backlog=50):
+        """SSE body for one connection. Subscribes before replaying, so nothing
+        published in between is lost; ids already sent are skipped."""
+        q = self.subscribe(user_id)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            sent = last_id or 0
+            if last_id is not None:
+                for eid, text in self.missed(user_id, last_id, backlog):
+                    sent = eid
+                    yield text
+            deadline = time.monotonic() + max_age
+            while (left := deadline - time.monotonic()) > 0:
+                try:
+                    eid, text = q.get(timeout=min(heartbeat, left))
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if eid > sent:
+                    sent = eid
+                    yield text
+        finally:
+            self.unsubscribe(user_id, q)
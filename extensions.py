@@ -0,0 +1,177 @@
+import os, time
+from flask import current_app, g, has_request_context
+from flask_login import LoginManager, current_user
+from flask_wtf.csrf import CSRFProtect
+from sqlalchemy import select, event
+from sqlalchemy.orm import scoped_session
+from werkzeug.local import LocalProxy
+from models import User, Category
+from cache import TTLCache, make_cache
+import db
+import migrations
+import outbox
+import images
+import perf
+import fragments
+import search
+import suggest
+import events
+
+# ----- Per-app services -----
+# Everything the views share (sessions, caches, the image pipeline, the
+# outbox dispatcher, instrumentation) lives on one LostFound object per app,
+# stored in app.extensions and reached through the `ext` proxy. Building it
+# is cheap: the engines are created by the first query, the dispatcher
+# thread by the first request, the image pool by the first upload.
+
+# Homepage/admin numbers and the category list change only on the write
+# paths, so they are cached (CACHE_BACKEND) and dropped from those paths.
+# With the per-process "memory" backend other workers catch up after
+# CACHE_DEFAULT_TTL; the "sqlite" backend is shared, so they don't lag.
+CACHE_KEYS = {
+    "items": ("stats:home", "items:recent", "items:latest", "stats:admin", "facets:gen"),
+    "claims": ("stats:admin",),
+    "users": ("stats:admin",),
+    "categories": ("categories",),
+}
+
+DEFAULT_CATEGORIES = [
+    ("Electronics", "electronics"), ("Clothing", "clothing"),
+    ("Books", "books"), ("Accessories", "accessories"), ("Other", "other"),
+]
+
+csrf = CSRFProtect()
+login_manager = LoginManager()
+login_manager.login_view = "main.login"
+login_manager.login_message_category = "warning"
+
+class LostFound:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cfg = self.config = app.config
+        # `db.engine` takes the writes (and the reads, unless DB_SPLIT_READS
+        # routes them to `db.read_engine`); see db.py for the SQLite profile
+        self.db = db.Database(cfg)
+        self.Session = scoped_session(self.db.sessionmaker)
+        self.cache = make_cache(cfg)
+        # Both caches are per process. Anything that changes a cached row
+        # calls the matching invalidate_*(); the TTL bounds how long another
+        # worker can serve a stale copy.
+        self.user_cache = TTLCache(cfg["USER_CACHE_SIZE"], cfg["USER_CACHE_TTL"])
+        self.unread_cache = TTLCache(cfg["USER_CACHE_SIZE"], cfg["UNREAD_CACHE_TTL"])
+        self.photos = images.ImagePipeline(
+            cfg["UPLOAD_FOLDER"], cfg["UPLOAD_ORIGINALS_FOLDER"], self.db.sessionmaker,
+            widths=cfg["IMAGE_WIDTHS"], workers=cfg["IMAGE_WORKERS"],
+            on_update=lambda item_id: self.invalidate("items"),
+        )
+        self.events = events.Broker(self.db.sessionmaker, cfg["SSE_POLL_SECONDS"])
+        self.suggest = suggest.SuggestIndex(self.db.sessionmaker, cfg["SUGGEST_MAX_TERMS"], cfg["SUGGEST_REFRESH"])
+        self.timings = perf.Perf(app, self.db)
+        self.fragment_cache = fragments.init_app(app)
+        self.dispatcher = None
+        self._fts = None
+        if cfg["OUTBOX_WORKER"] == "thread" and cfg["NOTIFY_CHANNELS"]:
+            app.before_request(self._start_dispatcher)
+        event.listen(self.db.sessionmaker, "after_commit", self._after_commit)
+        event.listen(self.db.sessionmaker, "after_rollback", self._after_rollback)
+        app.teardown_appcontext(lambda exc: self.Session.remove())
+        app.extensions["lostfound"] = self
+
+    @property
+    def fts(self):
+        """Indexed search is used when `flask init-db` installed it."""
+        if self._fts is None:
+            self._fts = search.available(self.db.engine)
+        return self._fts
+
+    # ----- Outbox -----
+
+    def _start_dispatcher(self):
+        # a thread started at create time would not survive a fork (gunicorn
+        # --preload), so each worker starts its own on its first request
+        if self.dispatcher is None:
+            self.dispatcher = outbox.Dispatcher(self.db.sessionmaker, self.config)
+            self.dispatcher.start()
+
+    def notify(self, s, user_ids, title, body):
+        """Queue notifications in the caller's session; they commit with it."""
+        outbox.enqueue(s, user_ids, title, body, self.config["NOTIFY_CHANNELS"])
+
+    def _after_commit(self, s):
+        notified = s.info.pop("notified", None)
+        if notified:
+            for uid in notified:
+                self.invalidate_unread(uid)
+            self.events.wake()
+            if self.dispatcher:
+                self.dispatcher.wake()
+
+    def _after_rollback(self, s):
+        s.info.pop("notified", None)
+
+    # ----- Cached reads -----
+
+    def invalidate(self, *groups):
+        self.cache.delete(*{k for g in groups for k in CACHE_KEYS[g]})
+
+    def cached_categories(self):
+        def load():
+            with self.Session() as s:
+                return s.execute(select(Category).order_by(Category.name)).scalars().all()
+        return self.cache.get_or_set("categories", load)
+
+    def cached_facets(self, q, category_id):
+        # one key per search; dropping "facets:gen" (any item change) retires them all
+        gen = self.cache.get_or_set("facets:gen", time.time_ns)
+        def load():
+            with self.Session() as s:
+                return search.facets(s, q, category_id, self.fts)
+        return self.cache.get_or_set(f"facets:{gen}:{search.facet_key(q, category_id)}", load)
+
+    def imported(self, kind):
+        """Drop what a bulk import of items / claims / users makes stale."""
+        self.invalidate(kind)
+        if kind == "items":
+            self.suggest.stale()
+
+    def invalidate_user(self, user_id):
+        self.user_cache.delete(user_id)
+
+    def invalidate_unread(self, user_id):
+        self.unread_cache.delete(user_id)
+        if has_request_context() and current_user.is_authenticated and current_user.id == user_id:
+            g.pop("unread_count", None)
+
+    def unread_count(self):
+        if not current_user.is_authenticated:
+            return 0
+        if "unread_count" not in g:   # base.html asks twice per render
+            count = self.unread_cache.get(current_user.id)
+            if count is None:
+                with self.Session() as s:   # kept up to date by outbox.enqueue_many() / mark_read()
+                    count = s.scalar(select(User.unread_count).where(User.id == current_user.id)) or 0
+                self.unread_cache.set(current_user.id, count)
+            g.unread_count = count
+        return g.unread_count
+
+    # ----- Setup (run by `flask init-db`, not at startup) -----
+
+    def init_db(self):
+        """Upgrade the schema, install full-text search and seed the default
+        categories. Safe to run again; returns what it did."""
+        os.makedirs(self.config["UPLOAD_FOLDER"], exist_ok=True)
+        applied = migrations.upgrade(self.db.engine)
+        self._fts = search.install(self.db.engine)
+        with self.Session() as s:
+            seeded = 0
+            if not s.execute(select(Category)).first():
+                s.add_all(Category(name=name, slug=slug) for name, slug in DEFAULT_CATEGORIES)
+                s.commit()
+                seeded = len(DEFAULT_CATEGORIES)
+        self.invalidate("categories")
+        return dict(migrations=applied, fts=self._fts, categories=seeded)
+
+ext = LocalProxy(lambda: current_app.extensions["lostfound"])
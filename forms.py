@@ -55,6 +55,15 @@ class SearchForm(FlaskForm):
     q = StringField("Search", validators=[Optional(), Length(max=140)])
     category = SelectField("Category", coerce=int, validators=[Optional()])
     sort = SelectField("Sort By", choices=[
-        ("date_desc","Newest"),("date_asc","Oldest"),("category","Category")
+        ("relevance","Best match"),("date_desc","Newest"),("date_asc","Oldest"),("category","Category")
     ])
     submit = SubmitField("Apply")
+
+class ClaimFilterForm(FlaskForm):
+    status = SelectField("Status", choices=[
+        ("pending","Pending"),("approved","Approved"),("rejected","Rejected"),("","Any status")
+    ], default="pending", validators=[Optional()])
+    item = StringField("Item", validators=[Optional(), Length(max=140)])   # "#id" or part of the name
+    since = DateField("From", validators=[Optional()])
+    until = DateField("To", validators=[Optional()])
+    submit = SubmitField("Filter")
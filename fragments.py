@@ -0,0 +1,43 @@
+from jinja2 import nodes
+from jinja2.ext import Extension
+from cache import TTLCache
+
+# ----- Jinja fragment cache -----
+#   {% cache "item_card", item.id, item.updated_at %} ... {% endcache %}
+# renders the block once and reuses the HTML for as long as the key stays
+# the same. Put a version in the key (Item.updated_at is bumped by every
+# UPDATE of the row) and changes invalidate themselves: the new version
+# misses, the old entry ages out of the LRU. The store is a per-process
+# TTLCache; FRAGMENT_CACHE_SIZE=0 renders every block normally.
+
+class FragmentCache(Extension):
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render", [nodes.List(key)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        store = self.environment.fragment_cache
+        if store is None:
+            return caller()
+        key = tuple(key)
+        html = store.get(key)
+        if html is None:
+            html = caller()
+            store.set(key, html)
+        return html
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCache)
+    store = TTLCache(app.config.get("FRAGMENT_CACHE_SIZE", 2048), app.config.get("FRAGMENT_CACHE_TTL", 3600))
+    app.jinja_env.fragment_cache = store if store.enabled else None
+    return store
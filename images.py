@@ -0,0 +1,175 @@
+import hashlib, io, json, logging, os
+from importlib.util import find_spec
+from flask import url_for
+from sqlalchemy import update
+from models import Item
+from uploads import upload_url
+
+# Pillow is optional; without it uploads are stored as-is. It is imported on
+# first use only (is_image(), render_variants()), so the web process doesn't
+# pay for it at startup.
+HAVE_PIL = find_spec("PIL") is not None
+
+log = logging.getLogger(__name__)
+
+# ----- Upload derivatives -----
+# Every upload is stored once under its content hash. A process pool turns it
+# into EXIF-free WebP + JPEG variants at a few fixed widths, named
+# "<hash>_<width>.<ext>", and records the widths on Item.photo_variants.
+# The raw upload is kept outside the served folder for re-processing.
+
+FORMATS = {
+    "webp": ("WEBP", dict(quality=80, method=4)),
+    "jpg": ("JPEG", dict(quality=82, optimize=True, progressive=True)),
+}
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def variant_name(digest, width, ext):
+    return f"{digest}_{width}.{ext}"
+
+def is_image(data):
+    """Whether Pillow can read `data` as an image (headers only, no decode)."""
+    from PIL import Image
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            im.verify()
+    except (OSError, SyntaxError):   # UnidentifiedImageError is an OSError
+        return False
+    return True
+
+def render_variants(src, out_dir, digest, widths):
+    """Runs in a pool worker. Returns the list of widths written."""
+    from PIL import Image, ImageOps
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)   # bake in rotation before EXIF is dropped
+        if im.mode in ("RGBA", "LA", "P"):
+            im = im.convert("RGBA")
+            bg = Image.new("RGB", im.size, (255, 255, 255))
+            bg.paste(im, mask=im.getchannel("A"))
+            im = bg
+        else:
+            im = im.convert("RGB")
+        done = []
+        for w in sorted(widths):
+            # never upscale; the smallest width is always produced
+            if done and w > im.width:
+                break
+            scaled = im.copy()
+            scaled.thumbnail((w, w * 4), Image.LANCZOS)
+            for ext, (fmt, opts) in FORMATS.items():
+                path = os.path.join(out_dir, variant_name(digest, w, ext))
+                tmp = f"{path}.{os.getpid()}.part"   # the same upload may be rendering in another worker
+                scaled.save(tmp, fmt, **opts)   # no exif= -> metadata stripped
+                os.replace(tmp, path)
+            done.append(w)
+    return done
+
+class ImagePipeline:
+    def __init__(self, upload_dir, originals_dir, session_factory, widths=(320, 640, 1280), workers=2,
+                 on_update=None):
+        self.upload_dir = upload_dir
+        self.on_update = on_update   # called with the item id once its variants are recorded
+        self.originals_dir = originals_dir
+        self.session_factory = session_factory
+        self.widths = tuple(sorted(widths))
+        self.workers = workers
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:    # created on first upload, not at import/fork time
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def store(self, file_storage, ext):
+        """Save an upload under its content hash.
+
+        Returns (digest, photo_path, variants, raw). When the same bytes were
+        processed before, photo_path/variants are filled in right away;
+        otherwise they are None and process(item_id, digest, raw) must be
+        called once the Item row exists. Raises ValueError if Pillow can't
+        read the upload."""
+        data = file_storage.read()
+        digest = content_hash(data)
+        if not HAVE_PIL:
+            name = f"{digest}.{ext}"
+            path = os.path.join(self.upload_dir, name)
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(data)
+            return digest, name, None, None
+        existing = self.existing_variants(digest)
+        if existing:
+            return digest, variant_name(digest, existing[-1], "jpg"), existing, None
+        if not is_image(data):
+            raise ValueError("not an image Pillow can read")
+        os.makedirs(self.originals_dir, exist_ok=True)
+        raw = os.path.join(self.originals_dir, f"{digest}.{ext}")
+        if not os.path.exists(raw):
+            with open(raw, "wb") as f:
+                f.write(data)
+        return digest, None, None, raw
+
+    def existing_variants(self, digest):
+        found = []
+        for w in self.widths:
+            if not all(os.path.exists(os.path.join(self.upload_dir, variant_name(digest, w, ext)))
+                       for ext in FORMATS):
+                break
+            found.append(w)
+        return found
+
+    def process(self, item_id, digest, raw):
+        args = (raw, self.upload_dir, digest, self.widths)
+        if self.workers <= 0:
+            try:
+                widths = render_variants(*args)
+            except Exception:   # the item is already committed; it just keeps no thumbnails
+                log.exception("image processing failed for item %s (%s)", item_id, digest)
+                return
+            self._record(item_id, digest, widths)
+            return
+        fut = self.pool.submit(render_variants, *args)
+        fut.add_done_callback(lambda f: self._done(item_id, digest, f))
+
+    def _done(self, item_id, digest, fut):
+        try:
+            widths = fut.result()
+        except Exception:
+            log.exception("image processing failed for item %s (%s)", item_id, digest)
+            return
+        self._record(item_id, digest, widths)
+
+    def _record(self, item_id, digest, widths):
+        if not widths:
+            return
+        with self.session_factory() as s:
+            s.execute(update(Item).where(Item.id == item_id).values(
+                photo_path=variant_name(digest, widths[-1], "jpg"),
+                photo_variants=json.dumps(widths),
+            ))
+            s.commit()
+        if self.on_update:
+            self.on_update(item_id)
+
+# ----- Template helpers -----
+
+def photo_widths(item):
+    return json.loads(item.photo_variants) if item.photo_variants else []
+
+def photo_url(item, width=None):
+    """Best single URL for an item photo, at most `width` wide when variants exist."""
+    widths = photo_widths(item)
+    if not widths or width is None:
+        return upload_url(item.photo_path)
+    fits = [w for w in widths if w <= width] or widths[:1]
+    return url_for("main.uploaded_file", filename=variant_name(item.photo_hash, fits[-1], "jpg"))
+
+def photo_srcset(item, ext="jpg"):
+    return ", ".join(
+        f"{url_for('main.uploaded_file', filename=variant_name(item.photo_hash, w, ext))} {w}w"
+        for w in photo_widths(item)
+    )
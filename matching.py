@@ -0,0 +1,146 @@
+import hashlib, random, struct
+from functools import lru_cache
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.orm import joinedload
+from models import Item, ItemStatus, ItemMatchKey, Claim, ClaimStatus
+import outbox
+import search
+
+# ----- Match suggestions for new reports -----
+# A new report is compared with the open ("found") reports other people
+# filed in the same category around the same date. Everyone who is looking
+# for one of those (a pending or rejected claim on it) hears about the new
+# report as well: either may be the thing they lost.
+#
+# Each item's words (name, description, location) form a token set. A
+# MinHash signature of NUM_PERM values estimates how much two sets overlap;
+# LSH splits it into BANDS bands of ROWS values and hashes each band,
+# together with the category and the item's WINDOW_DAYS date window, into
+# one key in `item_match_keys`. Items that share a key are candidates: one
+# indexed IN lookup over the keys of the item's window and its neighbours,
+# however many items the table holds. Candidates are then ranked by exact
+# Jaccard similarity. With BANDS=16 x ROWS=2, pairs around 0.25 similarity
+# and up are very likely to share a band.
+#
+# The index is written with each report (index()) and rebuilt by migration
+# 5 / rebuild(). Closed items stay indexed; matches() filters them out.
+
+NUM_PERM = 32
+BANDS, ROWS = 16, 2
+WINDOW_DAYS = 14
+MAX_CANDIDATES = 200      # best-sharing candidates re-ranked per lookup
+TOP_K = 5
+MIN_SCORE = 0.2           # Jaccard below this isn't worth showing
+NOTIFY_SCORE = 0.35       # ... or notifying about
+
+STOPWORDS = frozenset("""a an and are at by for from has have in is it its left my near of on or the this to
+    was with""".split())
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(NUM_PERM)]
+
+def features(item):
+    """Token set of an Item (or any row with the same text columns)."""
+    text = " ".join((item.name or "", item.description or "", item.location_found or ""))
+    return frozenset(t for t in search.terms(text) if len(t) > 1 and t not in STOPWORDS)
+
+@lru_cache(maxsize=65536)
+def _token_hashes(token):
+    x = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+    return tuple((a * x + b) % _PRIME for a, b in _PERMS)
+
+def signature(tokens):
+    if not tokens:
+        return None
+    return [min(col) for col in zip(*map(_token_hashes, tokens))]
+
+def window(date_found):
+    return date_found.toordinal() // WINDOW_DAYS
+
+def band_keys(category_id, win, sig):
+    keys = []
+    for b in range(BANDS):
+        raw = struct.pack(f">qqq{ROWS}Q", category_id or 0, win, b, *sig[b * ROWS:(b + 1) * ROWS])
+        keys.append(int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big", signed=True))
+    return keys
+
+def item_keys(item, spread=0):
+    """LSH keys for an item; spread=1 adds the neighbouring date windows (lookups)."""
+    sig = signature(features(item))
+    if sig is None:
+        return []
+    win = window(item.date_found)
+    return [k for w in range(win - spread, win + spread + 1) for k in band_keys(item.category_id, w, sig)]
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def index(s, item):
+    """Add a flushed item to the index, in the caller's transaction."""
+    keys = set(item_keys(item))
+    if keys:
+        s.execute(insert(ItemMatchKey), [dict(key=k, item_id=item.id) for k in keys])
+
+def candidates(s, item, limit=MAX_CANDIDATES):
+    """Ids of items sharing an LSH band with `item`, most shared bands first."""
+    keys = item_keys(item, spread=1)
+    if not keys:
+        return []
+    return s.scalars(
+        select(ItemMatchKey.item_id)
+        .where(ItemMatchKey.key.in_(keys), ItemMatchKey.item_id != item.id)
+        .group_by(ItemMatchKey.item_id)
+        .order_by(func.count().desc(), ItemMatchKey.item_id.desc())
+        .limit(limit)
+    ).all()
+
+def matches(s, item, k=TOP_K):
+    """Top-k open reports by other people that look like `item` -> [(score, Item)]."""
+    ids = candidates(s, item)
+    if not ids:
+        return []
+    rows = s.execute(
+        select(Item).options(joinedload(Item.category))
+        .where(Item.id.in_(ids), Item.status == ItemStatus.FOUND, Item.reported_by != item.reported_by)
+    ).scalars().all()
+    mine = features(item)
+    scored = sorted(((jaccard(mine, features(c)), c) for c in rows), key=lambda p: (-p[0], -p[1].id))
+    return [(score, c) for score, c in scored[:k] if score >= MIN_SCORE]
+
+def notify_owners(s, item, found, channels=()):
+    """Tell whoever claimed a strong match (pending or rejected) about the
+    new item too; returns who was told. The finders of the matches are not
+    told: the new report is of something they found, not lost."""
+    strong = {c.id: c for score, c in found if score >= NOTIFY_SCORE}
+    if not strong:
+        return set()
+    claimed = s.execute(
+        select(Claim.item_id, Claim.claimer_id)
+        .where(Claim.item_id.in_(strong), Claim.status.in_((ClaimStatus.PENDING, ClaimStatus.REJECTED)),
+               Claim.claimer_id != item.reported_by)
+    ).all()
+    rank = {item_id: n for n, item_id in enumerate(strong)}    # `found` is best first
+    best = {}
+    for item_id, uid in sorted(claimed, key=lambda r: rank[r.item_id]):
+        best.setdefault(uid, strong[item_id])
+    outbox.enqueue_many(s, [
+        (uid, "Possible Match", f"'{item.name}' (item #{item.id}) was just reported and looks like "
+                                f"'{c.name}' (item #{c.id}), which you claimed. It may be the one you lost.")
+        for uid, c in best.items()
+    ], channels)
+    return set(best)
+
+def rebuild(conn, batch=2000):
+    """Re-index every item (migration 5, `flask rebuild-matches`); returns the count."""
+    conn.execute(delete(ItemMatchKey))
+    cols = (Item.id, Item.name, Item.description, Item.location_found, Item.category_id, Item.date_found)
+    last = done = 0
+    while True:
+        rows = conn.execute(select(*cols).where(Item.id > last).order_by(Item.id).limit(batch)).all()
+        if not rows:
+            return done
+        keys = [dict(key=k, item_id=r.id) for r in rows for k in set(item_keys(r))]
+        if keys:
+            conn.execute(insert(ItemMatchKey), keys)
+        last, done = rows[-1].id, done + len(rows)
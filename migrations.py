@@ -0,0 +1,125 @@
+from datetime import datetime
+from sqlalchemy import inspect, text
+from models import Base
+import matching
+import outbox
+import rollups
+
+# ----- Versioned schema migrations -----
+# Applied versions are recorded in `schema_migrations`; upgrade() runs the
+# missing ones in order, inside one transaction, from `flask init-db` or
+# `python -m migrations`. Migration 1 creates whatever tables are missing
+# from the current models, so on a fresh database the later steps find
+# their work already done. Every step must therefore be safe to re-run
+# (check before ALTER, CREATE ... IF NOT EXISTS).
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+def add_column(conn, table, name, ddl):
+    if name not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+def create_indexes(conn, *tables):
+    for t in tables:
+        for ix in Base.metadata.tables[t].indexes:
+            ix.create(conn, checkfirst=True)
+
+@migration(1, "baseline schema")
+def _baseline(conn):
+    Base.metadata.create_all(conn)
+
+@migration(2, "items: photo hash and variants")
+def _photo_variants(conn):
+    add_column(conn, "items", "photo_hash", "VARCHAR(64)")
+    add_column(conn, "items", "photo_variants", "TEXT")
+
+@migration(3, "indexes for list, count and lookup queries")
+def _hot_indexes(conn):
+    create_indexes(conn, "users", "items", "claims", "notifications", "outbox")
+
+@migration(4, "items: updated_at")
+def _item_updated_at(conn):
+    add_column(conn, "items", "updated_at", "DATETIME")
+    conn.execute(text("UPDATE items SET updated_at = created_at WHERE updated_at IS NULL"))
+
+@migration(5, "item_match_keys: LSH index for match suggestions")
+def _match_keys(conn):
+    Base.metadata.tables["item_match_keys"].create(conn, checkfirst=True)
+    create_indexes(conn, "item_match_keys")
+    matching.rebuild(conn)
+
+@migration(6, "items: covering index for browse facet counts")
+def _facet_index(conn):
+    create_indexes(conn, "items")
+
+@migration(7, "archive tables for retention")
+def _archive_tables(conn):
+    for name in ("items_archive", "claims_archive", "notifications_archive"):
+        Base.metadata.tables[name].create(conn, checkfirst=True)
+        create_indexes(conn, name)
+
+@migration(8, "daily rollup tables for /admin/trends")
+def _rollup_tables(conn):
+    for name in ("rollup_items", "rollup_claims", "rollup_locations"):
+        Base.metadata.tables[name].create(conn, checkfirst=True)
+    rollups.rebuild(conn)
+
+@migration(9, "users: unread notification counter")
+def _unread_count(conn):
+    add_column(conn, "users", "unread_count", "INTEGER NOT NULL DEFAULT 0")
+    outbox.recount_unread(conn)
+
+@migration(10, "rollups: count returns with a known return time")
+def _rollup_timed(conn):
+    add_column(conn, "rollup_items", "timed", "INTEGER NOT NULL DEFAULT 0")
+    rollups.rebuild(conn)
+
+def _ensure_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, description VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)"
+    ))
+
+def applied_versions(conn):
+    _ensure_table(conn)
+    return {v for (v,) in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def upgrade(engine):
+    """Apply pending migrations; returns the list of versions applied."""
+    done = []
+    with engine.begin() as conn:
+        have = applied_versions(conn)
+        for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+            if version in have:
+                continue
+            fn(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.utcnow()},
+            )
+            done.append(version)
+    return done
+
+def status(engine):
+    with engine.begin() as conn:
+        have = applied_versions(conn)
+    return [(v, d, v in have) for v, d, _ in sorted(MIGRATIONS, key=lambda m: m[0])]
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import create_engine
+    from config import Config
+    ap = argparse.ArgumentParser(description="upgrade the database schema in place")
+    ap.add_argument("--status", action="store_true", help="list migrations without applying them")
+    args = ap.parse_args()
+    engine = create_engine(Config.SQLALCHEMY_DATABASE_URI, future=True)
+    if not args.status:
+        print("applied:", upgrade(engine) or "nothing to do")
+    for version, description, applied in status(engine):
+        print(f"{version:>4} {'x' if applied else ' '} {description}")
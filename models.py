@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import datetime, date
 from flask_login import UserMixin
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
+    Column, Integer, BigInteger, String, Text, Date, DateTime, ForeignKey, Enum, Boolean, Index
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column, declarative_base
 from enum import Enum as PyEnum
@@ -21,11 +21,17 @@ class User(UserMixin, Base):
     role: Mapped[str] = mapped_column(String(20), default=Roles.USER, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    unread_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)   # navbar badge; see outbox.py
 
     items = relationship("Item", back_populates="reported_by_user", cascade="all,delete")
     claims = relationship("Claim", back_populates="claimer", cascade="all,delete")
     notifications = relationship("Notification", back_populates="user", cascade="all,delete")
 
+    __table_args__ = (
+        Index("ix_users_created_id", "created_at", "id"),       # admin user list
+        Index("ix_users_role", "role"),                          # admin ids for notify()
+    )
+
 class Category(Base):
     __tablename__ = "categories"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -47,7 +53,10 @@ class Item(Base):
     location_found: Mapped[str] = mapped_column(String(140), nullable=False)
     date_found: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     photo_path: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    photo_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)       # content hash of the upload
+    photo_variants: Mapped[str | None] = mapped_column(Text, nullable=True)         # JSON list of widths
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # version for cached fragments
 
     category_id: Mapped[int] = mapped_column(Integer, ForeignKey("categories.id"))
     category = relationship("Category", back_populates="items")
@@ -57,6 +66,25 @@ class Item(Base):
 
     claims = relationship("Claim", back_populates="item", cascade="all,delete")
 
+    __table_args__ = (
+        Index("ix_items_created_id", "created_at", "id"),                 # recent / admin lists
+        Index("ix_items_date_found_id", "date_found", "id"),              # browse by date
+        Index("ix_items_category_date", "category_id", "date_found", "id"),  # browse one category
+        Index("ix_items_status", "status"),                               # status counts
+        Index("ix_items_facets", "category_id", "status", "date_found"),  # browse facet counts (covering)
+        Index("ix_items_reporter_created", "reported_by", "created_at", "id"),  # dashboard
+    )
+
+class ItemMatchKey(Base):
+    """One LSH band of an item's text signature (see matching.py)."""
+    __tablename__ = "item_match_keys"
+    key: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    item_id: Mapped[int] = mapped_column(Integer, ForeignKey("items.id"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_item_match_keys_item", "item_id"),                     # re-index / delete one item
+    )
+
 class ClaimStatus:
     PENDING = "pending"
     APPROVED = "approved"
@@ -74,6 +102,13 @@ class Claim(Base):
     item = relationship("Item", back_populates="claims")
     claimer = relationship("User", back_populates="claims")
 
+    __table_args__ = (
+        Index("ix_claims_item_claimer", "item_id", "claimer_id"),         # duplicate-claim check
+        Index("ix_claims_status_created", "status", "created_at"),        # pending count / queue
+        Index("ix_claims_claimer_created", "claimer_id", "created_at", "id"),  # dashboard
+        Index("ix_claims_created_id", "created_at", "id"),                # admin claim list
+    )
+
 class Notification(Base):
     __tablename__ = "notifications"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -84,3 +119,116 @@ class Notification(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="notifications")
+
+    __table_args__ = (
+        Index("ix_notifications_user_unread", "user_id", "is_read", "created_at"),  # badge count
+        Index("ix_notifications_user_created", "user_id", "created_at", "id"),      # list page
+    )
+
+class OutboxStatus:
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+class OutboxMessage(Base):
+    """One delivery of a notification over an external channel (email, webhook)."""
+    __tablename__ = "outbox"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    channel: Mapped[str] = mapped_column(String(20), nullable=False)
+    recipient_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    payload: Mapped[str] = mapped_column(Text, nullable=False)   # JSON
+    status: Mapped[str] = mapped_column(String(20), default=OutboxStatus.PENDING, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_status_available", "status", "available_at"),   # dispatcher poll
+    )
+
+
+# ----- Archive (see retention.py) -----
+# Same columns as the hot tables plus archived_at; rows keep their ids, so
+# /item/<id> still resolves. No foreign keys back into the hot tables.
+
+class ArchivedItem(Base):
+    __tablename__ = "items_archive"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(140), nullable=False)
+    description: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(20))
+    location_found: Mapped[str] = mapped_column(String(140), nullable=False)
+    date_found: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    photo_path: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    photo_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    photo_variants: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+    category_id: Mapped[int] = mapped_column(Integer, ForeignKey("categories.id"))
+    reported_by: Mapped[int] = mapped_column(Integer)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    category = relationship("Category")
+
+    __table_args__ = (
+        Index("ix_items_archive_reporter", "reported_by"),
+    )
+
+class ArchivedClaim(Base):
+    __tablename__ = "claims_archive"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    item_id: Mapped[int] = mapped_column(Integer)
+    claimer_id: Mapped[int] = mapped_column(Integer)
+    message: Mapped[str] = mapped_column(Text, nullable=True)
+    status: Mapped[str] = mapped_column(String(20))
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_claims_archive_item", "item_id"),
+        Index("ix_claims_archive_claimer", "claimer_id"),
+    )
+
+class ArchivedNotification(Base):
+    __tablename__ = "notifications_archive"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(Integer)
+    title: Mapped[str] = mapped_column(String(160), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    is_read: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_notifications_archive_user", "user_id", "created_at"),
+    )
+
+
+# ----- Daily rollups (see rollups.py) -----
+# Counters kept up to date by the write paths, one row per day (and
+# category / location), so /admin/trends never aggregates the hot tables.
+
+class ItemDaily(Base):
+    __tablename__ = "rollup_items"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    category_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    reported: Mapped[int] = mapped_column(Integer, default=0, nullable=False)      # by date_found
+    returned: Mapped[int] = mapped_column(Integer, default=0, nullable=False)      # by day marked returned
+    timed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)         # returns with a known return time
+    return_seconds: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)  # reported -> returned, summed over those
+
+class ClaimDaily(Base):
+    __tablename__ = "rollup_claims"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)                      # day the claims were made
+    submitted: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    approved: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rejected: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+class LocationDaily(Base):
+    __tablename__ = "rollup_locations"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    location: Mapped[str] = mapped_column(String(140), primary_key=True)          # normalized location_found
+    reported: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,91 @@
+from datetime import datetime, time
+from sqlalchemy import select, update
+from sqlalchemy.orm import joinedload
+from models import Item, ItemStatus, Claim, ClaimStatus
+import outbox
+import rollups
+
+# ----- Claim moderation -----
+# queue() builds the filtered claim list for /admin/claims. decide()
+# approves or rejects a batch of claims with a handful of set-based UPDATEs
+# in the caller's transaction:
+#   * only pending claims change; anything already decided is skipped
+#   * approving takes at most one claim per item (the oldest picked) and only
+#     while the item is still "found"; the item becomes "claimed" and every
+#     other pending claim on it is rejected
+#   * each conditional UPDATE returns the rows it actually changed, so two
+#     admins working the same queue can't both approve one item, and only
+#     changed claims get a notification (written in bulk through the outbox)
+#     and are added to the daily rollups
+
+MAX_BATCH = 500
+_DECIDED = (Claim.id, Claim.claimer_id, Claim.item_id, Claim.created_at)   # created_at for the rollups
+
+def queue(status=None, item=None, since=None, until=None):
+    q = select(Claim).options(joinedload(Claim.item), joinedload(Claim.claimer))
+    if status:
+        q = q.where(Claim.status == status)
+    if item:
+        item = item.strip().lstrip("#")
+        if item.isdigit():
+            q = q.where(Claim.item_id == int(item))
+        else:
+            q = q.where(Claim.item_id.in_(select(Item.id).where(Item.name.ilike(f"%{item}%"))))
+    if since:
+        q = q.where(Claim.created_at >= datetime.combine(since, time.min))
+    if until:
+        q = q.where(Claim.created_at <= datetime.combine(until, time.max))
+    return q
+
+def decide(s, claim_ids, action, channels=()):
+    """Approve or reject claims; returns {"approved", "rejected", "skipped"} counts.
+
+    "rejected" includes competing claims closed by an approval; "skipped" are
+    selected claims left unchanged (already decided, or the item was taken)."""
+    ids = sorted({int(i) for i in claim_ids})[:MAX_BATCH]
+    if action not in ("approve", "reject"):
+        raise ValueError(action)
+    if not ids:
+        return dict(approved=0, rejected=0, skipped=0)
+
+    approved, rejected = [], []
+    if action == "approve":
+        # oldest pending claim per item among the selection
+        winners = {}
+        for cid, item_id in s.execute(
+            select(Claim.id, Claim.item_id).where(Claim.id.in_(ids), Claim.status == ClaimStatus.PENDING)
+            .order_by(Claim.created_at, Claim.id)
+        ):
+            winners.setdefault(item_id, cid)
+        items = s.scalars(
+            update(Item).where(Item.id.in_(winners), Item.status == ItemStatus.FOUND)
+            .values(status=ItemStatus.CLAIMED).returning(Item.id)
+        ).all()
+        if items:
+            approved = s.execute(
+                update(Claim).where(Claim.id.in_([winners[i] for i in items]), Claim.status == ClaimStatus.PENDING)
+                .values(status=ClaimStatus.APPROVED).returning(*_DECIDED)
+            ).all()
+            rejected = s.execute(
+                update(Claim).where(Claim.item_id.in_(items), Claim.status == ClaimStatus.PENDING)
+                .values(status=ClaimStatus.REJECTED).returning(*_DECIDED)
+            ).all()
+    else:
+        rejected = s.execute(
+            update(Claim).where(Claim.id.in_(ids), Claim.status == ClaimStatus.PENDING)
+            .values(status=ClaimStatus.REJECTED).returning(*_DECIDED)
+        ).all()
+
+    if not approved and not rejected:
+        return dict(approved=0, rejected=0, skipped=len(ids))
+    names = dict(s.execute(select(Item.id, Item.name).where(
+        Item.id.in_({item_id for _, _, item_id, _ in approved + rejected}))).all())
+    outbox.enqueue_many(s, [
+        (uid, "Claim Approved", f"Your claim for '{names[item_id]}' was approved.") for _, uid, item_id, _ in approved
+    ] + [
+        (uid, "Claim Rejected", f"Your claim for '{names[item_id]}' was rejected.") for _, uid, item_id, _ in rejected
+    ], channels)
+    rollups.claims_decided(s, [(at, ClaimStatus.APPROVED) for *_, at in approved]
+                           + [(at, ClaimStatus.REJECTED) for *_, at in rejected])
+    changed = {cid for cid, _, _, _ in approved + rejected}
+    return dict(approved=len(approved), rejected=len(rejected), skipped=len(set(ids) - changed))
@@ -0,0 +1,222 @@
+import json, logging, smtplib, threading, urllib.request
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from sqlalchemy import select, insert, update, func, or_, case, bindparam
+from models import User, Notification, OutboxMessage, OutboxStatus
+
+log = logging.getLogger(__name__)
+
+# ----- Transactional outbox -----
+# enqueue() writes the in-app notifications and one outbox row per external
+# channel into the *caller's* session, so they commit (or roll back) together
+# with whatever caused them. A Dispatcher, running as a thread in the web
+# process or as `python -m outbox`, delivers the outbox rows afterwards.
+
+def enqueue(s, user_ids, title, body, channels=()):
+    enqueue_many(s, [(uid, title, body) for uid in dict.fromkeys(user_ids)], channels)
+
+def enqueue_many(s, messages, channels=()):
+    """Like enqueue(), with a (user_id, title, body) per recipient."""
+    messages = list(messages)
+    if not messages:
+        return
+    s.execute(insert(Notification), [
+        dict(user_id=uid, title=title, body=body) for uid, title, body in messages
+    ])
+    if channels:
+        s.execute(insert(OutboxMessage), [
+            dict(channel=ch, recipient_id=uid, payload=json.dumps({"title": title, "body": body}))
+            for uid, title, body in messages for ch in channels
+        ])
+    added = {}
+    for uid, _, _ in messages:
+        added[uid] = added.get(uid, 0) + 1
+    _add_unread(s, added)
+    # read by the session's after_commit hook (cache invalidation, wake-up)
+    s.info.setdefault("notified", set()).update(added)
+
+# ----- Unread counters -----
+# users.unread_count is the navbar badge. It changes in the same transaction
+# as the notifications it counts: enqueue_many() adds what it inserts,
+# mark_read() takes off what its UPDATE actually changed (so two requests
+# marking the same rows can't both subtract). recount_unread() recomputes
+# it from the table, for migration 9 and anything that inserts
+# notifications without enqueue().
+
+_users = User.__table__
+
+def _add_unread(s, counts):
+    """counts: {user_id: delta}; users in id order, so concurrent writers lock rows alike."""
+    s.execute(
+        update(_users).where(_users.c.id == bindparam("uid"))
+        .values(unread_count=case((_users.c.unread_count + bindparam("n") > 0,
+                                   _users.c.unread_count + bindparam("n")), else_=0)),
+        [dict(uid=uid, n=n) for uid, n in sorted(counts.items())],
+    )
+
+def mark_read(s, user_id, ids=None, up_to=None):
+    """Mark a user's unread notifications read with one UPDATE: those in
+    `ids`, those with id <= `up_to`, or all of them. Returns how many changed."""
+    stmt = update(Notification).where(Notification.user_id == user_id, Notification.is_read == False)
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+    if up_to is not None:
+        stmt = stmt.where(Notification.id <= up_to)
+    # loaded Notification objects keep showing what they were ("New")
+    n = s.execute(stmt.values(is_read=True).execution_options(synchronize_session=False)).rowcount
+    if n:
+        _add_unread(s, {user_id: -n})
+    return n
+
+def recount_unread(conn):
+    unread = (select(func.count()).select_from(Notification)
+              .where(Notification.user_id == _users.c.id, Notification.is_read == False).scalar_subquery())
+    return conn.execute(update(_users).values(unread_count=unread)).rowcount
+
+def depth(s):
+    """Outbox rows per status, e.g. {'pending': 3, 'dead': 1}."""
+    rows = s.execute(select(OutboxMessage.status, func.count()).group_by(OutboxMessage.status))
+    return {status: n for status, n in rows}
+
+# ----- Channels -----
+# A sender takes (message, recipient User, config) and raises on failure.
+# Each delivery carries the outbox id so receivers can drop duplicates: the
+# dispatcher is at-least-once (a crash between send and commit resends).
+
+def send_email(msg, user, config):
+    data = json.loads(msg.payload)
+    em = EmailMessage()
+    em["From"] = config["MAIL_FROM"]
+    em["To"] = user.email
+    em["Subject"] = data["title"]
+    em["Message-ID"] = f"<outbox-{msg.id}@{config['MAIL_SERVER']}>"
+    em.set_content(data["body"])
+    with smtplib.SMTP(config["MAIL_SERVER"], config["MAIL_PORT"], timeout=10) as smtp:
+        smtp.send_message(em)
+
+def send_webhook(msg, user, config):
+    data = dict(json.loads(msg.payload), user_id=user.id, id=msg.id)
+    req = urllib.request.Request(
+        config["NOTIFY_WEBHOOK_URL"], data=json.dumps(data).encode(), method="POST",
+        headers={"Content-Type": "application/json", "Idempotency-Key": f"outbox-{msg.id}"},
+    )
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        resp.read()
+
+SENDERS = {"email": send_email, "webhook": send_webhook}
+
+# ----- Dispatcher -----
+
+class Dispatcher(threading.Thread):
+    LEASE = timedelta(minutes=5)   # a 'sending' row older than this is retried
+
+    def __init__(self, session_factory, config, senders=None):
+        super().__init__(name="outbox-dispatcher", daemon=True)
+        self.session_factory = session_factory
+        self.config = config
+        self.senders = senders or SENDERS
+        self.poll = config.get("OUTBOX_POLL_SECONDS", 2)
+        self.batch_size = config.get("OUTBOX_BATCH_SIZE", 50)
+        self.max_attempts = config.get("OUTBOX_MAX_ATTEMPTS", 6)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set(); self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                n = self.dispatch_once()
+            except Exception:
+                log.exception("outbox dispatch failed")
+                n = 0
+            if n < self.batch_size:
+                self._wake.wait(self.poll)
+                self._wake.clear()
+
+    def _claim(self, s, now):
+        # Several dispatchers (one per gunicorn worker, or a separate process)
+        # may race for the same rows; the conditional UPDATE makes each row
+        # go to exactly one of them.
+        due = s.scalars(
+            select(OutboxMessage.id)
+            .where(OutboxMessage.available_at <= now,
+                   or_(OutboxMessage.status == OutboxStatus.PENDING,
+                       OutboxMessage.status == OutboxStatus.SENDING))
+            .order_by(OutboxMessage.id).limit(self.batch_size)
+        ).all()
+        claimed = []
+        for mid in due:
+            res = s.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == mid, OutboxMessage.available_at <= now,
+                       OutboxMessage.status.in_((OutboxStatus.PENDING, OutboxStatus.SENDING)))
+                .values(status=OutboxStatus.SENDING, attempts=OutboxMessage.attempts + 1,
+                        available_at=now + self.LEASE)
+            )
+            if res.rowcount == 1:
+                claimed.append(mid)
+        s.commit()
+        return claimed
+
+    def dispatch_once(self):
+        """Deliver one batch of due messages; returns how many were attempted."""
+        now = datetime.utcnow()
+        with self.session_factory() as s:
+            ids = self._claim(s, now)
+            if not ids:
+                return 0
+            msgs = s.scalars(select(OutboxMessage).where(OutboxMessage.id.in_(ids))).all()
+            users = {u.id: u for u in s.scalars(
+                select(User).where(User.id.in_({m.recipient_id for m in msgs}))
+            )}
+            for m in msgs:
+                sender = self.senders.get(m.channel)
+                try:
+                    if sender is None:
+                        raise LookupError(f"no sender for channel {m.channel!r}")
+                    user = users.get(m.recipient_id)
+                    if user is not None and user.is_active:
+                        sender(m, user, self.config)
+                except Exception as e:
+                    m.last_error = f"{type(e).__name__}: {e}"[:2000]
+                    if m.attempts >= self.max_attempts:
+                        m.status = OutboxStatus.DEAD
+                        log.warning("outbox #%s dead after %s attempts: %s", m.id, m.attempts, m.last_error)
+                    else:
+                        m.status = OutboxStatus.PENDING
+                        m.available_at = datetime.utcnow() + timedelta(seconds=min(2 ** m.attempts * 5, 3600))
+                else:
+                    m.status = OutboxStatus.SENT
+                    m.sent_at = datetime.utcnow()
+                    m.last_error = None
+                s.commit()   # per message, so a later failure can't resend this one
+            return len(ids)
+
+if __name__ == "__main__":
+    # Standalone dispatcher: `python -m outbox` (add --depth to just print the queue)
+    import argparse, sys
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from config import Config
+    ap = argparse.ArgumentParser(description="deliver queued notifications")
+    ap.add_argument("--depth", action="store_true", help="print queue depth and exit")
+    ap.add_argument("--once", action="store_true", help="deliver one batch and exit")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(Config.SQLALCHEMY_DATABASE_URI, future=True)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    config = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    if args.depth:
+        with factory() as s:
+            print(json.dumps(depth(s)))
+        sys.exit(0)
+    d = Dispatcher(factory, config)
+    if args.once:
+        print(d.dispatch_once(), "delivered")
+        sys.exit(0)
+    d.run()
@@ -0,0 +1,99 @@
+import base64, binascii, json
+from datetime import datetime
+from flask import request, url_for
+from sqlalchemy import and_, or_
+
+# ----- Keyset (cursor) pagination -----
+# Instead of OFFSET, a page is "the next N rows after this sort key", which
+# stays an index range scan no matter how deep the user pages. `order` is a
+# list of (column, descending) pairs and must end in a unique column (the id)
+# so that every row has a distinct position.
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+def _enc(v):
+    return {"dt": v.isoformat()} if isinstance(v, datetime) else v
+
+def _dec(v):
+    return datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, [_enc(v) for v in values]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token, n_keys):
+    """Returns (direction, values), or None for a missing/garbled cursor."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        direction, values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if direction not in ("n", "p") or not isinstance(values, list) or len(values) != n_keys:
+        return None
+    try:
+        return direction, [_dec(v) for v in values]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _seek(order, values, backward):
+    # (a, b, id) "after" (va, vb, vid), expanded so each key can have its own
+    # direction: a>va OR (a=va AND b>vb) OR (a=va AND b=vb AND id>vid)
+    clauses = []
+    for i, (col, desc) in enumerate(order):
+        past = col < values[i] if desc != backward else col > values[i]
+        clauses.append(and_(*[order[j][0] == values[j] for j in range(i)], past))
+    return or_(*clauses)
+
+def paginate(session, stmt, order, cursor=None, per_page=24):
+    """Run `stmt` (a select() of one entity, without ORDER BY) one page at a time."""
+    decoded = decode_cursor(cursor, len(order))
+    direction, values = decoded if decoded else ("n", None)
+    backward = direction == "p"
+    if values is not None:
+        stmt = stmt.where(_seek(order, values, backward))
+    stmt = (
+        stmt.add_columns(*[col.label(f"_k{i}") for i, (col, _) in enumerate(order)])
+        .order_by(*[col.desc() if desc != backward else col.asc() for col, desc in order])
+        .limit(per_page + 1)
+    )
+    rows = session.execute(stmt).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+    if not rows:
+        return Page([])
+    first, last = list(rows[0][1:]), list(rows[-1][1:])
+    if backward:
+        next_cursor = encode_cursor("n", last)
+        prev_cursor = encode_cursor("p", first) if more else None
+    else:
+        next_cursor = encode_cursor("n", last) if more else None
+        prev_cursor = encode_cursor("p", first) if values is not None else None
+    return Page([r[0] for r in rows], next_cursor, prev_cursor)
+
+def page_url(cursor, param="cursor"):
+    """Current URL with one cursor parameter swapped (filters/sort kept)."""
+    args = request.args.to_dict()
+    args[param] = cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
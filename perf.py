@@ -0,0 +1,229 @@
+import bisect, cProfile, io, logging, pstats, random, threading, time
+from collections import Counter, deque
+from flask import request, template_rendered, before_render_template
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+# ----- Per-request instrumentation -----
+# Every request records its total time, time spent in SQL, time spent
+# rendering templates and the number of statements it ran. Those feed
+# per-endpoint histograms, shown on /admin/perf and exported in Prometheus
+# text format at /admin/perf/metrics. Numbers are per process; with several
+# gunicorn workers each one keeps (and exports) its own.
+#
+# A request that runs the same statement PERF_N_PLUS_ONE times or more is
+# flagged as an N+1 (a lazy load in a loop, usually) and logged once per
+# endpoint/statement. PERF_PROFILE_RATE runs that fraction of requests under
+# cProfile and keeps the latest few profiles for the admin page.
+
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERIES = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last bucket is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (None = +Inf)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.bounds + (None,), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def cumulative(self):
+        out, seen = [], 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            seen += n
+            out.append((bound, seen))
+        return out
+
+class EndpointStats:
+    def __init__(self):
+        self.total = Histogram(SECONDS)
+        self.sql = Histogram(SECONDS)
+        self.render = Histogram(SECONDS)
+        self.queries = Histogram(QUERIES)
+        self.max_queries = 0
+        self.n_plus_one = 0
+        self.last_n_plus_one = None   # (statement, times) from the latest flagged request
+
+class _Record:
+    __slots__ = ("start", "sql_time", "render_time", "render_start", "statements", "profiler")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.render_start = None
+        self.statements = Counter()
+        self.profiler = None
+
+class Perf:
+    PROFILES_KEPT = 20
+
+    def __init__(self, app=None, database=None):
+        self.endpoints = {}
+        self.profiles = deque(maxlen=self.PROFILES_KEPT)   # (when, endpoint, ms, text)
+        self._lock = threading.Lock()
+        self._local = threading.local()    # SQL from non-request threads isn't attributed
+        self._warned = set()
+        if app is not None:
+            self.init_app(app, database)
+
+    def init_app(self, app, database):
+        self.enabled = app.config.get("PERF_ENABLED", True)
+        self.n_plus_one = app.config.get("PERF_N_PLUS_ONE", 5)
+        self.profile_rate = app.config.get("PERF_PROFILE_RATE", 0.0)
+        self.server_timing = app.config.get("PERF_SERVER_TIMING", False)
+        if not self.enabled:
+            return
+        database.on_create(self._listen)   # the engines are built on first use
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._rendered, app)
+
+    # -- hooks --
+
+    def _listen(self, *engines):
+        for engine in engines:
+            if engine is not None:
+                event.listen(engine, "before_cursor_execute", self._before_cursor)
+                event.listen(engine, "after_cursor_execute", self._after_cursor)
+
+    def _before_request(self):
+        rec = self._local.rec = _Record()
+        if self.profile_rate and random.random() < self.profile_rate:
+            rec.profiler = cProfile.Profile()
+            rec.profiler.enable()
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("perf_start", []).append(time.perf_counter())
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["perf_start"].pop()
+        rec = getattr(self._local, "rec", None)
+        if rec is not None:
+            rec.sql_time += time.perf_counter() - started
+            rec.statements[statement] += 1
+
+    def _before_render(self, sender, template, context, **extra):
+        rec = getattr(self._local, "rec", None)
+        if rec is not None and rec.render_start is None:
+            rec.render_start = time.perf_counter()
+
+    def _rendered(self, sender, template, context, **extra):
+        rec = getattr(self._local, "rec", None)
+        if rec is not None and rec.render_start is not None:
+            rec.render_time += time.perf_counter() - rec.render_start
+            rec.render_start = None
+
+    def _after_request(self, response):
+        rec = getattr(self._local, "rec", None)
+        if rec is not None and self.server_timing:
+            n = sum(rec.statements.values())
+            response.headers["Server-Timing"] = (
+                f'sql;dur={rec.sql_time * 1000:.1f};desc="{n} queries", '
+                f"tpl;dur={rec.render_time * 1000:.1f}, "
+                f"app;dur={(time.perf_counter() - rec.start) * 1000:.1f}"
+            )
+        return response
+
+    def _teardown(self, exc=None):
+        rec = getattr(self._local, "rec", None)
+        if rec is None:
+            return
+        self._local.rec = None
+        elapsed = time.perf_counter() - rec.start
+        endpoint = request.endpoint or "<unmatched>"
+        if rec.profiler is not None:
+            rec.profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(rec.profiler, stream=out).sort_stats("cumulative").print_stats(25)
+            self.profiles.appendleft((time.strftime("%H:%M:%S"), endpoint, elapsed * 1000, out.getvalue()))
+
+        n = sum(rec.statements.values())
+        repeated = [(stmt, times) for stmt, times in rec.statements.items() if times >= self.n_plus_one]
+        with self._lock:
+            st = self.endpoints.get(endpoint)
+            if st is None:
+                st = self.endpoints[endpoint] = EndpointStats()
+            st.total.observe(elapsed)
+            st.sql.observe(rec.sql_time)
+            st.render.observe(rec.render_time)
+            st.queries.observe(n)
+            st.max_queries = max(st.max_queries, n)
+            if repeated:
+                st.n_plus_one += 1
+                st.last_n_plus_one = max(repeated, key=lambda r: r[1])
+        for stmt, times in repeated:
+            if (endpoint, stmt) not in self._warned:
+                self._warned.add((endpoint, stmt))
+                log.warning("possible N+1 on %s: statement ran %d times in one request: %s",
+                            endpoint, times, " ".join(stmt.split())[:300])
+
+    # -- reporting --
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.profiles.clear()
+            self._warned.clear()
+
+    def summary(self):
+        """One dict per endpoint, slowest (by total time spent) first."""
+        with self._lock:
+            rows = [dict(
+                endpoint=name, requests=st.total.count,
+                mean_ms=st.total.mean * 1000, p50_ms=_ms(st.total.quantile(0.5)),
+                p95_ms=_ms(st.total.quantile(0.95)), p99_ms=_ms(st.total.quantile(0.99)),
+                sql_ms=st.sql.mean * 1000, render_ms=st.render.mean * 1000,
+                queries=st.queries.mean, max_queries=st.max_queries,
+                n_plus_one=st.n_plus_one, last_n_plus_one=st.last_n_plus_one,
+            ) for name, st in self.endpoints.items()]
+        return sorted(rows, key=lambda r: r["mean_ms"] * r["requests"], reverse=True)
+
+    def prometheus(self):
+        lines = []
+        def histogram(name, help_, attr):
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} histogram")
+            for endpoint, st in sorted(self.endpoints.items()):
+                h = getattr(st, attr)
+                for bound, seen in h.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{le}"}} {seen}')
+                lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {h.sum:.6f}')
+                lines.append(f'{name}_count{{endpoint="{endpoint}"}} {h.count}')
+        with self._lock:
+            histogram("app_request_duration_seconds", "Time from before_request to teardown.", "total")
+            histogram("app_sql_duration_seconds", "Time spent executing SQL per request.", "sql")
+            histogram("app_template_render_seconds", "Time spent rendering templates per request.", "render")
+            histogram("app_sql_queries", "SQL statements executed per request.", "queries")
+            lines.append("# HELP app_n_plus_one_requests_total Requests that repeated one statement "
+                         "PERF_N_PLUS_ONE times or more.")
+            lines.append("# TYPE app_n_plus_one_requests_total counter")
+            for endpoint, st in sorted(self.endpoints.items()):
+                lines.append(f'app_n_plus_one_requests_total{{endpoint="{endpoint}"}} {st.n_plus_one}')
+        return "\n".join(lines) + "\n"
+
+def _ms(seconds):
+    return seconds * 1000 if seconds is not None else None
@@ -0,0 +1,130 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, func, and_, or_, literal, DateTime
+from models import (Item, Claim, Notification, ItemMatchKey, ArchivedItem, ArchivedClaim,
+                    ArchivedNotification)
+import search
+
+# ----- Retention: move cold rows out of the hot tables -----
+# `flask archive` (e.g. nightly from cron) moves
+#   items whose status is in RETENTION_ITEMS and that haven't changed for
+#     that many days (updated_at), with their claims -> items_archive,
+#     claims_archive; their match-index keys and search entries go away
+#   read notifications older than RETENTION_READ_NOTIFICATIONS_DAYS
+#     -> notifications_archive
+# RETENTION_BATCH rows per transaction, with a short pause in between so
+# web requests get the write lock. Each batch copies and deletes in one
+# transaction: a row is always in exactly one of the two tables.
+#
+# The row with the highest id is never moved: SQLite hands out max(id) + 1
+# for new rows, so without it an id could come back and clash with the
+# archived one (archived items stay reachable at /item/<id>). The same goes
+# for claims, which move with their item: the item holding the newest claim
+# stays too.
+#
+# Afterwards: ANALYZE (sampled) so the planner sees the smaller tables, an
+# FTS merge, and VACUUM once RETENTION_VACUUM_FREE of the file is free pages.
+
+def _copy(conn, src, dst, where, now):
+    cols = [c.name for c in dst.__table__.c if c.name != "archived_at"]
+    rows = select(*[src.__table__.c[c] for c in cols], literal(now, DateTime)).where(where)
+    conn.execute(insert(dst).from_select(cols + ["archived_at"], rows))
+
+def item_filter(policy, now):
+    """Items a {status: days} policy archives."""
+    policy = {status: days for status, days in (policy or {}).items() if days}
+    if not policy:
+        return None
+    newest = select(func.max(Item.id)).scalar_subquery()
+    newest_claim = select(Claim.item_id).where(Claim.id == select(func.max(Claim.id)).scalar_subquery())
+    return and_(Item.id < newest, Item.id.not_in(newest_claim), or_(*(
+        and_(Item.status == status, Item.updated_at < now - timedelta(days=days))
+        for status, days in policy.items()
+    )))
+
+def notification_filter(days, now):
+    if not days:
+        return None
+    newest = select(func.max(Notification.id)).scalar_subquery()
+    return and_(Notification.id < newest, Notification.is_read == True,
+                Notification.created_at < now - timedelta(days=days))
+
+def archive_items(conn, where, batch, now):
+    """Move one batch of items (and their claims); returns (items, claims)."""
+    ids = conn.scalars(select(Item.id).where(where).order_by(Item.id).limit(batch)).all()
+    if not ids:
+        return 0, 0
+    _copy(conn, Item, ArchivedItem, Item.id.in_(ids), now)
+    _copy(conn, Claim, ArchivedClaim, Claim.item_id.in_(ids), now)
+    claims = conn.execute(delete(Claim).where(Claim.item_id.in_(ids))).rowcount
+    conn.execute(delete(ItemMatchKey).where(ItemMatchKey.item_id.in_(ids)))
+    conn.execute(delete(Item).where(Item.id.in_(ids)))     # the FTS trigger drops the search entry
+    return len(ids), claims
+
+def archive_notifications(conn, where, batch, now):
+    ids = conn.scalars(select(Notification.id).where(where).order_by(Notification.id).limit(batch)).all()
+    if ids:
+        _copy(conn, Notification, ArchivedNotification, Notification.id.in_(ids), now)
+        conn.execute(delete(Notification).where(Notification.id.in_(ids)))
+    return len(ids)
+
+def pending(engine, items=None, notification_days=None, now=None):
+    """How many rows a run would move: {"items": n, "notifications": n}."""
+    now = now or datetime.utcnow()
+    out = {}
+    with engine.connect() as conn:
+        for name, model, where in (("items", Item, item_filter(items, now)),
+                                   ("notifications", Notification, notification_filter(notification_days, now))):
+            out[name] = conn.scalar(select(func.count()).select_from(model).where(where)) if where is not None else 0
+    return out
+
+def run(engine, items=None, notification_days=None, batch=500, pause=0.05, now=None):
+    """Archive batch by batch until nothing matches; returns the counts."""
+    now = now or datetime.utcnow()
+    done = dict(items=0, claims=0, notifications=0, batches=0)
+    where = item_filter(items, now)
+    while where is not None:
+        with engine.begin() as conn:
+            n, claims = archive_items(conn, where, batch, now)
+        done["items"] += n
+        done["claims"] += claims
+        done["batches"] += bool(n)
+        if n < batch:
+            break
+        time.sleep(pause)
+    where = notification_filter(notification_days, now)
+    while where is not None:
+        with engine.begin() as conn:
+            n = archive_notifications(conn, where, batch, now)
+        done["notifications"] += n
+        done["batches"] += bool(n)
+        if n < batch:
+            break
+        time.sleep(pause)
+    return done
+
+def maintain(engine, vacuum_free=0.25, vacuum=True):
+    """ANALYZE, merge the FTS index, VACUUM if enough of the file is free
+    pages (SQLite only). Returns the steps that ran."""
+    if engine.dialect.name != "sqlite":
+        return []
+    steps = []
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("PRAGMA analysis_limit=1000")   # sample each index instead of reading all of it
+        cur.execute("ANALYZE")
+        steps.append("analyze")
+        if search.available(engine):
+            cur.execute(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('optimize')")
+            steps.append("fts optimize")
+        raw.commit()
+        pages = cur.execute("PRAGMA page_count").fetchone()[0]
+        free = cur.execute("PRAGMA freelist_count").fetchone()[0]
+        if vacuum and pages and free / pages >= vacuum_free:
+            cur.execute("VACUUM")    # rewrites the file; holds the write lock while it runs
+            steps.append(f"vacuum ({free} of {pages} pages free)")
+        cur.close()
+    finally:
+        raw.close()
+    return steps
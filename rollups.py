@@ -0,0 +1,202 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func, text, bindparam
+from models import (Category, Item, ItemStatus, Claim, ClaimStatus, ArchivedItem, ArchivedClaim,
+                    ItemDaily, ClaimDaily, LocationDaily)
+
+# ----- Daily rollups for /admin/trends -----
+# The write paths add to per-day counters in the same transaction as the
+# change itself (report(), claim(), moderation.decide(), set_item_status()
+# and bulk imports):
+#   rollup_items      per day and category: items found that day
+#                     (date_found), items marked returned that day and, for
+#                     those with a known return time, the seconds each waited
+#                     between being reported and returned
+#   rollup_claims     per day: claims made that day, and how many of those
+#                     have since been approved / rejected (approval rate by
+#                     the week claims came in)
+#   rollup_locations  per day and location: items found there
+# Changes are summed per row in a Tally and written with one
+# INSERT ... ON CONFLICT DO UPDATE SET n = n + excluded.n per table, so two
+# requests adding to the same day both count.
+#
+# `flask rebuild-rollups` (and migration 8) recompute everything from items
+# and claims, archived rows included, so the history outlives `flask archive`.
+# A returned item counts on its updated_at day: the day it was marked
+# returned, unless something else changed it since. Items returned before
+# updated_at existed (migration 4 set it to created_at) and items imported
+# as returned have updated_at == created_at: they count as returned, but
+# not towards the time to return.
+
+COUNTERS = {
+    ItemDaily: ("reported", "returned", "timed", "return_seconds"),
+    ClaimDaily: ("submitted", "approved", "rejected"),
+    LocationDaily: ("reported",),
+}
+TOP_LOCATIONS = 10
+MAX_WEEKS = 104
+
+def _upsert(model):
+    # plain SQL (same in SQLite and PostgreSQL): SQLAlchemy can't cache the
+    # compiled form of its on_conflict_do_update() constructs, and compiling
+    # cost more than running the statement
+    table, counters = model.__table__, COUNTERS[model]
+    keys = [c.name for c in table.primary_key]
+    cols = keys + list(counters)
+    return text(
+        f"INSERT INTO {table.name} ({', '.join(cols)}) VALUES ({', '.join(':' + c for c in cols)}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+        + ", ".join(f"{c} = {table.name}.{c} + excluded.{c}" for c in counters)
+    ).bindparams(*[bindparam(c, type_=table.c[c].type) for c in cols])
+
+UPSERTS = {model: _upsert(model) for model in COUNTERS}
+
+def return_known(item):
+    """Whether a returned item's updated_at is when it was returned (see above)."""
+    return item.updated_at is not None and item.updated_at > item.created_at
+
+def location_key(location):
+    """`location_found` as counted: whitespace collapsed, lower case."""
+    return " ".join((location or "").split()).lower()[:140]
+
+class Tally:
+    """Counter changes by rollup row; write() applies them."""
+
+    def __init__(self):
+        self.rows = {model: defaultdict(lambda: defaultdict(int)) for model in COUNTERS}
+
+    def add(self, model, key, **counts):
+        row = self.rows[model][key]
+        for name, n in counts.items():
+            row[name] += n
+
+    def item(self, item):
+        """A new item: anything with Item's columns (an Item, a Row)."""
+        day = item.date_found.date()
+        self.add(ItemDaily, (day, item.category_id or 0), reported=1)
+        if location_key(item.location_found):
+            self.add(LocationDaily, (day, location_key(item.location_found)), reported=1)
+        if item.status == ItemStatus.RETURNED:
+            self.returned(item, item.updated_at or item.created_at, timed=return_known(item))
+
+    def returned(self, item, at, sign=1, timed=True):
+        key = (at.date(), item.category_id or 0)
+        if not timed:
+            self.add(ItemDaily, key, returned=sign)
+            return
+        waited = max(0, int((at - (item.created_at or at)).total_seconds()))
+        self.add(ItemDaily, key, returned=sign, timed=sign, return_seconds=sign * waited)
+
+    def claim(self, created_at, status, new=True):
+        self.add(ClaimDaily, (created_at.date(),), submitted=int(new),
+                 approved=int(status == ClaimStatus.APPROVED), rejected=int(status == ClaimStatus.REJECTED))
+
+    def write(self, conn):
+        """Apply and clear; `conn` is a Session or a Connection."""
+        for model, rows in self.rows.items():
+            if rows:
+                keys = [c.name for c in model.__table__.primary_key]
+                conn.execute(UPSERTS[model], [dict(zip(keys, key), **{n: row[n] for n in COUNTERS[model]})
+                                              for key, row in rows.items()])
+                rows.clear()
+
+# ----- Write paths (caller's transaction) -----
+
+def reported(s, items):
+    tally = Tally()
+    for item in items:
+        tally.item(item)
+    tally.write(s)
+
+def status_changed(s, item, old, now=None):
+    """Call before the change is flushed: item.updated_at must still be the
+    time of the previous change (when it was marked returned, if it was)."""
+    if (old == ItemStatus.RETURNED) == (item.status == ItemStatus.RETURNED):
+        return
+    tally = Tally()
+    if old == ItemStatus.RETURNED:
+        tally.returned(item, item.updated_at or item.created_at, -1, timed=return_known(item))
+    else:
+        tally.returned(item, now or datetime.utcnow())
+    tally.write(s)
+
+def claims_made(s, claims):
+    """New claims: anything with created_at and status."""
+    tally = Tally()
+    for c in claims:
+        tally.claim(c.created_at, c.status)
+    tally.write(s)
+
+def claims_decided(s, decided):
+    """(created_at, new status) of claims that just left "pending"."""
+    tally = Tally()
+    for created_at, status in decided:
+        tally.claim(created_at, status, new=False)
+    tally.write(s)
+
+def rebuild(conn, batch=5000):
+    """Recompute every rollup from items and claims; returns rows written per table."""
+    tally = Tally()
+    for model in (Item, ArchivedItem):
+        rows = select(model.date_found, model.category_id, model.location_found, model.status,
+                      model.created_at, model.updated_at)
+        for row in conn.execute(rows.execution_options(yield_per=batch)):
+            tally.item(row)
+    for model in (Claim, ArchivedClaim):
+        for created_at, status in conn.execute(select(model.created_at, model.status)
+                                               .execution_options(yield_per=batch)):
+            tally.claim(created_at, status)
+    for model in COUNTERS:
+        conn.execute(delete(model))
+    written = {model.__tablename__: len(rows) for model, rows in tally.rows.items()}
+    tally.write(conn)
+    return written
+
+# ----- Reads -----
+
+def trends(s, weeks, today=None):
+    """The last `weeks` weeks (Monday to Sunday, this one included), read
+    from the rollups only: per-week counts, per-category returns and the
+    busiest locations."""
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+    by_week = {start + timedelta(weeks=i): dict(reported=0, returned=0, submitted=0, approved=0, rejected=0)
+               for i in range(weeks)}
+
+    def week(day):
+        return by_week.get(day - timedelta(days=day.weekday()))
+
+    for day, found, returned in s.execute(
+        select(ItemDaily.day, func.sum(ItemDaily.reported), func.sum(ItemDaily.returned))
+        .where(ItemDaily.day >= start).group_by(ItemDaily.day)
+    ):
+        row = week(day)
+        if row is not None:
+            row["reported"] += found
+            row["returned"] += returned
+    for c in s.execute(select(ClaimDaily).where(ClaimDaily.day >= start)).scalars():
+        row = week(c.day)
+        if row is not None:
+            for name in COUNTERS[ClaimDaily]:
+                row[name] += getattr(c, name)
+    for row in by_week.values():
+        decided = row["approved"] + row["rejected"]
+        row["approval_rate"] = row["approved"] / decided if decided else None
+
+    categories = [
+        dict(name=name or "(none)", reported=found, returned=returned, timed=timed,
+             avg_days=seconds / timed / 86400 if timed else None)
+        for name, found, returned, timed, seconds in s.execute(
+            select(Category.name, func.sum(ItemDaily.reported), func.sum(ItemDaily.returned),
+                   func.sum(ItemDaily.timed), func.sum(ItemDaily.return_seconds))
+            .outerjoin(Category, Category.id == ItemDaily.category_id)
+            .where(ItemDaily.day >= start).group_by(ItemDaily.category_id, Category.name).order_by(Category.name)
+        )
+    ]
+    n = func.sum(LocationDaily.reported).label("n")
+    locations = s.execute(
+        select(LocationDaily.location, n).where(LocationDaily.day >= start)
+        .group_by(LocationDaily.location).order_by(n.desc(), LocationDaily.location).limit(TOP_LOCATIONS)
+    ).all()
+    return dict(start=start, by_week=[dict(row, week=w) for w, row in by_week.items()],
+                categories=categories, locations=locations)
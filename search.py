@@ -0,0 +1,173 @@
+import hashlib, json, re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import text, select, literal_column, table, bindparam, case, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import joinedload
+from models import Item, Category
+
+# ----- Full-text index over Item (SQLite FTS5) -----
+# External-content table: the index stores only the token data and reads the
+# row text back from `items`, so it costs roughly one extra copy of the words.
+# Triggers keep it in sync; only edits to the indexed columns touch it, status
+# changes do not.
+
+FTS_TABLE = "items_fts"
+
+# bm25 column weights: a hit in the name counts most, then location, then body
+_WEIGHTS = (10.0, 2.0, 5.0)   # name, description, location_found
+
+_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, location_found,
+        content='items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, location_found)
+        VALUES (new.id, new.name, new.description, new.location_found);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, location_found)
+        VALUES ('delete', old.id, old.name, old.description, old.location_found);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_au
+        AFTER UPDATE OF name, description, location_found ON items BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, location_found)
+        VALUES ('delete', old.id, old.name, old.description, old.location_found);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, location_found)
+        VALUES (new.id, new.name, new.description, new.location_found);
+    END""",
+]
+
+def install(engine):
+    """Create the FTS table + triggers if the backend supports them.
+
+    Returns True when indexed search is available, False to use the ILIKE
+    fallback (non-SQLite backends or SQLite builds without FTS5)."""
+    if engine.dialect.name != "sqlite":
+        return False
+    try:
+        with engine.begin() as conn:
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :n"), {"n": FTS_TABLE}
+            ).first() is not None
+            for ddl in _DDL:
+                conn.execute(text(ddl))
+            if not existed:
+                # index rows that were there before the table was created
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError:
+        return False
+    return True
+
+def available(engine):
+    """True when install() has set up the FTS table in this database."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :n"), {"n": FTS_TABLE}
+        ).first() is not None
+
+def rebuild(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def terms(q):
+    return _TOKEN.findall((q or "").lower())
+
+def match_expr(q):
+    """User input -> FTS5 MATCH string. Every word must appear; each is a
+    prefix term so 'back pa' finds 'backpack'. Words are quoted, so FTS
+    operators typed by the user are treated as plain text."""
+    return " ".join(f'"{t}"*' for t in terms(q))
+
+def hits(q):
+    """Subquery of (item_id, rank) for a search; lower rank = better match."""
+    weights = ", ".join(str(w) for w in _WEIGHTS)
+    return (
+        select(
+            literal_column("rowid").label("item_id"),
+            literal_column(f"bm25({FTS_TABLE}, {weights})").label("rank"),
+        )
+        .select_from(table(FTS_TABLE))
+        .where(text(f"{FTS_TABLE} MATCH :fts_q").bindparams(bindparam("fts_q", match_expr(q))))
+        .subquery("hits")
+    )
+
+def apply(query, q, use_fts):
+    """Restrict an Item query to matches for `q`.
+
+    Returns (query, rank) where `rank` is a column to order by for relevance,
+    or None when the fallback path is used (no ranking available)."""
+    if not terms(q):
+        return query, None
+    if use_fts:
+        h = hits(q)
+        return query.join(h, h.c.item_id == Item.id), h.c.rank
+    for t in terms(q):
+        like = f"%{t}%"
+        query = query.filter(
+            Item.name.ilike(like) | Item.description.ilike(like) | Item.location_found.ilike(like)
+        )
+    return query, None
+
+# ----- Browse listing (shared by /browse and /api/v1/items) -----
+
+SORTS = ("relevance", "date_desc", "date_asc", "category")
+
+def listing(q, category_id, sort, use_fts):
+    """Item query + keyset order for a search/category/sort combination.
+
+    Every ordering ends in Item.id so page cursors are unique."""
+    query = select(Item).options(joinedload(Item.category))
+    query, rank = apply(query, q, use_fts)
+    if category_id and category_id != -1:
+        query = query.filter(Item.category_id == category_id)
+    if sort == "relevance" and rank is not None:
+        order = [(rank, False), (Item.date_found, True), (Item.id, True)]
+    elif sort == "date_asc":
+        order = [(Item.date_found, False), (Item.id, False)]
+    elif sort == "category":
+        query = query.join(Category)
+        order = [(Category.name, False), (Item.date_found, True), (Item.id, True)]
+    else:
+        order = [(Item.date_found, True), (Item.id, True)]
+    return query, order
+
+# ----- Facet counts (/browse) -----
+# How many items a search has per category, per status and per date bucket,
+# all from one GROUP BY category, status with a conditional SUM per date
+# bucket; the three facets are sums over its rows. Category counts leave out
+# the category filter (they are the alternatives to it), status and date
+# counts apply it. With no search words this reads ix_items_facets only, in
+# index order (no temp b-tree).
+
+DATE_BUCKETS = (("Past week", 7), ("Past month", 30), ("Past year", 365))   # cumulative
+
+def facets(s, q, category_id, use_fts, today=None):
+    """{"categories": {id: n}, "statuses": {status: n}, "dates": [(label, n)], "total": n}"""
+    today = today or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    since = [func.sum(case((Item.date_found >= today - timedelta(days=days), 1), else_=0))
+             for _, days in DATE_BUCKETS]
+    query, _ = apply(select(Item.category_id, Item.status, func.count(), *since).select_from(Item), q, use_fts)
+    rows = s.execute(query.group_by(Item.category_id, Item.status)).all()
+
+    one = category_id and category_id != -1
+    cats, statuses, dates = defaultdict(int), defaultdict(int), [0] * len(DATE_BUCKETS)
+    for cat, status, n, *recent in rows:
+        cats[cat] += n
+        if not one or cat == category_id:
+            statuses[status] += n
+            dates = [a + b for a, b in zip(dates, recent)]
+    total = sum(statuses.values())
+    return dict(categories=dict(cats), statuses=dict(statuses), total=total,
+                dates=[(label, n) for (label, _), n in zip(DATE_BUCKETS, dates)] + [("Older", total - dates[-1])])
+
+def facet_key(q, category_id):
+    """Cache key part for a search: same words and category -> same counts."""
+    raw = json.dumps([terms(q), category_id or -1, datetime.utcnow().date().isoformat()])
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
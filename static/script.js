@@ -1,26 +1,49 @@
-const API = "/api/items";
-const form = document.getElementById("itemForm");
+// Item list backed by the Flask JSON API (/api/v1/items). Only runs on pages
+// with an #items list. Filtering and search happen on the server, pages are
+// fetched with the API's cursors, and the list refreshes with If-None-Match:
+// an unchanged first page comes back as an empty 304.
+const API = "/api/v1/items";
+const FIELDS = "id,name,description,status,location_found,created_at,category,url";
+const REFRESH_MS = 60000;
 const list = document.getElementById("items");
 const filters = document.querySelectorAll(".filter");
 const search = document.getElementById("search");
+const more = document.getElementById("loadMore");
 
 let items = [];
 let currentFilter = "all";
 let searchText = "";
+let nextCursor = null;
+let etag = null;
 
-async function fetchItems() {
-  const res = await fetch(API);
-  items = await res.json();
+function query(cursor) {
+  const p = new URLSearchParams({ fields: FIELDS });
+  if (currentFilter !== "all") p.set("status", currentFilter);
+  if (searchText) p.set("q", searchText);
+  if (cursor) p.set("cursor", cursor);
+  return `${API}?${p}`;
+}
+
+// first page; `refresh` keeps the current list when the server says 304
+async function fetchItems(refresh = false) {
+  const headers = refresh && etag ? { "If-None-Match": etag } : {};
+  const res = await fetch(query(), { headers, cache: "no-store", credentials: "same-origin" });
+  if (res.status === 304 || !res.ok) return;
+  etag = res.headers.get("ETag");
+  const page = await res.json();
+  items = page.data;
+  nextCursor = page.next_cursor;
   render();
 }
 
-function filterItems() {
-  return items.filter(i => {
-    const catOk = currentFilter === "all" ? true : i.category === currentFilter;
-    const txt = (i.title + " " + i.description).toLowerCase();
-    const searchOk = !searchText || txt.includes(searchText);
-    return catOk && searchOk;
-  });
+async function fetchMore() {
+  if (!nextCursor) return;
+  const res = await fetch(query(nextCursor), { credentials: "same-origin" });
+  if (!res.ok) return;
+  const page = await res.json();
+  items = items.concat(page.data);
+  nextCursor = page.next_cursor;
+  render();
 }
 
 function fmtDate(iso) {
@@ -32,79 +55,24 @@ function itemHTML(i) {
   return `
     <li class="item">
       <div class="meta">
-        <span class="badge ${i.category}">${i.category.toUpperCase()}</span>
-        <span class="title">${escapeHTML(i.title)}</span>
+        <span class="badge ${escapeHTML(i.status)}">${escapeHTML(i.status.toUpperCase())}</span>
+        <a class="title" href="${escapeHTML(i.url)}">${escapeHTML(i.name)}</a>
       </div>
       <div class="desc">${escapeHTML(i.description)}</div>
       <div class="foot">
-        <span>Location: ${i.location ? escapeHTML(i.location) : "—"} • Contact: ${escapeHTML(i.contact)}</span>
+        <span>Location: ${i.location_found ? escapeHTML(i.location_found) : "—"} • ${escapeHTML(i.category || "")}</span>
         <span>${fmtDate(i.created_at)}</span>
       </div>
-      <div style="margin-top:8px;">
-        <button class="delete" onclick="deleteItem(${i.id})">Delete</button>
-      </div>
     </li>
   `;
 }
 
 function render() {
-  const filtered = filterItems();
-  list.innerHTML = filtered.map(itemHTML).join("") || "<p style='color:#9ca3af'>No items yet.</p>";
+  list.innerHTML = items.map(itemHTML).join("") || "<p style='color:#9ca3af'>No items yet.</p>";
+  if (more) more.hidden = !nextCursor;
 }
 
-form.addEventListener("submit", async (e) => {
-  e.preventDefault();
-  const payload = {
-    title: form.title.value.trim(),
-    category: form.category.value.trim(),
-    location: form.location.value.trim(),
-    description: form.description.value.trim(),
-    contact: form.contact.value.trim()
-  };
-  if (!payload.title || !payload.category || !payload.description || !payload.contact) {
-    alert("Please fill in all required fields.");
-    return;
-  }
-  const res = await fetch(API, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload)
-  });
-  if (!res.ok) {
-    const msg = await res.json().catch(() => ({}));
-    alert(msg.error || "Failed to add item.");
-    return;
-  }
-  form.reset();
-  await fetchItems();
-});
-
-filters.forEach(btn => {
-  btn.addEventListener("click", () => {
-    filters.forEach(b => b.classList.remove("active"));
-    btn.classList.add("active");
-    currentFilter = btn.dataset.filter;
-    render();
-  });
-});
-
-search.addEventListener("input", () => {
-  searchText = search.value.trim().toLowerCase();
-  render();
-});
-
-async function deleteItem(id) {
-  if (!confirm("Delete this item?")) return;
-  const res = await fetch(`${API}/${id}`, { method: "DELETE" });
-  if (res.ok) {
-    items = items.filter(i => i.id !== id);
-    render();
-  } else {
-    alert("Failed to delete item.");
-  }
-}
-
-// Simple HTML escaper to prevent XSS in the demo
+// Simple HTML escaper to prevent XSS
 function escapeHTML(s) {
   return String(s)
     .replaceAll("&", "&amp;")
@@ -114,4 +82,97 @@ function escapeHTML(s) {
     .replaceAll("'", "&#039;");
 }
 
-fetchItems();
+if (list) {
+  filters.forEach(btn => {
+    btn.addEventListener("click", () => {
+      filters.forEach(b => b.classList.remove("active"));
+      btn.classList.add("active");
+      currentFilter = btn.dataset.filter;
+      fetchItems();
+    });
+  });
+
+  if (search) {
+    search.addEventListener("change", () => {
+      searchText = search.value.trim();
+      fetchItems();
+    });
+  }
+
+  if (more) more.addEventListener("click", fetchMore);
+
+  setInterval(() => {
+    // only the first page is refreshed, and only while it's all that's shown
+    if (!document.hidden && items.length <= 24) fetchItems(true);
+  }, REFRESH_MS);
+
+  fetchItems();
+}
+
+// Search-as-you-type: inputs marked data-suggest get a <datalist> filled
+// from /browse/suggest. Requests wait for a pause in typing, a newer one
+// cancels the older, and answers are remembered for the page's lifetime.
+const SUGGEST = "/browse/suggest";
+const SUGGEST_DELAY_MS = 150;
+
+function debounce(fn, ms) {
+  let timer;
+  return (...args) => {
+    clearTimeout(timer);
+    timer = setTimeout(() => fn(...args), ms);
+  };
+}
+
+document.querySelectorAll("input[data-suggest]").forEach((input, n) => {
+  const options = document.createElement("datalist");
+  options.id = `suggest-${n}`;
+  input.setAttribute("list", options.id);
+  input.setAttribute("autocomplete", "off");
+  input.after(options);
+
+  const seen = new Map();
+  let inflight = null;
+
+  function show(suggestions) {
+    options.innerHTML = suggestions
+      .map(s => `<option value="${escapeHTML(s.text)}">${escapeHTML(s.kind)}</option>`)
+      .join("");
+  }
+
+  input.addEventListener("input", debounce(async () => {
+    const q = input.value.trim();
+    if (inflight) inflight.abort();
+    if (!q) return show([]);
+    if (seen.has(q)) return show(seen.get(q));
+    inflight = new AbortController();
+    try {
+      const res = await fetch(`${SUGGEST}?q=${encodeURIComponent(q)}`,
+                              { signal: inflight.signal, credentials: "same-origin" });
+      if (!res.ok) return;
+      const { suggestions } = await res.json();
+      seen.set(q, suggestions);
+      if (input.value.trim() === q) show(suggestions);
+    } catch (e) {
+      if (e.name !== "AbortError") throw e;
+    }
+  }, SUGGEST_DELAY_MS));
+});
+
+// Live notifications: signed-in pages listen on /notifications/stream
+// (Server-Sent Events) and bump the navbar badge as notifications arrive,
+// instead of the count only changing on the next page load. EventSource
+// reconnects by itself and sends the last event id, so nothing is missed.
+const stream = document.body.dataset.notifyStream;
+const badge = document.getElementById("unread-badge");
+
+if (stream && badge && window.EventSource) {
+  const source = new EventSource(stream);
+  source.addEventListener("notification", e => {
+    const note = JSON.parse(e.data);
+    badge.textContent = (parseInt(badge.textContent, 10) || 0) + 1;
+    badge.classList.remove("d-none");
+    badge.title = note.title;
+  });
+  // don't hold a connection per background tab forever
+  window.addEventListener("pagehide", () => source.close());
+}
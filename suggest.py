@@ -0,0 +1,198 @@
+import bisect, re, threading, time, unicodedata
+from sqlalchemy import select, func
+from models import Item, ItemStatus, Category
+
+# ----- Search-as-you-type suggestions (/browse/suggest) -----
+# A per-process index of the names and locations of open items and of the
+# category names. Every label is entered once per word it contains, as a
+# lower-cased key starting at that word, in one sorted list: a prefix lookup
+# is a bisect plus a short scan. "back" and "blue b" both find "Blue
+# backpack" (words are matched from their start; "pack" is not). Labels
+# whose first word matches come first, then those used by more items. When
+# a prefix of 4+ characters finds too little, its one-edit variants (a
+# letter dropped, added, changed or two swapped) that do occur as a prefix
+# are looked up as well (typo tolerance): each variant is one bisect, which
+# is cheaper and more precise than trigram overlap on short prefixes.
+#
+# The index is built on first use, kept current by the write paths of this
+# process (report, item status, categories) and rebuilt in the background
+# every SUGGEST_REFRESH seconds to pick up other workers' writes. It holds at
+# most SUGGEST_MAX_TERMS labels, the most common ones.
+
+SCAN_LIMIT = 200          # keys looked at per prefix lookup
+FUZZY_MIN, FUZZY_MAX = 4, 12    # prefix lengths that get typo tolerance
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def normalize(s):
+    s = unicodedata.normalize("NFKD", s or "")
+    return " ".join(_WORD.findall("".join(c for c in s if not unicodedata.combining(c)).lower()))
+
+class SuggestIndex:
+    def __init__(self, session_factory, max_terms=20000, refresh=300):
+        self.session_factory = session_factory
+        self.max_terms = max_terms
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._rebuilding = False
+        self._counts = {}                 # (kind, label) -> open items using it (categories: 1)
+        self._keys = []                   # sorted (key, kind, label, at_start), one per word start
+        self._alphabet = ""               # characters occurring in keys (typo variants)
+
+    # -- building --
+
+    def _load(self):
+        with self.session_factory() as s:
+            names = s.execute(select(Item.name, func.count()).where(Item.status == ItemStatus.FOUND)
+                              .group_by(Item.name).order_by(func.count().desc()).limit(self.max_terms)).all()
+            places = s.execute(select(Item.location_found, func.count()).where(Item.status == ItemStatus.FOUND)
+                               .group_by(Item.location_found).order_by(func.count().desc())
+                               .limit(self.max_terms)).all()
+            cats = s.scalars(select(Category.name)).all()
+        terms = [(("category", c), 1) for c in cats]
+        terms += sorted([(("item", n), k) for n, k in names] + [(("location", p), k) for p, k in places],
+                        key=lambda t: -t[1])
+        return terms[:self.max_terms]
+
+    def rebuild(self):
+        terms = self._load()
+        keys = []
+        for term, _ in terms:
+            keys.extend(self._entries(term))
+        keys.sort()
+        alphabet = "".join(sorted({c for key, *_ in keys for c in key[:FUZZY_MAX]}))
+        with self._lock:
+            self._counts, self._keys, self._alphabet = dict(terms), keys, alphabet
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.rebuild()
+        elif time.monotonic() - self._built_at > self.refresh and not self._rebuilding:
+            self._rebuilding = True
+            def run():
+                try:
+                    self.rebuild()
+                finally:
+                    self._rebuilding = False
+            threading.Thread(target=run, name="suggest-rebuild", daemon=True).start()
+
+    def stale(self):
+        """Reload in the background on the next lookup (after bulk writes)."""
+        if self._built_at is not None:
+            self._built_at = float("-inf")
+
+    @staticmethod
+    def _entries(term):
+        key = normalize(term[1])
+        starts = [0] + [m.start() for m in re.finditer(r" ", key)]
+        return [(key[i:].lstrip(), *term, i == 0) for i in starts if key[i:].strip()]
+
+    # -- incremental updates (this process's writes) --
+
+    def _add(self, term, n=1):
+        if not term[1] or self._built_at is None:
+            return    # not built yet: the first lookup loads it from the DB
+        with self._lock:
+            if term in self._counts:
+                self._counts[term] += n
+                return
+            if len(self._counts) >= self.max_terms:
+                return
+            self._counts[term] = n
+            for e in self._entries(term):
+                bisect.insort(self._keys, e)
+
+    def _remove(self, term):
+        if self._built_at is None:
+            return
+        with self._lock:
+            left = self._counts.get(term, 0) - 1
+            if left > 0:
+                self._counts[term] = left
+                return
+            if self._counts.pop(term, None) is None:
+                return
+            for e in self._entries(term):
+                i = bisect.bisect_left(self._keys, e)
+                if i < len(self._keys) and self._keys[i] == e:
+                    del self._keys[i]
+
+    def item_added(self, item):
+        if item.status == ItemStatus.FOUND:
+            self._add(("item", item.name))
+            self._add(("location", item.location_found))
+
+    def item_status_changed(self, item, old):
+        if old == item.status:
+            return
+        if item.status == ItemStatus.FOUND:
+            self.item_added(item)
+        elif old == ItemStatus.FOUND:
+            self._remove(("item", item.name))
+            self._remove(("location", item.location_found))
+
+    def category_added(self, name):
+        self._add(("category", name))
+
+    # -- lookup --
+
+    def suggest(self, q, limit=8):
+        """[{"text", "kind", "count"}] for labels with a word starting with q."""
+        p = normalize(q)
+        if not p:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            found = self._scan(p, {})
+            ranked = self._rank(found)
+            if len(ranked) < limit and FUZZY_MIN <= len(p) <= FUZZY_MAX:
+                typos = {}
+                for v in self._variants(p):
+                    self._scan(v, typos)
+                ranked += [t for t in self._rank(typos) if t not in found]
+            out, seen = [], set()
+            for kind, label in ranked:
+                if (kind, normalize(label)) in seen:    # "Library" and "library"
+                    continue
+                seen.add((kind, normalize(label)))
+                out.append(dict(text=label, kind=kind, count=self._counts.get((kind, label), 0)))
+                if len(out) == limit:
+                    break
+            return out
+
+    def _scan(self, p, found):
+        """Add {(kind, label): label starts with p} for keys starting with p."""
+        i = bisect.bisect_left(self._keys, (p,))
+        for key, kind, label, at_start in self._keys[i:i + SCAN_LIMIT]:
+            if not key.startswith(p):
+                break
+            found[(kind, label)] = found.get((kind, label)) or at_start
+        return found
+
+    def _rank(self, found):
+        return sorted(found, key=lambda t: (not found[t], -self._counts.get(t, 0), t[1]))
+
+    def _is_prefix(self, p):
+        i = bisect.bisect_left(self._keys, (p,))
+        return i < len(self._keys) and self._keys[i][0].startswith(p)
+
+    def _variants(self, p):
+        """One-edit variants of p that some key starts with."""
+        out = {p[:i] + p[i + 1] + p[i] + p[i + 2:] for i in range(len(p) - 1)}    # swapped
+        out |= {p[:i] + p[i + 1:] for i in range(len(p))}                         # extra letter
+        for i in range(len(p) + 1):
+            # only letters that can follow p[:i] at all: skip the bisects for the rest
+            if i and not self._is_prefix(p[:i]):
+                break
+            for c in self._alphabet:
+                out.add(p[:i] + c + p[i:])                                        # missed letter
+                if i < len(p):
+                    out.add(p[:i] + c + p[i + 1:])                                # wrong letter
+        out.discard(p)
+        return [v for v in out if v.strip() and self._is_prefix(v)]
+
+    def stats(self):
+        return dict(terms=len(self._counts), keys=len(self._keys), alphabet=len(self._alphabet),
+                    age_s=None if self._built_at is None else round(time.monotonic() - self._built_at))
@@ -0,0 +1,78 @@
+import hashlib, mimetypes, os, re
+from flask import current_app, request, send_file, abort, url_for, Response
+from werkzeug.security import safe_join
+from cache import TTLCache
+
+# ----- Serving uploaded photos -----
+# Content-hashed names ("<32 hex>[_<width>].<ext>", see images.py) never
+# change meaning, so they are served as immutable for a year and their strong
+# ETag is the hash itself. Older uploads with free-form names get a content
+# digest computed once per process and a "?v=" version in their URL, which
+# gives them the same treatment.
+
+HASHED_NAME = re.compile(r"^[0-9a-f]{32}(?:_\d+)?\.[A-Za-z0-9]+$")
+ONE_YEAR = 365 * 24 * 3600
+
+_digests = TTLCache(maxsize=4096, ttl=ONE_YEAR)   # (path, mtime_ns, size) -> sha256 prefix
+
+def _path(filename):
+    path = safe_join(current_app.config["UPLOAD_FOLDER"], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    return path
+
+def file_etag(filename, path, st):
+    if HASHED_NAME.match(os.path.basename(filename)):
+        return os.path.basename(filename).rsplit(".", 1)[0]
+    key = (path, st.st_mtime_ns, st.st_size)
+    tag = _digests.get(key)
+    if tag is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        tag = h.hexdigest()[:32]
+        _digests.set(key, tag)
+    return tag
+
+def upload_url(filename):
+    """URL for an upload that is safe to cache forever."""
+    if HASHED_NAME.match(os.path.basename(filename)):
+        return url_for("main.uploaded_file", filename=filename)
+    path = safe_join(current_app.config["UPLOAD_FOLDER"], filename)
+    try:
+        st = os.stat(path)
+    except (TypeError, OSError):
+        return url_for("main.uploaded_file", filename=filename)
+    return url_for("main.uploaded_file", filename=filename, v=file_etag(filename, path, st)[:12])
+
+def serve(filename):
+    path = _path(filename)
+    st = os.stat(path)
+    etag = file_etag(filename, path, st)
+    immutable = bool(HASHED_NAME.match(os.path.basename(filename))) or (
+        request.args.get("v") == etag[:12]
+    )
+    accel = current_app.config.get("UPLOADS_ACCEL_REDIRECT")
+    if accel:
+        # nginx `internal` location serves the bytes (sendfile, ranges);
+        # Flask only answers conditionals and sets the headers.
+        resp = Response(mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        resp.set_etag(etag)
+        resp.last_modified = st.st_mtime
+        resp.make_conditional(request)
+        if resp.status_code == 200:
+            resp.headers["X-Accel-Redirect"] = accel.rstrip("/") + "/" + filename
+    else:
+        # send_file handles If-None-Match / If-Modified-Since (304), Range
+        # (206) and USE_X_SENDFILE (Apache/lighttpd) for us.
+        resp = send_file(path, etag=etag, last_modified=st.st_mtime, conditional=True)
+    if immutable:
+        resp.cache_control.no_cache = None
+        resp.cache_control.public = True
+        resp.cache_control.max_age = ONE_YEAR
+        resp.cache_control.immutable = True
+    else:
+        resp.cache_control.public = True
+        resp.cache_control.no_cache = True    # revalidate; the ETag makes that a 304
+    return resp
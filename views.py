@@ -0,0 +1,563 @@
+import hmac, re, json
+from datetime import datetime
+from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import secure_filename
+from flask import (
+    Blueprint, render_template, redirect, url_for, flash, request, abort, current_app, Response, jsonify
+)
+from flask_login import login_user, logout_user, current_user, login_required
+from flask_wtf.csrf import CSRFError
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload
+from models import (
+    User, Roles, Category, Item, ItemStatus, Claim, ClaimStatus, Notification, OutboxStatus, ArchivedItem
+)
+from forms import LoginForm, RegisterForm, ReportItemForm, SearchForm, ClaimFilterForm
+from extensions import ext, csrf, login_manager
+from pagination import paginate
+import search
+import outbox
+import uploads
+import moderation
+import matching
+import bulk
+import rollups
+
+bp = Blueprint("main", __name__)
+
+# ----- Auth -----
+_USER_FIELDS = ("id", "name", "email", "role", "created_at", "is_active")
+
+@login_manager.user_loader
+def load_user(user_id):
+    # Flask-Login calls this once per request; cache hits skip the DB and
+    # hand back a detached copy (no password hash) built from the cached row.
+    uid = int(user_id)
+    data = ext.user_cache.get(uid)
+    if data is None:
+        with ext.Session() as s:
+            user = s.get(User, uid)
+        if not user:
+            return None
+        data = {f: getattr(user, f) for f in _USER_FIELDS}
+        ext.user_cache.set(uid, data)
+    if not data["is_active"]:
+        return None
+    return User(**data)
+
+# ----- Helpers -----
+def allowed_file(filename):
+    suffix = filename.rsplit(".", 1)[-1].lower()
+    return "." in filename and suffix in current_app.config["ALLOWED_EXTENSIONS"]
+
+def save_photo(file_storage):
+    """Store an upload by content hash -> (digest, photo_path, variants, raw) or None."""
+    if not file_storage or file_storage.filename == "":
+        return None
+    if not allowed_file(file_storage.filename):
+        return None
+    suffix = secure_filename(file_storage.filename).rsplit(".", 1)[-1].lower()
+    return ext.photos.store(file_storage, suffix)
+
+def admin_required():
+    if not current_user.is_authenticated or current_user.role != Roles.ADMIN:
+        abort(403)
+
+# ----- Public pages -----
+@bp.route("/")
+def index():
+    def load_stats():
+        with ext.Session() as s:
+            total_items = s.scalar(select(func.count(Item.id))) or 0
+            returned = s.scalar(select(func.count()).where(Item.status == ItemStatus.RETURNED)) or 0
+            claimed  = s.scalar(select(func.count()).where(Item.status == ItemStatus.CLAIMED)) or 0
+        return dict(total=total_items, returned=returned, claimed=claimed)
+
+    def load_recent():
+        with ext.Session() as s:
+            return (
+                s.execute(
+                    select(Item)
+                    .options(joinedload(Item.category))   # <-- eager-load category
+                    .order_by(Item.created_at.desc())
+                    .limit(8)
+                )
+                .scalars()
+                .all()
+            )
+
+    return render_template("index.html",
+                           recent=ext.cache.get_or_set("items:recent", load_recent),
+                           stats=ext.cache.get_or_set("stats:home", load_stats),
+                           cats=ext.cached_categories())
+
+@bp.route("/browse")
+@login_required
+def browse():
+    form = SearchForm(request.args, meta={"csrf": False})
+    cats = ext.cached_categories()
+    form.category.choices = [(-1, "All Categories")] + [(c.id, c.name) for c in cats]
+    with ext.Session() as s:
+        q, order = search.listing(form.q.data, form.category.data, form.sort.data, ext.fts)
+        page = paginate(s, q, order, request.args.get("cursor"), current_app.config["PER_PAGE"])
+        cats_map = {c.id: c for c in cats}
+
+    facets = ext.cached_facets(form.q.data, form.category.data)
+    return render_template("browse.html", form=form, items=page.items, page=page, cats_map=cats_map,
+                           facets=facets)
+
+
+@bp.route("/browse/suggest")
+@login_required
+def browse_suggest():
+    # served from the in-process prefix index; no SQL once it is built
+    q = (request.args.get("q") or "")[:100]
+    resp = jsonify(q=q, suggestions=ext.suggest.suggest(q, current_app.config["SUGGEST_LIMIT"]))
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 30
+    return resp
+
+@bp.route("/item/<int:item_id>")
+def item_detail(item_id):
+    with ext.Session() as s:
+        item = s.execute(
+            select(Item)
+            .options(joinedload(Item.category))      # <-- eager-load category
+            .where(Item.id == item_id)
+        ).scalar_one_or_none()
+        if not item:
+            # moved out by `flask archive`; same columns, read-only
+            item = s.execute(
+                select(ArchivedItem).options(joinedload(ArchivedItem.category)).where(ArchivedItem.id == item_id)
+            ).scalar_one_or_none()
+        if not item:
+            abort(404)
+    return render_template("item_detail.html", item=item, archived=isinstance(item, ArchivedItem))
+
+@bp.route("/item/<int:item_id>/matches")
+@login_required
+def item_matches(item_id):
+    with ext.Session() as s:
+        item = s.execute(
+            select(Item).options(joinedload(Item.category)).where(Item.id == item_id)
+        ).scalar_one_or_none()
+        if not item:
+            abort(404)
+        if item.reported_by != current_user.id and current_user.role != Roles.ADMIN:
+            abort(403)
+        found = matching.matches(s, item)
+    return render_template("item_matches.html", item=item, matches=found)
+
+
+# ----- Auth -----
+@bp.route("/login", methods=["GET","POST"])
+def login():
+    form = LoginForm()
+    if form.validate_on_submit():
+        with ext.Session() as s:
+            user = s.execute(select(User).where(User.email == form.email.data.lower().strip())).scalar_one_or_none()
+            if not user or not check_password_hash(user.password_hash, form.password.data):
+                flash("Invalid email or password.", "danger")
+            elif not user.is_active:
+                flash("This account is disabled. Contact an administrator.", "warning")
+            else:
+                ext.invalidate_user(user.id)
+                login_user(user, remember=True)
+                flash("Welcome back!", "success")
+                return redirect(request.args.get("next") or url_for(".dashboard"))
+    # If POST but invalid, show field errors via template
+    return render_template("login.html", form=form)
+
+@bp.route("/register", methods=["GET","POST"])
+def register():
+    form = RegisterForm()
+    if form.validate_on_submit():
+        with ext.Session() as s:
+            existing = s.execute(
+                select(User).where(User.email == form.email.data.lower().strip())
+            ).scalar_one_or_none()
+            if existing:
+                flash("That email is already registered. Try signing in.", "warning")
+            else:
+                u = User(
+                    name=form.name.data.strip(),
+                    email=form.email.data.lower().strip(),
+                    password_hash=generate_password_hash(form.password.data),
+                    role=Roles.USER,
+                )
+                s.add(u); s.commit()
+                ext.invalidate("users")
+                flash("Account created. Please sign in.", "success")
+                return redirect(url_for(".login"))
+    # If POST but invalid, template shows per-field messages
+    return render_template("register.html", form=form)
+
+@bp.route("/logout")
+@login_required
+def logout():
+    ext.invalidate_user(current_user.id)
+    ext.invalidate_unread(current_user.id)
+    logout_user()
+    flash("Signed out.", "info")
+    return redirect(url_for(".index"))
+
+# ----- User: report, dashboard, claims -----
+@bp.route("/report", methods=["GET","POST"])
+@login_required
+def report():
+    cats = ext.cached_categories()
+    form = ReportItemForm()
+    form.category.choices = [(c.id, c.name) for c in cats]
+    if form.validate_on_submit():
+        try:
+            digest, photo_filename, variants, raw = save_photo(form.photo.data) or (None, None, None, None)
+        except ValueError:
+            form.photo.errors.append("That file isn't an image we can read.")
+            return render_template("report.html", form=form)
+        if not photo_filename:
+            photo_filename = "" # ensure NOT NULL tables accept it
+        with ext.Session() as s:
+            item = Item(
+                name=form.name.data.strip(),
+                description=form.description.data.strip(),
+                category_id=form.category.data,
+                location_found=form.location_found.data.strip(),
+                date_found=datetime.combine(form.date_found.data, datetime.min.time()),
+                photo_path=photo_filename,
+                photo_hash=digest,
+                photo_variants=json.dumps(variants) if variants else None,
+                reported_by=current_user.id,
+                status=ItemStatus.FOUND,
+            )
+            s.add(item); s.flush()
+            matching.index(s, item)
+            rollups.reported(s, [item])
+            found = matching.matches(s, item)
+            matching.notify_owners(s, item, found, current_app.config["NOTIFY_CHANNELS"])
+            s.commit()
+        ext.invalidate("items")
+        ext.suggest.item_added(item)
+        if raw:
+            ext.photos.process(item.id, digest, raw)   # thumbnails are filled in off-thread
+        if found:
+            flash(f"Item submitted for catalog. {len(found)} similar report(s) found.", "success")
+            return redirect(url_for(".item_matches", item_id=item.id))
+        flash("Item submitted for catalog.", "success")
+        return redirect(url_for(".dashboard"))
+    return render_template("report.html", form=form)
+
+@bp.route("/dashboard")
+@login_required
+def dashboard():
+    per_page = current_app.config["PER_PAGE"]
+    with ext.Session() as s:
+        my_items = paginate(
+            s, select(Item).where(Item.reported_by == current_user.id),
+            [(Item.created_at, True), (Item.id, True)], request.args.get("items"), per_page)
+        my_claims = paginate(
+            s, select(Claim).options(joinedload(Claim.item)).where(Claim.claimer_id == current_user.id),
+            [(Claim.created_at, True), (Claim.id, True)], request.args.get("claims"), per_page)
+    return render_template("dashboard.html", my_items=my_items, my_claims=my_claims)
+
+@bp.route("/claim/<int:item_id>", methods=["POST"])
+@login_required
+def claim(item_id):
+    msg = (request.form.get("message") or "").strip()[:1000]
+    with ext.Session() as s:
+        item = s.get(Item, item_id)
+        if not item or item.status != ItemStatus.FOUND:
+            flash("This item cannot be claimed.", "warning")
+            return redirect(url_for(".item_detail", item_id=item_id))
+        existing = s.execute(select(Claim).where(Claim.item_id==item_id, Claim.claimer_id==current_user.id)).scalar_one_or_none()
+        if existing:
+            flash("You already claimed this item.", "info")
+        else:
+            c = Claim(item_id=item_id, claimer_id=current_user.id, message=msg)
+            s.add(c); s.flush()
+            rollups.claims_made(s, [c])
+            admin_ids = s.scalars(select(User.id).where(User.role==Roles.ADMIN)).all()
+            ext.notify(s, admin_ids, "New Claim Request", f"A claim was submitted for item #{item.id}: {item.name}")
+            s.commit()
+            ext.invalidate("claims")
+            flash("Claim submitted. You’ll be notified after verification.", "success")
+    return redirect(url_for(".item_detail", item_id=item_id))
+
+@bp.route("/notifications")
+@login_required
+def notifications():
+    with ext.Session() as s:
+        notes = paginate(
+            s, select(Notification).where(Notification.user_id == current_user.id),
+            [(Notification.created_at, True), (Notification.id, True)],
+            request.args.get("cursor"), current_app.config["PER_PAGE"])
+        # the page shown is read now; one UPDATE, and the rows still say "New" below
+        unread = [n.id for n in notes if not n.is_read]
+        if unread and outbox.mark_read(s, current_user.id, ids=unread):
+            s.commit()
+            ext.invalidate_unread(current_user.id)
+    newest = max((n.id for n in notes), default=None) if not request.args.get("cursor") else None
+    return render_template("notifications.html", notes=notes, newest=newest)
+
+@bp.route("/notifications/read", methods=["POST"])
+@login_required
+def mark_notifications_read():
+    # up_to: the newest one the user had on screen, so later arrivals stay unread
+    up_to = request.form.get("up_to", type=int)
+    with ext.Session() as s:
+        n = outbox.mark_read(s, current_user.id, up_to=up_to)
+        s.commit()
+    ext.invalidate_unread(current_user.id)
+    flash(f"{n} notification{'s' if n != 1 else ''} marked as read.", "success")
+    return redirect(url_for(".notifications"))
+
+@bp.route("/notifications/stream")
+@login_required
+def notification_stream():
+    # Server-Sent Events; the generator runs after this returns, so it gets
+    # plain values rather than current_user / the app context
+    cfg = current_app.config
+    last = request.headers.get("Last-Event-ID") or request.args.get("last_id", "")
+    body = ext.events.stream(current_user.id, int(last) if last.isdigit() else None,
+                             cfg["SSE_HEARTBEAT"], cfg["SSE_MAX_AGE"], cfg["SSE_BACKLOG"])
+    return Response(body, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ----- Admin management (unchanged routes; still role-checked) ---------------
+@bp.route("/admin")
+@login_required
+def admin_dashboard():
+    admin_required()
+    def load_totals():
+        with ext.Session() as s:
+            return {
+                "items": s.scalar(select(func.count(Item.id))) or 0,
+                "claims": s.scalar(select(func.count(Claim.id))) or 0,
+                "pending_claims": s.scalar(select(func.count(Claim.id)).where(Claim.status==ClaimStatus.PENDING)) or 0,
+                "users": s.scalar(select(func.count(User.id))) or 0,
+            }
+
+    def load_latest():
+        with ext.Session() as s:
+            return s.execute(
+                select(Item).options(joinedload(Item.category)).order_by(Item.created_at.desc()).limit(5)
+            ).scalars().all()
+
+    totals = dict(ext.cache.get_or_set("stats:admin", load_totals))
+    with ext.Session() as s:   # the outbox drains outside any request; never cached
+        totals["outbox_queued"] = sum(n for st, n in outbox.depth(s).items()
+                                      if st in (OutboxStatus.PENDING, OutboxStatus.SENDING))
+    return render_template("admin_dashboard.html", totals=totals,
+                           latest=ext.cache.get_or_set("items:latest", load_latest),
+                           cache_stats=ext.cache.stats(), fragment_stats=ext.fragment_cache.stats())
+
+@bp.route("/admin/trends")
+@login_required
+def admin_trends():
+    admin_required()
+    weeks = min(max(request.args.get("weeks", current_app.config["TRENDS_WEEKS"], type=int), 1), rollups.MAX_WEEKS)
+    with ext.Session() as s:   # rollup tables only; see rollups.py
+        data = rollups.trends(s, weeks)
+    return render_template("admin_trends.html", weeks=weeks, **data)
+
+@bp.route("/admin/export/<kind>.<fmt>")
+@login_required
+def admin_export(kind, fmt):
+    admin_required()
+    if kind not in bulk.EXPORTS or fmt not in bulk.FORMATS:
+        abort(404)
+    # rows are read with yield_per and sent a batch at a time while the client downloads
+    filename = f"{kind}-{datetime.utcnow():%Y%m%d}.{fmt}"
+    return Response(bulk.export(ext.db.sessionmaker, kind, fmt), mimetype=bulk.FORMATS[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@bp.route("/admin/import", methods=["POST"])
+@login_required
+def admin_import():
+    admin_required()
+    kind, upload = request.form.get("kind"), request.files.get("file")
+    if kind not in bulk.IMPORTERS or not upload or not upload.filename:
+        flash("Choose what to import and a CSV or JSONL file.", "warning")
+        return redirect(url_for(".admin_dashboard"))
+    rows = bulk.read_rows(upload.stream, bulk.format_for(upload.filename))
+    with ext.Session() as s:
+        done = bulk.import_rows(bulk.importer(kind, s, current_user.id, current_app.config["UPLOAD_FOLDER"],
+                                              ext.photos), rows)
+    ext.imported(kind)
+    msg = f"Imported {done['imported']} of {done['rows']} {kind}."
+    if done["error_count"]:
+        shown = "; ".join(f"line {line}: {err}" for line, err in done["errors"][:5])
+        msg += f" {done['error_count']} rejected ({shown}{'; ...' if done['error_count'] > 5 else ''})."
+    flash(msg, "warning" if done["error_count"] else "success")
+    return redirect(url_for(".admin_dashboard"))
+
+@bp.route("/admin/items")
+@login_required
+def manage_items():
+    admin_required()
+    with ext.Session() as s:
+        items = paginate(
+            s, select(Item).options(joinedload(Item.category)),
+            [(Item.created_at, True), (Item.id, True)],
+            request.args.get("cursor"), current_app.config["ADMIN_PER_PAGE"])
+    return render_template("manage_items.html", items=items)
+
+@bp.route("/admin/items/<int:item_id>/status", methods=["POST"])
+@login_required
+def set_item_status(item_id):
+    admin_required()
+    new_status = request.form.get("status")
+    if new_status not in (ItemStatus.FOUND, ItemStatus.CLAIMED, ItemStatus.RETURNED):
+        abort(400)
+    with ext.Session() as s:
+        item = s.get(Item, item_id)
+        if not item: abort(404)
+        old, item.status = item.status, new_status
+        rollups.status_changed(s, item, old)
+        s.commit()
+    ext.invalidate("items")
+    ext.suggest.item_status_changed(item, old)
+    flash("Item status updated.", "success")
+    return redirect(url_for(".manage_items"))
+
+@bp.route("/admin/claims")
+@login_required
+def manage_claims():
+    admin_required()
+    form = ClaimFilterForm(request.args, meta={"csrf": False})
+    form.validate()   # bad dates are dropped (and shown), the rest still filter
+    with ext.Session() as s:
+        claims = paginate(
+            s, moderation.queue(form.status.data, form.item.data, form.since.data, form.until.data),
+            [(Claim.created_at, True), (Claim.id, True)],
+            request.args.get("cursor"), current_app.config["ADMIN_PER_PAGE"])
+    return render_template("manage_claims.html", claims=claims, form=form)
+
+def _moderate(claim_ids, action):
+    with ext.Session() as s:
+        try:
+            result = moderation.decide(s, claim_ids, action, current_app.config["NOTIFY_CHANNELS"])
+        except ValueError:
+            abort(400)
+        s.commit()
+    ext.invalidate("items", "claims")
+    return result
+
+@bp.route("/admin/claims/batch", methods=["POST"])
+@login_required
+def moderate_claims():
+    admin_required()
+    ids = [i for i in request.form.getlist("claim_ids") if i.isdigit()]
+    if not ids:
+        flash("Select at least one claim.", "warning")
+    else:
+        r = _moderate(ids, request.form.get("action"))
+        flash(f"{r['approved']} approved, {r['rejected']} rejected"
+              + (f", {r['skipped']} already decided or item taken" if r["skipped"] else "") + ".", "success")
+    return redirect(_queue_url())
+
+@bp.route("/admin/claims/<int:claim_id>/<action>", methods=["POST"])
+@login_required
+def handle_claim(claim_id, action):
+    admin_required()
+    r = _moderate([claim_id], action)
+    if r["skipped"]:
+        flash("That claim was already decided, or its item is no longer available.", "warning")
+    else:
+        flash("Claim updated.", "success")
+    return redirect(_queue_url())
+
+def _queue_url():
+    # back to the same filtered page of the queue
+    nxt = request.form.get("next") or ""
+    return nxt if nxt.startswith("/admin/claims") else url_for(".manage_claims")
+
+@bp.route("/admin/users")
+@login_required
+def manage_users():
+    admin_required()
+    with ext.Session() as s:
+        users = paginate(
+            s, select(User), [(User.created_at, True), (User.id, True)],
+            request.args.get("cursor"), current_app.config["ADMIN_PER_PAGE"])
+    return render_template("manage_users.html", users=users)
+
+@bp.route("/admin/users/<int:user_id>/<action>", methods=["POST"])
+@login_required
+def set_user_flags(user_id, action):
+    admin_required()
+    if user_id == current_user.id:
+        flash("You cannot change your own account here.", "warning")
+        return redirect(url_for(".manage_users"))
+    with ext.Session() as s:
+        u = s.get(User, user_id)
+        if not u: abort(404)
+        if action == "activate":
+            u.is_active = True
+        elif action == "deactivate":
+            u.is_active = False
+        elif action == "make-admin":
+            u.role = Roles.ADMIN
+        elif action == "make-user":
+            u.role = Roles.USER
+        else:
+            abort(400)
+        s.commit()
+    ext.invalidate_user(user_id)
+    flash("User updated.", "success")
+    return redirect(url_for(".manage_users"))
+
+@bp.route("/admin/categories", methods=["GET","POST"])
+@login_required
+def manage_categories():
+    admin_required()
+    with ext.Session() as s:
+        if request.method == "POST":
+            name = (request.form.get("name") or "").strip()
+            if name:
+                slug = re.sub(r"[^a-z0-9\-]+","-", name.lower()).strip("-")
+                s.add(Category(name=name, slug=slug)); s.commit()
+                ext.invalidate("categories")
+                ext.suggest.category_added(name)
+                flash("Category added.", "success")
+        cats = s.query(Category).order_by(Category.name).all()
+    return render_template("manage_categories.html", cats=cats)
+
+@bp.route("/admin/perf")
+@login_required
+def admin_perf():
+    admin_required()
+    return render_template("admin_perf.html", rows=ext.timings.summary(), profiles=list(ext.timings.profiles),
+                           enabled=ext.timings.enabled, threshold=ext.timings.n_plus_one)
+
+@bp.route("/admin/perf/reset", methods=["POST"])
+@login_required
+def admin_perf_reset():
+    admin_required()
+    ext.timings.reset()
+    flash("Performance counters reset.", "info")
+    return redirect(url_for(".admin_perf"))
+
+@bp.route("/admin/perf/metrics")
+@csrf.exempt
+def admin_perf_metrics():
+    # Prometheus scrapes with `Authorization: Bearer <PERF_METRICS_TOKEN>`;
+    # a signed-in admin can open it in the browser
+    token = current_app.config["PERF_METRICS_TOKEN"]
+    given = request.headers.get("Authorization", "").encode()   # bytes: compare_digest() refuses non-ASCII str
+    if not (token and hmac.compare_digest(given, f"Bearer {token}".encode())):
+        admin_required()
+    return Response(ext.timings.prometheus(), mimetype="text/plain; version=0.0.4")
+
+# ----- Static uploads -----
+@bp.route("/uploads/<path:filename>")
+def uploaded_file(filename):
+    return uploads.serve(filename)
+
+# ----- Errors -----
+@bp.app_errorhandler(403)
+def forbidden(e): return render_template("403.html"), 403
+
+@bp.app_errorhandler(CSRFError)
+def handle_csrf(err):
+    flash("Form expired or invalid. Please try again.", "warning")
+    return redirect(request.referrer or url_for("main.index"))